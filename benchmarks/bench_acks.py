@@ -0,0 +1,35 @@
+"""Delayed acknowledgments: events, packets delivered, events per second
+and wall time of the test cases with an ack for every data packet against
+one ack every N packets.
+
+Usage: python benchmarks/bench_acks.py [duration_s] [ack_every ...]
+"""
+import sys
+
+import bench_util
+from flow import ReceivingFlow
+
+CASES = ['test_case_0', 'test_case_1', 'test_case_2']
+
+
+def measure(case, duration, ack_every):
+    """ Returns (events, deliveries, events/s, wall time). """
+    env, wall = bench_util.run(bench_util.case_path(case), duration,
+                               ack_every=ack_every,
+                               ack_delay=ReceivingFlow.ACK_DELAY)
+    return env.num_events, env.num_deliveries, env.num_events / wall, wall
+
+
+def main(argv):
+    duration = float(argv[0]) if argv else 30
+    ack_every = [int(n) for n in argv[1:]] or [1, 2, 4]
+    print('%-12s %6s %12s %12s %12s %10s' % ('case', 'ack', 'events',
+                                             'deliveries', 'events/s',
+                                             'wall (s)'))
+    for case in CASES:
+        for n in ack_every:
+            print('%-12s %6d %12d %12d %12.0f %10.2f' %
+                  ((case, n) + measure(case, duration, n)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+"""Micro-benchmark of the FAST TCP window updates: the controller shared
+by all the flows against one process per flow, as flows used to run.
+
+Usage: python benchmarks/bench_fast.py [num_flows] [duration_s]
+"""
+import sys
+import time
+
+import simpy
+
+import bench_util
+from fast import FastController
+
+
+class CountingEnvironment(simpy.Environment):
+    """ Environment that counts scheduled events. """
+
+    def __init__(self):
+        super(CountingEnvironment, self).__init__()
+        self.num_events = 0
+
+    def schedule(self, event, *args, **kwargs):
+        self.num_events += 1
+        super(CountingEnvironment, self).schedule(event, *args, **kwargs)
+
+
+class LegacyFlow(object):
+    """ Flow stand-in that adjusts its own window every fast_timeout ms. """
+
+    def __init__(self, env, start_time):
+        self.window_size = 20
+        self.rtt = 120.0
+        self.base_rtt = 100.0
+        self.alpha = 50
+        self.fast_timeout = 500
+        env.process(self.FAST(env, start_time))
+
+    def FAST(self, env, start_time):
+        yield env.timeout(start_time)
+        while True:
+            yield env.timeout(self.fast_timeout)
+            self.window_size = self.window_size * self.base_rtt * 1.0 / \
+                self.rtt + self.alpha
+
+
+def start_controller_flow(env, controller, start_time):
+    """ Process that adds a flow to the controller at start_time. """
+    yield env.timeout(start_time)
+    controller.add_flow(20, 120.0, 100.0, 50, 500)
+
+
+def start_times(num_flows):
+    """ Flows start in ten groups, 100 ms apart. """
+    return [100 * (i % 10) for i in range(num_flows)]
+
+
+def measure(num_flows, duration):
+    """ Returns (events, wall time) of both implementations. """
+    env = CountingEnvironment()
+    for start_time in start_times(num_flows):
+        LegacyFlow(env, start_time)
+    start = time.time()
+    env.run(until=duration)
+    legacy = (env.num_events, time.time() - start)
+
+    env = CountingEnvironment()
+    controller = FastController(env)
+    for start_time in start_times(num_flows):
+        env.process(start_controller_flow(env, controller, start_time))
+    start = time.time()
+    env.run(until=duration)
+    shared = (env.num_events, time.time() - start)
+    return legacy, shared
+
+
+def main(argv):
+    num_flows = int(argv[0]) if argv else 5000
+    duration = (float(argv[1]) if len(argv) > 1 else 60) * \
+        bench_util.S_TO_MS
+    legacy, shared = measure(num_flows, duration)
+    print('%d FAST flows, %.0f s' % (num_flows, duration / bench_util.S_TO_MS))
+    print('%-16s %12s %10s' % ('controller', 'events', 'wall (s)'))
+    print('%-16s %12d %10.2f' % (('one per flow',) + legacy))
+    print('%-16s %12d %10.2f' % (('shared',) + shared))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
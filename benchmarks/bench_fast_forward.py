@@ -0,0 +1,30 @@
+"""Measures the simulation stopped once the network is idle against the
+whole simulation on the test cases whose flows finish: time the network
+is idle from, events and wall time.
+
+Usage: python benchmarks/bench_fast_forward.py [duration_in_s] [routing]
+"""
+import sys
+
+import bench_util
+
+
+def main(argv):
+    duration = int(argv[0]) if argv else 120
+    routing = argv[1] if len(argv) > 1 else 'dv'
+    print('%-12s %-6s %10s %12s %10s' %
+          ('case', 'mode', 'idle s', 'events', 'wall s'))
+    for case in ['test_case_0', 'test_case_1']:
+        for fast_forward in [False, True]:
+            sim, wall = bench_util.run(bench_util.case_path(case), duration,
+                                       routing=routing,
+                                       fast_forward=fast_forward)
+            idle = '-'
+            if sim.idle_at is not None:
+                idle = '%.1f' % (sim.idle_at / 1000.0)
+            print('%-12s %-6s %10s %12d %10.2f' %
+                  (case, 'ff' if fast_forward else 'full', idle,
+                   sim.num_events, wall))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+"""Compares forwarding through the compiled forwarding table (Router.fib)
+with the routing table dict lookups routers used to do, on a grid of
+routers.
+
+Usage: python benchmarks/bench_forwarding.py [grid_size] [duration_in_s]
+"""
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+import bench_util
+import topology
+from env import MainEnv
+from packet import Packet, DataPacket
+from router import Router
+
+
+class LegacyRouter(Router):
+    """ Router that forwards with routing_table and links lookups, and
+        has no forwarding table to maintain. """
+
+    def update_fib(self):
+        pass
+
+    def receive_packet(self, packet):
+        if packet.get_packet_type() == Packet.PacketTypes.routing_update_packet:
+            self.process_routing_packet(packet)
+        else:
+            dest = packet.get_destination()
+            if (dest in self.routing_table and
+                self.routing_table[dest] is not None):
+                self.links[self.routing_table[dest]].enqueue(packet, self.id)
+
+# Same counting overhead as Router
+bench_util.count_deliveries(LegacyRouter)
+
+
+def use_router(router_class):
+    MainEnv.ROUTERS = dict(MainEnv.ROUTERS, dv=router_class,
+                           static=router_class)
+
+
+def lookups(ifile, router_class, rounds=20):
+    """ Returns the number of packets per second the routers of a
+        statically routed network forward to their links, with link
+        buffers left out. """
+    use_router(router_class)
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.chdir(tmp)
+    try:
+        sim = bench_util.CountingEnv(1000, 500, 100, None, headless=True,
+                                     routing='static')
+        sim.loadNetwork(ifile)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+    for link in sim.links:
+        link.enqueue = lambda packet, src_id: None
+    packets = [DataPacket(0, 0, host.get_id(), 0, 0) for host in sim.hosts]
+    start = time.time()
+    for _ in range(rounds):
+        for router in sim.routers:
+            for packet in packets:
+                router.receive_packet(packet)
+    return rounds * len(sim.routers) * len(packets) / (time.time() - start)
+
+
+def simulate(ifile, router_class, duration, repeat=3):
+    """ Returns the events per second of the fastest of repeat
+        distance-vector runs. """
+    use_router(router_class)
+    best = None
+    for _ in range(repeat):
+        sim, wall = bench_util.run(ifile, duration)
+        if best is None or wall < best[1]:
+            best = (sim.num_events, wall)
+    return best[0] / best[1]
+
+
+def main(argv):
+    size = int(argv[0]) if argv else 10
+    duration = int(argv[1]) if len(argv) > 1 else 10
+    routers = dict(MainEnv.ROUTERS)
+    tmp = tempfile.mkdtemp()
+    try:
+        ifile = os.path.join(tmp, 'grid')
+        topology.write(topology.grid(size, size), ifile)
+        print('%dx%d grid' % (size, size))
+        print('%-20s %15s %15s' % ('forwarding', 'lookups/s', 'events/s'))
+        for name, router_class in [('routing table', LegacyRouter),
+                                   ('forwarding table', Router)]:
+            print('%-20s %15.0f %15.0f' %
+                  (name, lookups(ifile, router_class),
+                   simulate(ifile, router_class, duration)))
+    finally:
+        MainEnv.ROUTERS = routers
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,49 @@
+"""Compares the link delay-line engine and the ordered delivery events of
+the partitioned simulation with one propagation process per packet, on
+test_case_2.
+
+Usage: python benchmarks/bench_link.py [duration_in_s]
+"""
+import sys
+
+import bench_util
+import env
+from link import Link, OrderedLink
+
+
+class LegacyLink(Link):
+    """ Link that starts an independent process for every transmitted
+        packet to wait link_delay, as the simulator used to do. """
+
+    def send_packet(self, idx, packet):
+        self.env.process(self.propagate(idx, packet))
+
+    def propagate(self, idx, packet):
+        yield self.env.timeout(self.link_delay)
+        self.end_points[1 - idx].receive_packet(packet)
+
+
+def measure(link_class, duration):
+    env.MainEnv.LINK = link_class
+    try:
+        sim, wall = bench_util.run(bench_util.case_path('test_case_2'),
+                                   duration)
+    finally:
+        env.MainEnv.LINK = Link
+    packets = float(sim.num_deliveries)
+    return (sim.num_events / packets, sim.num_processes / packets,
+            packets / wall)
+
+
+def main(argv):
+    duration = int(argv[0]) if argv else 20
+    print('%-20s %15s %15s %15s' % ('engine', 'events/packet',
+                                    'processes/pkt', 'packets/s'))
+    for name, link_class in [('per-packet process', LegacyLink),
+                             ('delay line', Link),
+                             ('delivery events', OrderedLink)]:
+        print('%-20s %15.3f %15.3f %15.0f' %
+              ((name,) + measure(link_class, duration)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
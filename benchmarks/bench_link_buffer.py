@@ -0,0 +1,134 @@
+"""Micro-benchmark of the link buffer: enqueue, transmit and weight
+lookups, against the previous buffers kept in two id-keyed deques.
+
+Usage: python benchmarks/bench_link_buffer.py [num_packets]
+"""
+import sys
+import time
+from collections import deque
+
+import simpy
+
+import bench_util
+from link import Link
+from packet import DataPacket
+
+
+class EndPoint(object):
+    """ Host or router stand-in that swallows delivered packets. """
+
+    def __init__(self, id):
+        self.id = id
+
+    def get_id(self):
+        return self.id
+
+    def receive_packet(self, packet):
+        pass
+
+
+class TwoDequeLink(Link):
+    """ Link with one deque per side keyed by device id, picking the
+        next packet by peeking both deques, as links used to do. """
+
+    def add_end_points(self, end_points):
+        self.end_points = end_points
+        self.device_ids = [end_points[0].get_id(), end_points[1].get_id()]
+        self.buffer = {self.device_ids[0]: deque(),
+                       self.device_ids[1]: deque()}
+        self.buffer_used = {self.device_ids[0]: 0, self.device_ids[1]: 0}
+
+    def enqueue(self, packet, src_id):
+        size = packet.get_length()
+        if self.buffer_used[src_id] + size > self.buffer_size:
+            self.packet_drop += 1
+        else:
+            self.buffer[src_id].append((packet, self.env.now))
+            self.buffer_used[src_id] += size
+            if not self.busy.triggered:
+                self.busy.succeed()
+
+    def buffer_empty(self):
+        return len(self.buffer[self.device_ids[0]]) + \
+               len(self.buffer[self.device_ids[1]]) == 0
+
+    def find_next_packet(self):
+        if len(self.buffer[self.device_ids[0]]) == 0:
+            return 1
+        elif len(self.buffer[self.device_ids[1]]) == 0:
+            return 0
+        packet_1, ts_1 = self.buffer[self.device_ids[0]][0]
+        packet_2, ts_2 = self.buffer[self.device_ids[1]][0]
+        return 0 if ts_1 <= ts_2 else 1
+
+    def transmit(self, env):
+        while True:
+            yield self.busy
+            while not self.buffer_empty():
+                idx = self.find_next_packet()
+                packet, ts = self.buffer[self.device_ids[idx]][0]
+                size = packet.get_length()
+                yield env.timeout(size / self.link_rate)
+                self.buffer_used[self.device_ids[idx]] -= size
+                self.buffer[self.device_ids[idx]].popleft()
+                self.send_packet(idx, packet)
+                self.transmitted_size += size
+            self.busy = self.env.event()
+
+    def get_buffer_occupancy(self):
+        return (self.buffer_used[self.device_ids[0]] +
+                self.buffer_used[self.device_ids[1]]) / \
+               (self.buffer_size * 2.0)
+
+    def get_weight(self):
+        return (self.buffer_used[self.device_ids[0]] +
+                self.buffer_used[self.device_ids[1]]) / \
+               self.link_rate + self.link_delay
+
+
+def measure(link_class, num_packets, repeat=3):
+    """ Returns the best enqueues/s, transmitted packets/s and weight
+        lookups/s out of repeat runs. """
+    return [max(rates) for rates in
+            zip(*[measure_once(link_class, num_packets)
+                  for _ in range(repeat)])]
+
+
+def measure_once(link_class, num_packets, burst=64):
+    env = simpy.Environment()
+    end_points = [EndPoint(0), EndPoint(1)]
+    # Buffers large enough to hold a whole burst.
+    link = link_class(env, 2, 10, 10, burst, end_points)
+    packet = DataPacket(0, 3, 1, 0, 1)
+
+    enqueue_time = 0.0
+    run_time = 0.0
+    for _ in range(num_packets // burst):
+        start = time.time()
+        for i in range(burst):
+            link.enqueue(packet, i & 1)
+        enqueue_time += time.time() - start
+        start = time.time()
+        env.run(until=env.now + 1000)
+        run_time += time.time() - start
+
+    start = time.time()
+    for _ in range(num_packets):
+        link.get_weight()
+    weight_time = time.time() - start
+
+    return (num_packets / enqueue_time, num_packets / run_time,
+            num_packets / weight_time)
+
+
+def main(argv):
+    num_packets = int(argv[0]) if argv else 200000
+    print('%-16s %14s %14s %14s' % ('buffer', 'enqueue/s', 'transmit/s',
+                                    'get_weight/s'))
+    for name, link_class in [('two deques', TwoDequeLink),
+                             ('one queue', Link)]:
+        print('%-16s %14.0f %14.0f %14.0f' %
+              tuple([name] + measure(link_class, num_packets)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+"""Memory and throughput of __slots__ packets and the packet pool on a long
+test_case_2 run.
+
+Usage: python benchmarks/bench_packet.py [duration_in_s]
+"""
+import sys
+
+import bench_util
+from packet import DataPacket, PacketPool
+
+
+class DictPacket(object):
+    """ Packet with the same fields as packet.Packet stored in a
+        per-instance dict, as packets used to be. """
+
+    def __init__(self, src, flow_id, dest, timestamp, length, packet_type,
+                 seq_num):
+        self.src = src
+        self.flow_id = flow_id
+        self.dest = dest
+        self.timestamp = timestamp
+        self.length = length
+        self.packet_type = packet_type
+        self.seq_num = seq_num
+
+
+class NoRecyclePool(PacketPool):
+    """ Pool that never reuses a packet. """
+
+    def release(self, packet):
+        pass
+
+
+class NoRecycleEnv(bench_util.CountingEnv):
+    """ Environment whose flows never get a recycled packet. """
+
+    def __init__(self, *args, **kwargs):
+        super(NoRecycleEnv, self).__init__(*args, **kwargs)
+        self.packet_pool = NoRecyclePool()
+
+
+def packet_bytes(packet):
+    """ Size of a packet object and of its attribute dict, if any. """
+    size = sys.getsizeof(packet)
+    if hasattr(packet, '__dict__'):
+        size += sys.getsizeof(packet.__dict__)
+    return size
+
+
+def measure(env_class, duration):
+    sim, wall = bench_util.run(bench_util.case_path('test_case_2'), duration,
+                               env_class=env_class)
+    pool = sim.packet_pool
+    packets = float(pool.num_allocated + pool.num_reused)
+    return pool.num_allocated, pool.num_allocated / packets, packets / wall
+
+
+def main(argv):
+    duration = int(argv[0]) if argv else 60
+    dict_size = packet_bytes(DictPacket(1, 2, 3, 4.0, 1024, 1, 5))
+    slots_size = packet_bytes(DataPacket(1, 2, 3, 4.0, 5))
+    print('bytes per packet: %d with a dict, %d with __slots__' %
+          (dict_size, slots_size))
+    print('%-12s %12s %12s %12s %12s' % ('pool', 'allocated', 'alloc/pkt',
+                                         'MB allocated', 'packets/s'))
+    for name, env_class in [('no recycling', NoRecycleEnv),
+                            ('free lists', bench_util.CountingEnv)]:
+        allocated, ratio, rate = measure(env_class, duration)
+        print('%-12s %12d %12.4f %12.2f %12.0f' %
+              (name, allocated, ratio, allocated * slots_size / 2.0 ** 20,
+               rate))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,82 @@
+"""Compares distance-vector and link state routing on grids of routers:
+time for the routes to converge, routing packets and the CPU time spent
+processing them, and simulation speed.
+
+Usage: python benchmarks/bench_routing.py [duration_in_s] [grid_size ...]
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+import bench_util
+import topology
+
+
+class ConvergenceEnv(bench_util.CountingEnv):
+    """ CountingEnv that records when every router first has a loop-free
+        route to every host. """
+
+    def __init__(self, *args, **kwargs):
+        super(ConvergenceEnv, self).__init__(*args, **kwargs)
+        self.converged_at = None
+
+    def loadNetwork(self, ifile):
+        super(ConvergenceEnv, self).loadNetwork(ifile)
+        self.links_by_id = dict((link.get_id(), link) for link in self.links)
+        self.process(self.probe(self))
+
+    def routes_complete(self):
+        for router in self.routers:
+            for host in self.hosts:
+                node = router
+                for _ in range(len(self.routers) + 1):
+                    lid = node.routing_table.get(host.get_id())
+                    if lid is None:
+                        return False
+                    link = self.links_by_id[lid]
+                    node = link.end_points[
+                        1 if link.end_points[0] is node else 0]
+                    if node is host:
+                        break
+                    if node in self.hosts:
+                        return False
+                else:
+                    return False
+        return True
+
+    def probe(self, env):
+        while not self.routes_complete():
+            yield env.timeout(1)
+        self.converged_at = env.now
+
+
+def measure(ifile, routing, duration):
+    sim, wall = bench_util.run(ifile, duration, env_class=ConvergenceEnv,
+                               routing=routing)
+    stats = sim.routing_stats()
+    return (sim.converged_at, stats['routing_packets'] / float(duration),
+            stats['routing_bytes'] / float(duration), stats['routing_time'],
+            sim.num_events / wall, wall)
+
+
+def main(argv):
+    duration = int(argv[0]) if argv else 10
+    sizes = [int(n) for n in argv[1:]] or [4, 8]
+    tmp = tempfile.mkdtemp()
+    try:
+        print('%-8s %-4s %12s %12s %12s %12s %12s %10s' %
+              ('grid', 'mode', 'converge ms', 'rt pkts/s', 'rt bytes/s',
+               'rt cpu s', 'events/s', 'wall s'))
+        for size in sizes:
+            ifile = os.path.join(tmp, 'grid_%d' % size)
+            topology.write(topology.grid(size, size), ifile)
+            for routing in ['dv', 'ls']:
+                print('%-8s %-4s %12s %12.0f %12.0f %12.2f %12.0f %10.2f' %
+                      (('%dx%d' % (size, size), routing) +
+                       measure(ifile, routing, duration)))
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
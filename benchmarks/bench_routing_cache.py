@@ -0,0 +1,66 @@
+"""Measures warm starts from the routing cache on grids of routers: time
+for the routes to converge and routing packets with empty tables and with
+cached ones, and the wall time spent computing the cache once and reading
+it afterwards.
+
+Usage: python benchmarks/bench_routing_cache.py [duration_in_s] [grid_size ...]
+"""
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+import bench_util
+import topology
+from bench_routing import ConvergenceEnv
+from input import input
+from routing_cache import converged_routes
+
+
+def measure(ifile, routing, duration, cache_dir):
+    network_specs = input(ifile)
+    start = time.time()
+    converged_routes(cache_dir, bench_util.CountingEnv, network_specs,
+                     routing, 100)
+    build = time.time() - start
+    start = time.time()
+    converged_routes(cache_dir, bench_util.CountingEnv, network_specs,
+                     routing, 100)
+    read = time.time() - start
+
+    results = []
+    for routing_cache in [None, cache_dir]:
+        sim, wall = bench_util.run(ifile, duration, env_class=ConvergenceEnv,
+                                   routing=routing,
+                                   routing_cache=routing_cache)
+        results += [sim.converged_at,
+                    sim.routing_stats()['routing_packets']]
+    return tuple(results) + (build, read)
+
+
+def main(argv):
+    duration = int(argv[0]) if argv else 10
+    sizes = [int(n) for n in argv[1:]] or [4, 8]
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    # The cache is computed there, away from router.txt of the working tree
+    os.chdir(tmp)
+    try:
+        print('%-8s %-4s %12s %12s %12s %12s %10s %10s' %
+              ('grid', 'mode', 'cold ms', 'cold pkts', 'warm ms',
+               'warm pkts', 'build s', 'read s'))
+        for size in sizes:
+            ifile = os.path.join(tmp, 'grid_%d' % size)
+            topology.write(topology.grid(size, size), ifile)
+            for routing in ['dv', 'ls']:
+                print('%-8s %-4s %12s %12d %12s %12d %10.2f %10.4f' %
+                      (('%dx%d' % (size, size), routing) +
+                       measure(ifile, routing, duration,
+                               os.path.join(tmp, 'cache'))))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
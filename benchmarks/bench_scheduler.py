@@ -0,0 +1,42 @@
+"""Event throughput of SimPy's binary heap against the calendar queue, on
+grids of routers generated by topology.py.
+
+Larger grids keep more events on the queue at once: more link timeouts
+and routing updates, and more flows crossing the grid.
+
+Usage: python benchmarks/bench_scheduler.py [duration_in_s] [grid_size ...]
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+import bench_util
+import topology
+
+
+def measure(ifile, scheduler, duration):
+    """ Returns (events, events/s, wall time). """
+    sim, wall = bench_util.run(ifile, duration, scheduler=scheduler)
+    return sim.num_events, sim.num_events / wall, wall
+
+
+def main(argv):
+    duration = int(argv[0]) if argv else 10
+    sizes = [int(n) for n in argv[1:]] or [4, 8, 16]
+    tmp = tempfile.mkdtemp()
+    try:
+        print('%-8s %-9s %12s %12s %10s' % ('grid', 'scheduler', 'events',
+                                            'events/s', 'wall s'))
+        for size in sizes:
+            ifile = os.path.join(tmp, 'grid_%d' % size)
+            topology.write(topology.grid(size, size, flows=2), ifile)
+            for scheduler in ['heap', 'calendar']:
+                print('%-8s %-9s %12d %12.0f %10.2f' %
+                      (('%dx%d' % (size, size), scheduler) +
+                       measure(ifile, scheduler, duration)))
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
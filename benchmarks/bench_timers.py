@@ -0,0 +1,76 @@
+"""Micro-benchmark of the retransmission timeouts: cancellable timers of
+the timer wheel against plain SimPy timeouts, as flows used to wait on.
+
+Every flow sends a window, waits for its acks or a retransmission
+timeout, and starts the next window as soon as the acks are in, like
+SendingFlow.run. The acks always arrive, so no timeout is ever needed.
+
+Usage: python benchmarks/bench_timers.py [num_flows] [duration_s]
+"""
+import random
+import sys
+import time
+
+import simpy
+
+import bench_util
+from timers import TimerWheel
+
+# Retransmission timeout and ack delays (in ms)
+RETRANSMIT_TIMEOUT = 300
+MIN_RTT = 50
+MAX_RTT = 100
+
+
+class CountingEnvironment(simpy.Environment):
+    """ Environment that counts scheduled events and the largest size of
+        the event queue. """
+
+    def __init__(self):
+        super(CountingEnvironment, self).__init__()
+        self.num_events = 0
+        self.max_queue = 0
+
+    def schedule(self, event, *args, **kwargs):
+        self.num_events += 1
+        super(CountingEnvironment, self).schedule(event, *args, **kwargs)
+        self.max_queue = max(self.max_queue, len(self._queue))
+
+
+def flow(env, rtt, wheel):
+    """ Process of a flow that always gets its acks after rtt ms. """
+    while True:
+        acked = env.timeout(rtt)
+        if wheel is None:
+            yield acked | env.timeout(RETRANSMIT_TIMEOUT)
+        else:
+            retransmit = wheel.timeout(RETRANSMIT_TIMEOUT)
+            yield acked | retransmit
+            retransmit.cancel()
+
+
+def measure(num_flows, duration, use_wheel):
+    """ Returns (events, largest event queue, wall time). """
+    random.seed(1)
+    env = CountingEnvironment()
+    wheel = TimerWheel(env) if use_wheel else None
+    for _ in range(num_flows):
+        env.process(flow(env, random.uniform(MIN_RTT, MAX_RTT), wheel))
+    start = time.time()
+    env.run(until=duration)
+    return env.num_events, env.max_queue, time.time() - start
+
+
+def main(argv):
+    num_flows = int(argv[0]) if argv else 2000
+    duration = (float(argv[1]) if len(argv) > 1 else 20) * \
+        bench_util.S_TO_MS
+    print('%d flows, %.0f s' % (num_flows, duration / bench_util.S_TO_MS))
+    print('%-16s %12s %12s %10s' % ('timeouts', 'events', 'max queue',
+                                    'wall (s)'))
+    for name, use_wheel in [('simpy timeout', False), ('timer wheel', True)]:
+        print('%-16s %12d %12d %10.2f' %
+              ((name,) + measure(num_flows, duration, use_wheel)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
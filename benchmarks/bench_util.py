@@ -0,0 +1,84 @@
+"""Helpers shared by the benchmark scripts.
+
+The benchmarks run the simulator headless in a scratch directory, so that
+router.txt and the results folder of the working tree are left alone.
+"""
+import os
+import sys
+import random
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..'))
+
+from env import MainEnv
+from host import Host
+from router import Router
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+S_TO_MS = 1000
+
+
+class CountingEnv(MainEnv):
+    """ MainEnv that counts scheduled events, started processes and
+        packets handed to a host or router by a link. """
+
+    def __init__(self, *args, **kwargs):
+        super(CountingEnv, self).__init__(*args, **kwargs)
+        self.num_events = 0
+        self.num_processes = 0
+        self.num_deliveries = 0
+
+    def schedule(self, event, *args, **kwargs):
+        self.num_events += 1
+        super(CountingEnv, self).schedule(event, *args, **kwargs)
+
+    def process(self, generator):
+        self.num_processes += 1
+        return super(CountingEnv, self).process(generator)
+
+
+def count_deliveries(cls):
+    """ Wraps cls.receive_packet so that every delivered packet is
+        counted by the CountingEnv of the receiver. """
+    receive_packet = cls.receive_packet
+
+    def counting_receive_packet(self, packet):
+        self.env.num_deliveries += 1
+        return receive_packet(self, packet)
+    cls.receive_packet = counting_receive_packet
+
+count_deliveries(Host)
+count_deliveries(Router)
+
+
+def case_path(name):
+    """ Returns the path of one of the test cases shipped with the repo. """
+    return os.path.join(ROOT, name)
+
+
+def run(ifile, duration, interval=0.5, update=0.1, env_class=CountingEnv,
+        seed=1, **kwargs):
+    """ Runs one headless simulation and returns (env, wall time in s).
+
+        Args:
+            duration, interval, update:
+                same as -t, -p and -r of simulator.py (in s)
+    """
+    random.seed(seed)
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.mkdir(os.path.join(tmp, 'results'))
+    os.chdir(tmp)
+    try:
+        env = env_class(duration * S_TO_MS, interval * S_TO_MS,
+                        update * S_TO_MS, None, headless=True, **kwargs)
+        start = time.time()
+        env.start(ifile)
+        wall = time.time() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+    return env, wall
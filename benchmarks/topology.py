@@ -0,0 +1,43 @@
+"""Generates larger network topologies for the benchmarks, in the input
+file format of the simulator (see input.py).
+"""
+import json
+
+
+def grid(rows, cols, flows=2, data_amt=20, flow_start=1.0, cc='FAST'):
+    """ Returns the specification of a rows x cols grid of routers, with
+        one host attached to each corner router. Flows go between opposite
+        corners, so they cross the whole grid.
+
+        Link rates, delays and buffers are the ones of the test cases.
+    """
+    def router(r, c):
+        return ['R', r * cols + c + 1]
+
+    links = []
+    for r in range(rows):
+        for c in range(cols):
+            if c + 1 < cols:
+                links.append([10, 10, 128, router(r, c), router(r, c + 1)])
+            if r + 1 < rows:
+                links.append([10, 10, 128, router(r, c), router(r + 1, c)])
+
+    corners = [(0, 0), (rows - 1, cols - 1), (0, cols - 1), (rows - 1, 0)]
+    for i, (r, c) in enumerate(corners):
+        links.append([12.5, 10, 128, ['H', i + 1], router(r, c)])
+
+    # Host 1 sends to host 2, host 3 to host 4, ...
+    specs = []
+    for i in range(min(flows, len(corners) // 2)):
+        specs.append([data_amt, flow_start, 2 * i + 1, 2 * i + 2, cc])
+
+    return {'Hosts': len(corners),
+            'Routers': rows * cols,
+            'Links': links,
+            'Flows': specs}
+
+
+def write(spec, fname):
+    """ Writes a topology specification to fname. """
+    with open(fname, 'w') as fout:
+        json.dump(spec, fout, indent=2)
@@ -0,0 +1,185 @@
+"""
+Checkpoints of the whole state of a simulation.
+
+A checkpoint is a pickle of the MainEnv, with every object of the network,
+the packets in the buffers, in flight and in the inboxes, the routing
+tables, the flow windows and counters, the timers, the metrics collected
+so far and the event queue, whose entries keep their ids. A simulation
+restored from it goes on exactly as the one that was saved would have.
+
+SimPy processes are generators, which cannot be pickled. A process is
+saved as its object, the name of its generator method and the arguments
+it was called with besides env. When restored, the method is called
+again, with the event the process waits for as wait if it takes one, and the new generator is run until its first yield,
+which must be that event. The process generators of the simulator are
+written so that they get there without side effects.
+"""
+
+import itertools
+import pickle
+import sys
+import types
+import inspect
+from simpy.events import Condition, Process, PENDING
+
+# Pickles of the network go deep
+RECURSION_LIMIT = 20000
+
+def new_process():
+    """ Returns an empty Process, its state is restored afterwards. """
+    return Process.__new__(Process)
+
+class CheckpointPickler(pickle.Pickler):
+    """ Pickler of the simulation state. It also saves the bound methods
+        used as callbacks, SimPy's condition functions and the counters
+        of itertools, and keeps the live processes in processes.
+    """
+    dispatch = pickle.Pickler.dispatch.copy()
+
+    def __init__(self, fout):
+        pickle.Pickler.__init__(self, fout, pickle.HIGHEST_PROTOCOL)
+        self.processes = []
+
+    def persistent_id(self, obj):
+        # The value of untriggered events, compared by identity
+        if obj is PENDING:
+            return 'PENDING'
+        return None
+
+    def save_method(self, method):
+        self.save_reduce(getattr, (method.im_self, method.im_func.__name__),
+                         obj=method)
+    dispatch[types.MethodType] = save_method
+
+    def save_function(self, function):
+        if function is Condition.any_events or \
+                function is Condition.all_events:
+            self.save_reduce(getattr, (Condition, function.__name__),
+                             obj=function)
+        else:
+            self.save_global(function)
+    dispatch[types.FunctionType] = save_function
+
+    def save_count(self, count):
+        # Counters cannot be read without being advanced: count(n)
+        self.save_reduce(itertools.count, (int(repr(count)[6:-1]),),
+                         obj=count)
+    dispatch[itertools.count] = save_count
+
+    def save_process(self, process):
+        state = dict(process.__dict__)
+        generator = process._generator
+        if generator.gi_frame is None:
+            # Finished
+            state['_generator'] = None
+        else:
+            frame = generator.gi_frame
+            code = frame.f_code
+            # Arguments after self and env, e.g. the direction of the
+            # delivery process of a link
+            args = dict((name, frame.f_locals[name])
+                        for name in code.co_varnames[2:code.co_argcount]
+                        if name != 'wait')
+            state['_generator'] = (frame.f_locals['self'],
+                                   generator.__name__, args,
+                                   frame.f_lasti >= 0)
+            self.processes.append(process)
+        self.save_reduce(new_process, (), state, obj=process)
+    dispatch[Process] = save_process
+
+class CheckpointUnpickler(pickle.Unpickler):
+    """ Unpickler of the simulation state. """
+
+    def persistent_load(self, pid):
+        if pid == 'PENDING':
+            return PENDING
+        raise pickle.UnpicklingError('unknown persistent id %r' % pid)
+
+def save_checkpoint(env, fname):
+    """ Saves the state of the simulation in env to fname. To be called
+        between two runs of env, e.g. after env.run(until=time). """
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, RECURSION_LIMIT))
+    try:
+        with open(fname, 'wb') as fout:
+            pickler = CheckpointPickler(fout)
+            pickler.dump(env)
+            # Same memo, so these are references to the processes of env
+            pickler.dump(pickler.processes)
+    finally:
+        sys.setrecursionlimit(limit)
+
+def resume_process(env, process):
+    """ Gives process a new generator that waits for its target. """
+    owner, name, args, started = process._generator
+    method = getattr(owner, name)
+    if 'wait' in inspect.getargspec(method).args:
+        generator = method(env, wait=process._target, **args)
+    else:
+        generator = method(env, **args)
+    process._generator = generator
+    # Not started yet, the generator is started by its Initialize event
+    if started:
+        target = next(generator)
+        if target is not process._target:
+            raise RuntimeError('%s of %r cannot be resumed' % (name, owner))
+
+def load_checkpoint(fname, ack_every=None, ack_delay=None, fast_alpha=None,
+                    scheduler=None, update_int=None, fast_forward=None):
+    """ Restores the simulation saved in fname, to be run by
+        env.run_to_end(). The restored simulation runs headless.
+
+        Args:
+            ack_every, ack_delay, scheduler, fast_forward:
+                if not None, replace the settings of the simulation (see
+                MainEnv)
+            fast_alpha:
+                if not None, replaces alpha for all the FAST flows,
+                running or not
+            update_int:
+                if not None, replaces the routing update interval (in ms)
+                of all the routers
+
+        Returns:
+            the MainEnv
+    """
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, RECURSION_LIMIT))
+    try:
+        with open(fname, 'rb') as fin:
+            unpickler = CheckpointUnpickler(fin)
+            env = unpickler.load()
+            processes = unpickler.load()
+    finally:
+        sys.setrecursionlimit(limit)
+
+    # Settings are changed before the processes read them again
+    if ack_every is not None:
+        env.ack_every = ack_every
+    if ack_delay is not None:
+        env.ack_delay = ack_delay
+    if fast_forward is not None:
+        env.fast_forward = fast_forward
+    if fast_alpha is not None:
+        env.fast_alpha = fast_alpha
+        controller = env.fast_controller
+        controller.alpha[:controller.num_slots] = fast_alpha
+        for flow in env.flows:
+            if flow is not None and flow.fast_slot is not None:
+                flow.alpha = fast_alpha
+    if update_int is not None:
+        env.update_int = update_int
+        for router in env.routers:
+            if router.update_interval is not None:
+                router.update_interval = update_int
+                router.hold_down = router.HOLD_DOWN * update_int
+    if scheduler is not None:
+        env.set_scheduler(scheduler)
+
+    for process in processes:
+        resume_process(env, process)
+
+    # The viewer needs the shared memory of a new simulation
+    env.headless = True
+    env.sim_time = env.record_time = env.plot_time = 0
+    return env
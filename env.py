@@ -1,13 +1,23 @@
 import simpy
 import time
+import types
+import heapq
+import functools
+import numpy as np
 
 from output import RealTimeGraph
 from input import input
 from host import Host
-from router import Router
-from link import Link
-from flow import Flow, SendingFlow
-import matplotlib.pyplot as plt
+from router import Router, LinkStateRouter
+from link import Link, DeliveryPriority
+from flow import Flow, SendingFlow, ReceivingFlow
+from packet import Packet, PacketPool
+from fast import FastController
+from timers import TimerWheel
+from scheduler import CalendarQueue
+from checkpoint import save_checkpoint
+from routing_cache import converged_routes
+from viewer import Viewer
 
 class MainEnv(simpy.Environment):
     """ The class for main environment for our network sumulator."""
@@ -26,13 +36,56 @@ class MainEnv(simpy.Environment):
                    'link_rate',
                   ]
 
-    def __init__(self, duration, interval, update_int, graph_type):
+    # Router class of each routing mode
+    ROUTERS = {'dv': Router,
+               'ls': LinkStateRouter,
+               'static': Router,
+              }
+
+    # Event queues, SimPy's binary heap or a calendar queue
+    SCHEDULERS = ['heap', 'calendar']
+
+    # Link class
+    LINK = Link
+
+    def __init__(self, duration, interval, update_int, graph_type,
+                 headless=False, routing='dv', ack_every=1,
+                 ack_delay=ReceivingFlow.ACK_DELAY, scheduler='heap',
+                 fast_alpha=SendingFlow.ALPHA, routing_cache=None,
+                 fast_forward=False, fast_timeout=SendingFlow.FAST_TIMEOUT):
         """
             Args:
                 duration:
                     user specified duration of simulation (in ms)
                 interval:
                     interval that env collects data at (in ms)
+                headless:
+                    if True, run without showing the real time graph
+                routing:
+                    routing mode, 'dv' (distance-vector), 'ls' (link
+                    state) or 'static' (shortest paths computed once at
+                    load time, no routing packets), see ROUTERS
+                ack_every:
+                    receiving flows acknowledge every ack_every data
+                    packets received in order (1 acknowledges each one)
+                ack_delay:
+                    time (in ms) after which a receiving flow sends the
+                    acknowledgment it has been holding back
+                scheduler:
+                    event queue, 'heap' or 'calendar' (see CalendarQueue)
+                fast_alpha:
+                    alpha parameter of the FAST TCP flows
+                fast_timeout:
+                    interval (in ms) at which the FAST TCP flows adjust
+                    their window size
+                routing_cache:
+                    directory of the cached converged routing tables (see
+                    routing_cache.py), the dynamic routers start with
+                    them. None to start with empty tables
+                fast_forward:
+                    if True, the simulation stops as soon as the network
+                    is idle for good (see quiescent), and the data points
+                    left are filled in with the ones of an idle network
 
             Attrs:
                 hosts:
@@ -49,12 +102,50 @@ class MainEnv(simpy.Environment):
                     interval that env collects data at (in ms)
                 update_int:
                     update interval for dynamic routing (in ms)
+                routing:
+                    routing mode
+                ack_every, ack_delay:
+                    delayed acknowledgment settings of the flows
+                scheduler:
+                    event queue in use
+                fast_alpha:
+                    alpha parameter of the FAST TCP flows
+                fast_timeout:
+                    interval (in ms) at which the FAST TCP flows adjust
+                    their window size
+                routing_cache:
+                    directory of the cached converged routing tables, or
+                    None
+                fast_forward:
+                    whether the simulation stops once the network is idle
+                idle_at:
+                    time (in ms) the simulation stopped at with
+                    fast_forward, or None
                 realTimeGraph:
                     realTimeGraph obj
                 maxId:
                     the max ID the network has assgined to any objs
+                packet_pool:
+                    PacketPool that recycles the data and ack packets
+                    of all the flows
+                fast_controller:
+                    FastController that adjusts the window size of all
+                    the FAST TCP flows
+                timers:
+                    TimerWheel of the cancellable retransmission timers
+                    of the flows
+                stats:
+                    the process that collects data, the simulation ends
+                    with it
+                viewer:
+                    Viewer that shows the real time graph from another
+                    process, unless running headless
+                sim_time, record_time, plot_time:
+                    wall clock time (in s) spent running the simulation,
+                    collecting data and exporting the results
         """
         super(MainEnv, self).__init__()
+        self.set_scheduler(scheduler)
         self.hosts = []
         self.flows = []
         self.routers = []
@@ -62,14 +153,104 @@ class MainEnv(simpy.Environment):
         self.duration = duration
         self.interval = interval
         self.update_int = update_int
+        self.routing = routing
+        self.ack_every = ack_every
+        self.ack_delay = ack_delay
+        self.fast_alpha = fast_alpha
+        self.fast_timeout = fast_timeout
+        self.routing_cache = routing_cache
+        self.fast_forward = fast_forward
+        self.idle_at = None
         self.graph_type = graph_type
+        self.headless = headless
         self.realTimeGraph = None
+        self.stats = None
+        self.viewer = None
         self.maxId = -1
+        self.packet_pool = PacketPool()
+        self.fast_controller = FastController(self)
+        self.timers = TimerWheel(self)
+
+        self.sim_time = 0
+        self.record_time = 0
+        self.plot_time = 0
     
         self.rfile = 'router.txt'
         with open(self.rfile, 'w') as fout:
             fout.write('Router info\n')
 
+    def set_scheduler(self, scheduler):
+        """ Sets up the event queue of scheduler, 'heap' or 'calendar',
+            with the events scheduled so far. """
+        entries = self.scheduled_entries()
+        self.scheduler = scheduler
+        if scheduler == 'calendar':
+            self._queue = CalendarQueue()
+            for entry in entries:
+                self._queue.push(entry)
+            self._push = self._queue.push
+            self._pop = self._queue.pop
+        else:
+            heapq.heapify(entries)
+            self._queue = entries
+            self._push = functools.partial(heapq.heappush, self._queue)
+            self._pop = functools.partial(heapq.heappop, self._queue)
+
+    def scheduled_entries(self):
+        """ Returns the (time, priority, id, event) entries of the event
+            queue, in no particular order. """
+        if isinstance(self._queue, CalendarQueue):
+            return [entry for bucket in self._queue.buckets
+                    for entry in bucket]
+        return list(self._queue)
+
+    def __getstate__(self):
+        """ State saved by a checkpoint (see checkpoint.py): everything but
+            the functions bound to the environment and its event queue,
+            and the viewer process. """
+        state = dict((name, value) for name, value in self.__dict__.items()
+                     if not isinstance(value, (types.MethodType,
+                                               functools.partial)))
+        state['viewer'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        simpy.core.BoundClass.bind_early(self)
+        self.set_scheduler(self.scheduler)
+
+    def schedule(self, event, priority=simpy.events.NORMAL, delay=0):
+        """ Schedules event with a given priority and delay (in ms) on
+            the event queue. """
+        self._push((self._now + delay, priority, next(self._eid), event))
+
+    def peek(self):
+        """ Returns the time of the next scheduled event, infinity if
+            there is none. """
+        if not len(self._queue):
+            return simpy.core.Infinity
+        if self.scheduler == 'calendar':
+            return self._queue.peek()[0]
+        return self._queue[0][0]
+
+    def step(self):
+        """ Processes the next event, as simpy.Environment.step does
+            from its heap. """
+        try:
+            self._now, _, _, event = self._pop()
+        except IndexError:
+            raise simpy.core.EmptySchedule()
+
+        callbacks, event.callbacks = event.callbacks, None
+        for callback in callbacks:
+            callback(event)
+
+        if not event._ok and not hasattr(event, '_defused'):
+            # The event has failed and has not been defused.
+            exc = type(event._value)(*event._value.args)
+            exc.__cause__ = event._value
+            raise exc
+
     def newId(self):
         self.maxId += 1
         return self.maxId
@@ -81,31 +262,34 @@ class MainEnv(simpy.Environment):
                 input:
                     string; input file name;
         """
+        self.buildNetwork(input(ifile))
 
-        network_specs = input(ifile)
+    def buildNetwork(self, network_specs):
+        """ Sets up the network topology and objects of network_specs,
+            the dictionary read from an input file (see input.py). """
 
+        # The graph is never drawn by the simulation itself, the viewer
+        # process reads its data points from shared memory.
         self.realTimeGraph = RealTimeGraph(self.duration,
                                            self.interval,
                                            self.graph_type,
                                            network_specs['Hosts'],
                                            len(network_specs['Links']),
-                                           len(network_specs['Flows']))
+                                           len(network_specs['Flows']),
+                                           True, not self.headless)
 
         for _ in range(network_specs['Hosts']):
             self.hosts.append(Host(self, self.newId()))
         
+        router_class = MainEnv.ROUTERS[self.routing]
+        # Static routers have no routing updates
+        update_int = self.update_int
+        if self.routing == 'static':
+            update_int = None
         for _ in range(network_specs['Routers']):
-            self.routers.append(Router(self, self.newId(), self.update_int))
+            self.routers.append(router_class(self, self.newId(),
+                                             update_int))
         
-        # Initialize static routing
-        if network_specs['Routers']:
-            objs = self.routers + self.hosts
-            routing = {
-                obj.get_id(): {
-                    obj2.get_id(): None for obj2 in objs} for obj in objs}
-            dist = {
-                obj.get_id(): {
-                    obj2.get_id(): -1 for obj2 in objs} for obj in objs}
 
         for rate, delay, buffer_size, node1, node2 in network_specs['Links']:
             # fetch endpoints
@@ -122,7 +306,8 @@ class MainEnv(simpy.Environment):
                     r = self.routers[id]
 
             # create link obj
-            link = Link(self, self.newId(), rate, delay, buffer_size, endpoints)
+            link = self.LINK(self, self.newId(), rate, delay, buffer_size,
+                             endpoints)
 
             # add link to the nodes
             for node in endpoints:
@@ -139,60 +324,244 @@ class MainEnv(simpy.Environment):
 
             src_host = self.hosts[src]
             dest_host = self.hosts[dest]
-            sending_flow = SendingFlow(self, self.newId(), data_amt, flow_start,
+            flow_id = self.newId()
+            if not self.owns(src_host):
+                # Simulated by another environment, see pdes.py
+                self.flows.append(None)
+                continue
+            sending_flow = SendingFlow(self, flow_id, data_amt, flow_start,
                                        dest_host.get_id(), src_host, cc)
 
             self.flows.append(sending_flow)
             src_host.add_flow(sending_flow)
 
-    def collectData(self):
-        """ Collects data from all the objects in the network. """
-        new_data = {}
-        fields = MainEnv.HOST_FIELDS + MainEnv.FLOW_FIELDS + MainEnv.LINK_FIELDS
-        for field in fields:
-            new_data[field] = []
-
-        for host in self.hosts:
+        if self.routing == 'static' and self.routers:
+            self.static_routing()
+        elif self.routing_cache is not None and self.routers:
+            self.warm_start(network_specs)
+
+    def owns(self, host):
+        """ Returns whether the flows of host are simulated by this
+            environment, always the case unless the network is split
+            between several environments (see pdes.py). """
+        return True
+
+    def static_routing(self):
+        """ Computes the shortest paths between all the nodes once with
+            the Floyd-Warshall algorithm, and installs the routing table
+            of every router. Paths never go through a host. """
+        nodes = self.routers + self.hosts
+        index = dict((node.get_id(), i) for i, node in enumerate(nodes))
+        n = len(nodes)
+        dist = np.full((n, n), np.inf)
+        np.fill_diagonal(dist, 0)
+        # next_link[i, j] is the first link on the path from i to j
+        next_link = np.full((n, n), -1, dtype=int)
+        for link in self.links:
+            i, j = [index[nid] for nid in link.device_ids]
+            weight = link.get_weight()
+            for a, b in [(i, j), (j, i)]:
+                if weight < dist[a, b]:
+                    dist[a, b] = weight
+                    next_link[a, b] = link.get_id()
+
+        for k in range(len(self.routers)):
+            through_k = dist[:, k, None] + dist[None, k, :]
+            shorter = through_k < dist
+            dist = np.where(shorter, through_k, dist)
+            next_link = np.where(shorter, next_link[:, k, None], next_link)
+
+        for i, router in enumerate(self.routers):
+            routing_table = {}
+            for j, node in enumerate(nodes):
+                if j != i and next_link[i, j] >= 0:
+                    routing_table[node.get_id()] = int(next_link[i, j])
+            router.add_static_routing(routing_table)
+
+    def warm_start(self, network_specs):
+        """ Installs the converged routes of every router, from the
+            routing cache or computed first by a simulation of the
+            routing alone by an environment of the same class (see
+            routing_cache.py). """
+        states = converged_routes(self.routing_cache, type(self),
+                                  network_specs, self.routing,
+                                  self.update_int)
+        for router in self.routers:
+            router.set_routing_state(states[router.get_id()])
+
+    def collectData(self, sample):
+        """ Collects data from all the objects in the network and writes
+            it into column sample of the preallocated metric arrays. """
+        data_points = self.realTimeGraph.data_points
+
+        for i, host in enumerate(self.hosts):
             host_data = host.report()
             for field in MainEnv.HOST_FIELDS:
-                new_data[field] += [host_data[field]]
+                data_points[field][i, sample] = host_data[field]
 
-        for flow in self.flows:
+        for i, flow in enumerate(self.flows):
+            if flow is None:
+                continue
             flow_data = flow.report()
             for field in MainEnv.FLOW_FIELDS:
-                new_data[field] += [flow_data[field]]
+                data_points[field][i, sample] = flow_data[field]
 
-        for link in self.links:
+        for i, link in enumerate(self.links):
             link_data = link.report()
             for field in MainEnv.LINK_FIELDS:
-                new_data[field] += [link_data[field]]
-
-        self.realTimeGraph.add_data_points(new_data)
-
+                data_points[field][i, sample] = link_data[field]
+
+        self.realTimeGraph.set_num_points(sample + 1)
+
+    def sample_timeout(self, at):
+        """ Returns an event that is triggered at time at, before any other
+            event scheduled for the same time. Data collected at that time
+            thus covers exactly the events that happened before it. """
+        event = simpy.events.Event(self)
+        event._ok = True
+        event._value = None
+        self.schedule(event, simpy.events.URGENT, at - self.now)
+        return event
+
+    def collect_stats(self, env, wait=None):
+        """ Process that collects data every interval until the end of the
+            simulation. A process restored from a checkpoint (see
+            checkpoint.py) is given the sample timeout it waits for. """
+        graph = self.realTimeGraph
+        for sample in range(graph.store.num_points, graph.num_samples + 1):
+            if wait is None:
+                wait = self.sample_timeout(min(env.now + self.interval,
+                                               self.duration))
+            yield wait
+            wait = None
+            start = time.time()
+            self.collectData(sample)
+            idle = (self.fast_forward and sample < graph.num_samples and
+                    self.quiescent())
+            if idle:
+                self.idle_at = env.now
+                self.fill_idle(sample + 1)
+            self.record_time += time.time() - start
+            if idle:
+                break
+
+    def quiescent(self):
+        """ Returns whether the network is idle for good: every flow is
+            done, and no data, ack or FIN packet is left in a link
+            buffer, on a link, in an inbox or held back by a receiving
+            flow. Routing packets do not count. """
+        for flow in self.flows:
+            if flow is not None and flow.end_time is None:
+                return False
 
-    def start(self, ifile):
+        for host in self.hosts:
+            if host.scheduled_sends:
+                return False
+            for flow in (host.flows or {}).values():
+                if flow.inbox or getattr(flow, 'ack_timer', None):
+                    return False
+        routing = Packet.PacketTypes.routing_update_packet
+        for link in self.links:
+            for packet, _ in link.buffer:
+                if packet.packet_type != routing:
+                    return False
+            for entry in link.pending:
+                if entry[2].packet_type != routing:
+                    return False
+            for packet in link.in_flight():
+                if packet.packet_type != routing:
+                    return False
+        for _, priority, _, event in self.scheduled_entries():
+            if (isinstance(priority, DeliveryPriority) and
+                    event._value.packet_type != routing):
+                return False
+        return True
+
+    def fill_idle(self, sample):
+        """ Fills in the data points from sample on with the ones of the
+            idle network: no traffic, no loss, empty buffers, and the
+            flows, all done, have no window and no RTT. """
+        graph = self.realTimeGraph
+        for values in graph.data_points.values():
+            values[:, sample:] = 0
+        graph.set_num_points(graph.num_samples + 1)
+
+    def start(self, ifile, checkpoint=None):
         """ Start our simulation.
 
             Args:
                 input:
                     Input file for network topology and stats
+                checkpoint:
+                    (time in ms, file name) to save the state of the
+                    simulation at that time (see checkpoint.py), or None
         """
 
         self.loadNetwork(ifile)
-
-        self.realTimeGraph.init_frame()
-        plt.show(block=False)
-        
-        while self.now < self.duration:
-            break_time = min(self.now + self.interval,
-                             self.duration)
-            self.run(until=break_time)
-            self.collectData()
-            self.realTimeGraph.draw()
-            plt.draw()
-
-        plt.show()
-
-        self.realTimeGraph.export_to_jpg()
+        # The whole simulation is a single run that ends with the last
+        # data collection.
+        self.stats = self.process(self.collect_stats(self))
+        self.run_to_end(checkpoint)
+
+    def run_to_end(self, checkpoint=None):
+        """ Runs the simulation until the last data collection, from the
+            start or from a restored checkpoint, and exports the results.
+        """
+        if not self.headless:
+            self.viewer = Viewer(self.realTimeGraph)
+            self.viewer.start()
+
+        start = time.time()
+        if checkpoint is not None:
+            at, fname = checkpoint
+            self.run(until=at)
+            # Counted with the export of the results
+            save_start = time.time()
+            save_checkpoint(self, fname)
+            self.plot_time += time.time() - save_start
+        self.run(until=self.stats)
+        self.sim_time += (time.time() - start - self.record_time -
+                          self.plot_time)
+
+        if self.viewer is not None:
+            self.viewer.finish()
+
+        # Plotting is optional after a headless run
+        start = time.time()
+        if not self.headless or self.graph_type is not None:
+            self.realTimeGraph.export_to_jpg()
         self.realTimeGraph.export_to_file()
-
+        self.plot_time += time.time() - start
+
+        self.print_timing()
+        if self.idle_at is not None:
+            print('Network idle from %.1f s, the data points left were '
+                  'filled in' % (self.idle_at / 1000.0))
+
+        # Keep the window open until the user closes it
+        if self.viewer is not None:
+            self.viewer.join()
+
+    def print_timing(self):
+        """ Prints the wall clock time spent in each part of the run. """
+        print('Simulated %.1f s in %.2f s (simulation: %.2f s, '
+              'recording: %.2f s, plotting/export: %.2f s)' %
+              (self.duration / 1000.0,
+               self.sim_time + self.record_time + self.plot_time,
+               self.sim_time, self.record_time, self.plot_time))
+        if self.routers:
+            stats = self.routing_stats()
+            print('Routing: %d packets (%.0f per simulated s), %d bytes, '
+                  '%.2f s of CPU time' %
+                  (stats['routing_packets'],
+                   stats['routing_packets'] / (self.now / 1000.0),
+                   stats['routing_bytes'], stats['routing_time']))
+
+    def routing_stats(self):
+        """ Returns the number and size of the routing packets sent by
+            all the routers, and the CPU time (in s) they spent
+            processing routing updates. """
+        return {'routing_packets': sum(r.routing_packets
+                                       for r in self.routers),
+                'routing_bytes': sum(r.routing_bytes for r in self.routers),
+                'routing_time': sum(r.routing_time for r in self.routers)}
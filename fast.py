@@ -0,0 +1,117 @@
+"""Window controller shared by all the FAST TCP flows."""
+
+import numpy as np
+
+class FastController(object):
+    """
+        Updates the window size of every FAST TCP flow.
+
+        Each flow used to run its own process that woke up every
+        fast_timeout ms to apply
+
+            w = w * base_rtt / rtt + alpha
+
+        The controller keeps window_size, rtt and base_rtt of all the FAST
+        flows in NumPy arrays indexed by a slot given to each flow, and
+        applies the update to all the flows that are due in one vectorized
+        step. A flow is due every fast_timeout ms after its start, so flows
+        that started together are updated by the same event. The flows
+        read and write their values in the arrays (see SendingFlow).
+    """
+
+    # Initial number of slots, doubled when full
+    SLOTS = 16
+
+    def __init__(self, env):
+        """
+            Args:
+                env:
+                    SimPy environment in which the flows reside.
+
+            Attributes:
+                window_size, rtt, base_rtt, alpha:
+                    FAST parameters of the flow in each slot
+                fast_timeout:
+                    interval (in ms) between the updates of each slot
+                next_update:
+                    time (in ms) of the next update of each slot
+                active:
+                    whether the flow in each slot is still sending
+                num_slots:
+                    number of slots given to flows so far
+                wake_time:
+                    time of the next update event, or None
+                num_updates:
+                    number of update events so far
+        """
+        self.env = env
+        self.window_size = np.zeros(FastController.SLOTS)
+        self.rtt = np.zeros(FastController.SLOTS)
+        self.base_rtt = np.zeros(FastController.SLOTS)
+        self.alpha = np.zeros(FastController.SLOTS)
+        self.fast_timeout = np.zeros(FastController.SLOTS)
+        self.next_update = np.zeros(FastController.SLOTS)
+        self.active = np.zeros(FastController.SLOTS, dtype=bool)
+        self.num_slots = 0
+        self.wake_time = None
+        self.num_updates = 0
+
+    def add_flow(self, window_size, rtt, base_rtt, alpha, fast_timeout):
+        """ Function to add a flow that starts now, returns its slot. """
+        slot = self.num_slots
+        if slot == len(self.active):
+            self.grow()
+        self.num_slots += 1
+        self.window_size[slot] = window_size
+        self.rtt[slot] = rtt
+        self.base_rtt[slot] = base_rtt
+        self.alpha[slot] = alpha
+        self.fast_timeout[slot] = fast_timeout
+        self.next_update[slot] = self.env.now + fast_timeout
+        self.active[slot] = True
+        self.schedule(self.next_update[slot])
+        return slot
+
+    def remove_flow(self, slot):
+        """ Function to stop updating the flow in slot, its window size
+            is set to 0 for reporting. """
+        self.active[slot] = False
+        self.window_size[slot] = 0
+
+    def grow(self):
+        """ Function to double the number of slots. """
+        for name in ('window_size', 'rtt', 'base_rtt', 'alpha',
+                     'fast_timeout', 'next_update', 'active'):
+            array = getattr(self, name)
+            grown = np.zeros(2 * len(array), dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def schedule(self, time):
+        """ Function to make sure an update event happens at time. """
+        if self.wake_time is not None and self.wake_time <= time:
+            return
+        self.wake_time = time
+        # Not a process, a callback of the timeout
+        wake = self.env.timeout(time - self.env.now)
+        wake.callbacks.append(self.update)
+
+    def update(self, event):
+        """ Callback that updates the window size of the due flows and
+            schedules the next update. Updates that are not due anymore
+            find no flow to update. """
+        now = self.env.now
+        if self.wake_time == now:
+            self.wake_time = None
+        n = self.num_slots
+        active = self.active[:n]
+        due = active & (self.next_update[:n] <= now)
+        if due.any():
+            self.num_updates += 1
+            window_size = self.window_size[:n]
+            window_size[due] = window_size[due] * self.base_rtt[:n][due] \
+                * 1.0 / self.rtt[:n][due] + self.alpha[:n][due]
+            assert((window_size[due] > 0).all())
+            self.next_update[:n][due] += self.fast_timeout[:n][due]
+        if active.any():
+            self.schedule(self.next_update[:n][active].min())
@@ -1,6 +1,7 @@
 """Defines the properties and methods of network flow processes."""
 
-from packet import Packet, DataPacket, AckPacket, FINPacket
+from collections import deque
+from packet import Packet, FINPacket
 
 class Flow(object):
     """
@@ -25,11 +26,13 @@ class Flow(object):
                    env, flow_id, src_host, dest_host_id as above.
                    src_host_id:
                        ID of source host.
-                   received_packets:
-                       List of packets received so far.
+                   inbox:
+                       Deque of the packets delivered and not taken by the
+                       flow yet, in arrival order.
                    receive_packet_event:
                        Internal event triggered when host wants to deliver 
-                       packets to the flow.
+                       packets to the flow. It fires once for all the
+                       packets delivered until the flow takes them.
                    num_packets_received:
                        Number of packets received since interval start time. Needed
                        to calculate RTT delay.                 
@@ -49,8 +52,8 @@ class Flow(object):
 
         self.dest_host_id = dest_host_id
 
-        # Set up received_packets buffer. May be useful for congestion control.
-        self.received_packets = []
+        # Set up the inbox of delivered packets.
+        self.inbox = deque()
 
         # Initialize for metrics reporting.
         self.num_packets_received = 0
@@ -77,8 +80,8 @@ class Flow(object):
 
     def receive_packet(self, incoming_packet):
         """Method called by flow's source host to transmit packet to flow."""
-        # Add packet to flow's received_packets buffer.
-        self.received_packets.append(incoming_packet)
+        # Add packet to flow's inbox.
+        self.inbox.append(incoming_packet)
         self.num_packets_received += 1      
         self.amt_data_received += incoming_packet.get_length()
 
@@ -86,6 +89,14 @@ class Flow(object):
         if not self.receive_packet_event.triggered:
             self.receive_packet_event.succeed()
 
+    def take_packets(self):
+        """Returns the packets delivered since the last call, in arrival
+           order, and sets up a new receive_packet_event for the next ones."""
+        packets = self.inbox
+        self.inbox = deque()
+        self.receive_packet_event = self.env.event()
+        return packets
+
     def send_packet(self, outgoing_packet):
         """Method called by flow to send packet."""
         self.src_host.send_packet(outgoing_packet)
@@ -107,6 +118,9 @@ class SendingFlow(Flow):
                MS_TO_S: Conversion factor.
                DATA_PCK_SIZE: Size of data packet in bytes.
                DUP_ACK: Max number of duplicate acknowledgments.
+               ALPHA: Default FAST TCP alpha parameter.
+               FAST_TIMEOUT: Default interval (in ms) for FAST to adjust
+                   the window size.
     """
     MB_TO_BYTES = 2 ** 20
     B_TO_MBITS = 1.0/(MB_TO_BYTES) * 8
@@ -114,6 +128,8 @@ class SendingFlow(Flow):
     MS_TO_S = 0.001
     DATA_PCK_SIZE = 1024
     DUP_ACK = 3
+    ALPHA = 50
+    FAST_TIMEOUT = 500
 
     def __init__(self, env, flow_id, data_amt_MB, start_time_s, 
       dest_host_id=None, src_host=None, congestion_control='FAST'):
@@ -151,11 +167,12 @@ class SendingFlow(Flow):
                    end_time:
                        Time in ms when flow is done transmitting data. Needed 
                        for data reporting.
-                   received_packets:
-                       List of packets received so far.
+                   inbox:
+                       Deque of the packets delivered and not taken by the
+                       flow yet, in arrival order.
                    receive_packet_event:
-                       Internal event triggered when host wants to deliver a 
-                       packet to the flow.
+                       Internal event triggered when host wants to deliver 
+                       packets to the flow.
                    received_fin_event:
                        Internal event triggered when a fin packet has been received. 
                    received_batch_event:
@@ -186,6 +203,13 @@ class SendingFlow(Flow):
                        RTT of the latest packet (in ms)
                    cc:
                        Congestion control algorithm. 
+                   phase:
+                       What the flow waits for: its start time ('start'),
+                       the last packet of the window to leave ('window'),
+                       the acks of the window ('acks'), the FIN packet of
+                       the receiver ('fin'), or nothing once done ('done').
+                   retransmit:
+                       Retransmission timer of the window or FIN packet.
  
                    (FAST specific parameters)
                    base_rtt:
@@ -194,6 +218,10 @@ class SendingFlow(Flow):
                        Parameter for FAST TCP.
                    fast_timeout:
                        Interval for FAST to adjust window size (in ms).
+                   fast_slot:
+                       Slot of the flow in the env's FastController once
+                       it has started, None before. window_size, rtt and
+                       base_rtt are then kept in the controller's arrays.
 
                    (Tahoe specific parameters)
                    ssthresh:
@@ -204,15 +232,23 @@ class SendingFlow(Flow):
                        Fast retransmit counter for tahoe.
                    last_dup:
                        Last time we recognized a duplicate acknowledgment
+                   scheduled_sends:
+                       Deque of (time, size) of the data packets of the
+                       current window, counted in amt_data_sent once
+                       their time has passed.
         """       
         super(SendingFlow, self).__init__(env, flow_id, dest_host_id, src_host)
 
+        # Not managed by the FAST controller until the flow starts.
+        self.fast_slot = None
         self.data_amt = data_amt_MB * SendingFlow.MB_TO_BYTES
         self.start_time = start_time_s * SendingFlow.S_TO_MS
         # Flow has not ended yet.
         self.end_time = None
         # Congestion control algorithm
         self.cc = congestion_control
+        self.phase = 'start'
+        self.retransmit = None
          
         # Initialized to 0 for reporting.
         self.window_start_time = None
@@ -231,6 +267,7 @@ class SendingFlow(Flow):
 
         # Initialize field for metrics reporting.
         self.sum_RTT_delay = 0
+        self.scheduled_sends = deque()
         # Default to 1 s.
         self.rtt = 1000
 
@@ -264,16 +301,49 @@ class SendingFlow(Flow):
         self.window_size = 1.0
         self.is_CA = False
 
-    def FAST(self, env):
-        ''' Congestion control algorithm using FAST TCP '''
-        while self.end_time == None:
-            yield env.timeout(self.fast_timeout)
-            # Adjust window size
-            self.set_window_size(self.window_size * self.base_rtt * 1.0 / \
-                self.rtt + self.alpha)
-        self.window_size = 0
+    @property
+    def window_size(self):
+        """Window size, read from the FAST controller for FAST flows."""
+        if self.fast_slot is None:
+            return self._window_size
+        return float(self.env.fast_controller.window_size[self.fast_slot])
+
+    @window_size.setter
+    def window_size(self, window_size):
+        if self.fast_slot is None:
+            self._window_size = window_size
+        else:
+            self.env.fast_controller.window_size[self.fast_slot] = window_size
+
+    @property
+    def rtt(self):
+        """RTT of the latest packet (in ms)."""
+        if self.fast_slot is None:
+            return self._rtt
+        return float(self.env.fast_controller.rtt[self.fast_slot])
+
+    @rtt.setter
+    def rtt(self, rtt):
+        if self.fast_slot is None:
+            self._rtt = rtt
+        else:
+            self.env.fast_controller.rtt[self.fast_slot] = rtt
+
+    @property
+    def base_rtt(self):
+        """Minimum RTT seen so far (in ms), FAST only."""
+        if self.fast_slot is None:
+            return self._base_rtt
+        return float(self.env.fast_controller.base_rtt[self.fast_slot])
+
+    @base_rtt.setter
+    def base_rtt(self, base_rtt):
+        if self.fast_slot is None:
+            self._base_rtt = base_rtt
+        else:
+            self.env.fast_controller.base_rtt[self.fast_slot] = base_rtt
 
-    def run(self, env):
+    def run(self, env, wait=None):
         """
             Implements the functionality of a sending flow.
 
@@ -286,37 +356,34 @@ class SendingFlow(Flow):
             
             batch_start is initially 1. It is incremented when an ack
             packet for batch_start is received. 
-        """
-        # Passivate until start time.
-        yield env.timeout(self.start_time)
 
-        # Default window size and timeout.
-        if self.cc == "FAST":
-            self.window_size = 20
-            self.alpha = 0.75 * self.src_host.get_buffer_size() / \
-                (1000 * self.src_host.get_num_flows())
-            self.alpha = 50
-            # Set the update interval to 0.5s for a smaller alpha, 
-            # to see finer results
-            if self.alpha == 50:
-                self.fast_timeout = 500 
-        else:
-            # Slow start for Tahoe
-            self.window_size = 1
-  
-        # Process to handle incoming packets.
-        if self.cc == "FAST":
-            env.process(self.FAST_monitor_incoming_pkts(env))
-            env.process(self.FAST(env))
-        else:
-            env.process(self.tahoe_monitor_incoming_pkts(env))
- 
-        while self.data_amt > 0:
-            yield env.process(self.send_data(env))
-            # Passivate until all ack packets received or timeout occurs. 
-            yield self.received_batch_event | env.timeout(self.retransmit_timeout)
+            A flow restored from a checkpoint (see checkpoint.py) is given
+            the event it waits for, and goes on from its phase.
+        """
+        if self.phase == 'start':
+            # Passivate until start time.
+            if wait is None:
+                wait = env.timeout(self.start_time)
+            yield wait
+            wait = None
+            self.start_sending(env)
+            self.phase = 'window' if self.data_amt > 0 else 'fin'
+
+        while self.phase in ('window', 'acks'):
+            if self.phase == 'window':
+                if wait is None:
+                    wait = self.send_data(env)
+                yield wait
+                # Passivate until all ack packets received or timeout
+                # occurs.
+                self.retransmit = env.timers.timeout(self.retransmit_timeout)
+                wait = self.received_batch_event | self.retransmit
+                self.phase = 'acks'
+            yield wait
+            wait = None
 
             if self.received_batch_event.triggered:
+                self.retransmit.cancel()
                 self.received_batch_event = env.event()
             # Tahoe - packet loss (divide by 2 for multiple losses in same window).
             elif self.cc == "Tahoe":
@@ -324,127 +391,174 @@ class SendingFlow(Flow):
 
             # Adjust retransmit timeout
             self.set_retransmit_timeout(3 * self.rtt)
-            
+            self.phase = 'window' if self.data_amt > 0 else 'fin'
+
         # All the data has been sent. Send FIN packet.
-        fin_resend = True
-        while fin_resend:
-            fin_packet = FINPacket(self.src_host_id, self.flow_id, 
-                                   self.dest_host_id, env.now, -1) 
-            self.send_packet(fin_packet)
-            # Passivate until a FIN packet is received or timeout occurs.
-            yield self.received_fin_event | env.timeout(self.retransmit_timeout)         
+        while self.phase == 'fin':
+            if wait is None:
+                fin_packet = FINPacket(self.src_host_id, self.flow_id, 
+                                       self.dest_host_id, env.now, -1) 
+                self.send_packet(fin_packet)
+                # Passivate until a FIN packet is received or timeout
+                # occurs.
+                self.retransmit = env.timers.timeout(self.retransmit_timeout)
+                wait = self.received_fin_event | self.retransmit
+            yield wait
+            wait = None
             if (self.received_fin_event.triggered):
-                fin_resend = False            
+                self.retransmit.cancel()
+                self.phase = 'done'
  
         # Set to 0 for reporting.
         self.window_size = 0
+        if self.fast_slot is not None:
+            env.fast_controller.remove_flow(self.fast_slot)
         # End flow.
         self.end_time = env.now
         #self.end_flow()      
-        
+
+    def start_sending(self, env):
+        """Sets up the window and the processes of the flow at its start
+        time."""
+        # Default window size and timeout.
+        if self.cc == "FAST":
+            self.window_size = 20
+            self.alpha = 0.75 * self.src_host.get_buffer_size() / \
+                (1000 * self.src_host.get_num_flows())
+            self.alpha = env.fast_alpha
+            # Update window size every fast_timeout ms, whatever alpha is
+            self.fast_timeout = env.fast_timeout
+        else:
+            # Slow start for Tahoe
+            self.window_size = 1
+  
+        # Process to handle incoming packets.
+        if self.cc == "FAST":
+            env.process(self.FAST_monitor_incoming_pkts(env))
+            # The window is adjusted by the controller shared by all
+            # the FAST flows.
+            self.fast_slot = env.fast_controller.add_flow(
+                self.window_size, self.rtt, self.base_rtt, self.alpha,
+                self.fast_timeout)
+        else:
+            env.process(self.tahoe_monitor_incoming_pkts(env))
+
     def FAST_monitor_incoming_pkts(self, env):
         """ Process to handle incoming packets for FAST """
-        while self.data_amt > 0:
+        while True:
             yield self.receive_packet_event
-            received_packet = self.received_packets.pop()
-         
-            # Throw error if packet not an ack packet.
-            assert(received_packet.get_packet_type() == 
-                    Packet.PacketTypes.ack_packet)   
-            
-            req_num = received_packet.get_seq_num()     
-            
-            # Update current RTT, base RTT, sum RTT
-            self.rtt = self.env.now - received_packet.get_timestamp()
-            self.base_rtt = min(self.rtt, self.base_rtt) 
-            self.sum_RTT_delay += self.rtt
-
-            # Reset event
-            self.receive_packet_event = env.event()
-            
-            # Ignore ack packets from previous window iterations.
-            if (received_packet.get_timestamp() < self.window_start_time):
-               continue
+            for received_packet in self.take_packets():
+                if (received_packet.get_packet_type() ==
+                        Packet.PacketTypes.fin_packet):
+                    assert(received_packet.get_seq_num() == -1)
+                    self.received_fin_event.succeed()
+                    return
+
+                # Throw error if packet not an ack packet.
+                assert(received_packet.get_packet_type() == 
+                        Packet.PacketTypes.ack_packet)   
+                
+                req_num = received_packet.get_seq_num()     
+                timestamp = received_packet.get_timestamp()
+                # The ack packet is not needed anymore, recycle it.
+                self.env.packet_pool.release(received_packet)
+
+                # Late ack packets once all the data has been acknowledged.
+                if self.data_amt <= 0:
+                    continue
+                
+                # Update current RTT, base RTT, sum RTT
+                self.rtt = self.env.now - timestamp
+                self.base_rtt = min(self.rtt, self.base_rtt) 
+                self.sum_RTT_delay += self.rtt
+                
+                # Ignore ack packets from previous window iterations.
+                if (timestamp < self.window_start_time):
+                   continue
 
-            if (req_num > self.batch_start):
-                self.data_amt -= (req_num - self.batch_start) * \
-                                  SendingFlow.DATA_PCK_SIZE
-                self.batch_start = req_num
+                if (req_num > self.batch_start):
+                    self.data_amt -= (req_num - self.batch_start) * \
+                                      SendingFlow.DATA_PCK_SIZE
+                    self.batch_start = req_num
 
-            if (self.batch_start == self.window_end + 1):
-                self.received_batch_event.succeed()
-        
-        yield self.receive_packet_event
-        received_packet = self.received_packets.pop()   
-        
-        if (received_packet.get_packet_type() == 
-                Packet.PacketTypes.fin_packet):     
-            assert(received_packet.get_seq_num() == -1)
-            self.received_fin_event.succeed() 
+                if (self.batch_start == self.window_end + 1 and
+                        not self.received_batch_event.triggered):
+                    self.received_batch_event.succeed()
 
     def tahoe_monitor_incoming_pkts(self, env):
         """ Process to handle incoming packets for Tahoe """
-        while self.data_amt > 0:
+        while True:
             yield self.receive_packet_event
-            received_packet = self.received_packets.pop()
-
-            # Throw error if packet not an ack packet.
-            assert(received_packet.get_packet_type() ==
-                    Packet.PacketTypes.ack_packet)
-
-            req_num = received_packet.get_seq_num()
-
-            # Update sum RTT
-            self.rtt = self.env.now - received_packet.get_timestamp()
-            self.sum_RTT_delay += self.rtt
-
-            # Reset event
-            self.receive_packet_event = env.event()
-
-            # Ignore ack packets from previous window iterations.
-            if (received_packet.get_timestamp() < self.window_start_time):
-                continue  
-                
-            if (req_num > self.batch_start):
-                self.data_amt -= (req_num - self.batch_start) * \
-                                  SendingFlow.DATA_PCK_SIZE
-                self.dup_ack = 0
-                # CA
-                if self.is_CA:
-                    for i in range(req_num - self.batch_start):
-                      self.window_size += 1.0 / self.window_size
-                # SS
-                else:
-                    self.window_size += 1
-                    if self.window_size >= self.ssthresh:
-                        self.is_CA = True  
-
-                self.batch_start = req_num
-               
-            elif req_num == self.batch_start:
-                if self.env.now - self.last_dup >= 16:
-                    self.dup_ack += 1
-                    self.last_dup = self.env.now
-
-                if self.dup_ack == SendingFlow.DUP_ACK:
-                    data_packet = DataPacket(self.src_host_id, self.flow_id, 
-                                             self.dest_host_id, self.env.now,
-                                             self.batch_start)
-                    self.send_packet(data_packet)
+            for received_packet in self.take_packets():
+                if (received_packet.get_packet_type() ==
+                        Packet.PacketTypes.fin_packet):
+                    self.received_fin_event.succeed()
+                    return
+
+                # Throw error if packet not an ack packet.
+                assert(received_packet.get_packet_type() ==
+                        Packet.PacketTypes.ack_packet)
+
+                req_num = received_packet.get_seq_num()
+                timestamp = received_packet.get_timestamp()
+                # The ack packet is not needed anymore, recycle it.
+                self.env.packet_pool.release(received_packet)
+
+                # Late ack packets once all the data has been acknowledged.
+                if self.data_amt <= 0:
+                    continue
+
+                # Update sum RTT
+                self.rtt = self.env.now - timestamp
+                self.sum_RTT_delay += self.rtt
+
+                # Ignore ack packets from previous window iterations.
+                if (timestamp < self.window_start_time):
+                    continue  
+                    
+                if (req_num > self.batch_start):
+                    self.data_amt -= (req_num - self.batch_start) * \
+                                      SendingFlow.DATA_PCK_SIZE
                     self.dup_ack = 0
-                    self.enter_slow_start() 
-                
-            if (self.batch_start == self.window_end + 1):
-                self.received_batch_event.succeed()
-
-        yield self.receive_packet_event
-        received_packet = self.received_packets.pop()
-
-        if (received_packet.get_packet_type() == Packet.PacketTypes.fin_packet):
-            self.received_fin_event.succeed()
+                    # CA
+                    if self.is_CA:
+                        for i in range(req_num - self.batch_start):
+                          self.window_size += 1.0 / self.window_size
+                    # SS, grows by the packets acknowledged, up to the
+                    # number of packets a delayed acknowledgment covers.
+                    else:
+                        self.window_size += min(req_num - self.batch_start,
+                                                self.env.ack_every)
+                        if self.window_size >= self.ssthresh:
+                            self.is_CA = True  
+
+                    self.batch_start = req_num
+                   
+                elif req_num == self.batch_start:
+                    if self.env.now - self.last_dup >= 16:
+                        self.dup_ack += 1
+                        self.last_dup = self.env.now
+
+                    if self.dup_ack == SendingFlow.DUP_ACK:
+                        data_packet = self.env.packet_pool.data_packet(
+                            self.src_host_id, self.flow_id, self.dest_host_id,
+                            self.env.now, self.batch_start, True)
+                        self.send_packet(data_packet)
+                        self.dup_ack = 0
+                        self.enter_slow_start() 
+                    
+                if (self.batch_start == self.window_end + 1 and
+                        not self.received_batch_event.triggered):
+                    self.received_batch_event.succeed()
 
     def send_data(self, env):
-        """Sends a batch of data packets starting at batch_start."""
+        """Sends a batch of data packets starting at batch_start.
+
+           The packets leave back to back at the host's link rate. Their
+           departure times are known when the window starts, so the whole
+           window is handed to the host at once. Returns the event that
+           fires when the last packet of the window has left.
+        """
         seq_num = self.batch_start    
         
         self.window_start_time = self.env.now
@@ -455,14 +569,29 @@ class SendingFlow(Flow):
             self.window_end = int(self.data_amt / SendingFlow.DATA_PCK_SIZE) \
                 + self.batch_start - 1
 
+        interval = SendingFlow.DATA_PCK_SIZE / self.src_host.get_link_rate()
+        departure_time = self.env.now
+        departures = []
         while (seq_num <= self.window_end):
-            data_packet = DataPacket(self.src_host_id, self.flow_id, 
-                                     self.dest_host_id, self.env.now,
-                                     seq_num)      
-            self.send_packet(data_packet)
+            # The last packet of the window is acknowledged right away.
+            data_packet = self.env.packet_pool.data_packet(
+                self.src_host_id, self.flow_id, self.dest_host_id,
+                departure_time, seq_num, seq_num == self.window_end)
+            departures.append((departure_time, data_packet))
+            self.scheduled_sends.append((departure_time, data_packet.length))
             seq_num += 1
-            yield env.timeout(SendingFlow.DATA_PCK_SIZE  /
-                self.src_host.get_link_rate())
+            # Accumulated like the timeouts of one packet at a time would
+            departure_time += interval
+        if departures:
+            self.src_host.send_burst(departures)
+        return env.timeout(departure_time - self.env.now)
+
+    def count_scheduled_sends(self):
+        """Adds the data packets that have left by now to amt_data_sent."""
+        scheduled = self.scheduled_sends
+        now = self.env.now
+        while scheduled and scheduled[0][0] < now:
+            self.amt_data_sent += scheduled.popleft()[1]
                         
     def get_reporting_interval(self):
         """Calculates the appropriate interval (in s) over which averaging 
@@ -494,6 +623,7 @@ class SendingFlow(Flow):
            If the flow has not yet started or it has ended in a previous 
            reporting interval, (0, 0, 0) is returned.
         """     
+        self.count_scheduled_sends()
         # Time passed in s.
         time_interval = self.get_reporting_interval()
         assert(time_interval > 0)
@@ -526,7 +656,21 @@ class SendingFlow(Flow):
 class ReceivingFlow(Flow):
     """
         A receiving flow receives data packets and sends acknowledgments.
+
+        Acknowledgments are cumulative. In delayed acknowledgment mode
+        (env.ack_every > 1) the flow acknowledges every ack_every data
+        packets received in order, or ack_delay ms after the first one it
+        holds back, whichever comes first. A packet received out of order
+        is acknowledged right away, so that the sender sees duplicate
+        acknowledgments as before, and so is a packet the sender pushes:
+        the last one of each window, that the sender waits for.
+
+        Attributes:
+               ACK_DELAY: Default delay (in ms) of a held back acknowledgment.
     """
+
+    ACK_DELAY = 10
+
     def __init__(self, env, flow_id, dest_host_id=None, src_host=None):
         """
             Sets up a receiving flow object.
@@ -545,11 +689,12 @@ class ReceivingFlow(Flow):
                    env, flow_id, src_host and dest_host_id as above.
                    src_host_id:
                        ID of source host.
-                   received_packets:
-                       List of packets received so far.
+                   inbox:
+                       Deque of the packets delivered and not taken by the
+                       flow yet, in arrival order.
                    receive_packet_event:
-                       Internal event triggered when host wants to deliver a 
-                       packet to the flow.
+                       Internal event triggered when host wants to deliver 
+                       packets to the flow.
                    num_packets_sent:
                        Number of packets sent since interval start time. Needed
                        to calculate RTT delay.                 
@@ -559,12 +704,25 @@ class ReceivingFlow(Flow):
                        Data received since interval start time (in bytes).
                    req_num:
                        Sequence number of packet to be requested.
+                   num_unacked:
+                       Number of data packets received in order and not
+                       acknowledged yet.
+                   ack_timestamp:
+                       Timestamp of the latest data packet not acknowledged
+                       yet, echoed by the acknowledgment.
+                   ack_timer:
+                       Timer of the acknowledgment held back, or None.
         """       
         super(ReceivingFlow, self).__init__(env, flow_id, dest_host_id, src_host)
 
         # First packet to be received.
         self.req_num = 1
 
+        # Delayed acknowledgment.
+        self.num_unacked = 0
+        self.ack_timestamp = None
+        self.ack_timer = None
+
         # Add the run generator to the event queue.
         self.env.process(self.run(env))
 
@@ -572,44 +730,74 @@ class ReceivingFlow(Flow):
         """
             Implements the functionality of a receiving flow.
 
-            In this implementation, the flow simply sends an ACK packet upon
-            receiving a data packet. 
+            In this implementation, the flow sends an ACK packet upon
+            receiving a data packet, or upon receiving ack_every of them
+            in delayed acknowledgment mode. All the packets delivered
+            since the flow last woke up are handled in arrival order.
         """
-        while True:
-             # Passivate until packet received.
+        ack_every = env.ack_every
+        fin_received = None
+        while fin_received is None:
+             # Passivate until packets received.
             yield self.receive_packet_event
 
-            received_packet = self.received_packets.pop()                       
-            if (received_packet.get_packet_type() == Packet.PacketTypes.data_packet):
+            for received_packet in self.take_packets():
+                if (received_packet.get_packet_type() ==
+                        Packet.PacketTypes.fin_packet):
+                    fin_received = received_packet
+                    break
+
+                # Throw error if packet is not a data packet.
+                assert(received_packet.get_packet_type() ==
+                       Packet.PacketTypes.data_packet)
                 # Create new ack packet with req_num.
                 # ack packet has the same timestamp as the corresponding data packet.
                 # This is useful for calculating RTT delay.
-                if (received_packet.get_seq_num() == self.req_num):
+                in_order = received_packet.get_seq_num() == self.req_num
+                if in_order:
                     self.req_num += 1
-
-                ack_packet = AckPacket(self.src_host_id, self.flow_id, 
-                                       self.dest_host_id, received_packet.get_timestamp(), 
-                                       self.req_num)
+                    self.num_unacked += 1
+                self.ack_timestamp = received_packet.get_timestamp()
+                push = received_packet.push
+                # The data packet is not needed anymore, recycle it.
+                self.env.packet_pool.release(received_packet)
       
-                # Send packet.  
-                self.send_packet(ack_packet)
-
-                # Reset event.
-                self.receive_packet_event = env.event()
-
-            else: 
-                # Throw error if packet is not a FIN_packet
-                assert(received_packet.get_packet_type() == 
-                       Packet.PacketTypes.fin_packet)
-                # FIN_packet received. Send FIN_packet in response.
-                fin_packet = FINPacket(self.src_host_id, self.flow_id, 
-                                       self.dest_host_id, received_packet.get_timestamp(), 
-                                       -1)
-                self.send_packet(fin_packet)
-                break     
+                # Send packet, or hold it back until more packets arrive.
+                if not in_order or push or self.num_unacked >= ack_every:
+                    self.send_ack()
+                elif self.ack_timer is None:
+                    self.ack_timer = env.timers.timeout(env.ack_delay)
+                    self.ack_timer.callbacks.append(self.ack_timeout)
+
+        if self.ack_timer is not None:
+            self.ack_timer.cancel()
+            self.ack_timer = None
+        # FIN_packet received. Send FIN_packet in response.
+        fin_packet = FINPacket(self.src_host_id, self.flow_id, 
+                               self.dest_host_id, fin_received.get_timestamp(), 
+                               -1)
+        self.send_packet(fin_packet)
        
         self.end_flow()
 
+    def send_ack(self):
+        """Acknowledges all the data packets received in order so far."""
+        ack_packet = self.env.packet_pool.ack_packet(
+            self.src_host_id, self.flow_id, self.dest_host_id,
+            self.ack_timestamp, self.req_num)
+        self.send_packet(ack_packet)
+        self.num_unacked = 0
+        if self.ack_timer is not None:
+            self.ack_timer.cancel()
+            self.ack_timer = None
+
+    def ack_timeout(self, event):
+        """Callback that sends the acknowledgment held back once the
+        ack_delay has passed."""
+        if event is self.ack_timer:
+            self.ack_timer = None
+            self.send_ack()
+
     def get_flow_type(self):
         """ Helper function to get flow type """
         return "ReceivingFlow"
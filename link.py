@@ -1,6 +1,53 @@
 from collections import deque
+import heapq
+import itertools
+from simpy.events import Event
 from packet import Packet
 
+class DeliveryPriority(tuple):
+    """ Priority of the event that delivers a packet at the end of an
+        OrderedLink, a (link id, direction, sequence number) tuple. It
+        comes after the URGENT and NORMAL priorities of SimPy, so packets
+        arriving at a given time are delivered after the other events of
+        that time, and in the order of their keys rather than in the
+        order their events were created. The order of deliveries then
+        only depends on the links, which is what lets a partitioned
+        simulation (see pdes.py) deliver them exactly as a sequential one
+        with ordered links does.
+    """
+    __slots__ = ()
+
+    def __lt__(self, other):
+        if isinstance(other, DeliveryPriority):
+            return tuple.__lt__(self, other)
+        return False
+
+    def __gt__(self, other):
+        if isinstance(other, DeliveryPriority):
+            return tuple.__gt__(self, other)
+        return True
+
+    def __le__(self, other):
+        return not self.__gt__(other)
+
+    def __ge__(self, other):
+        return not self.__lt__(other)
+
+def schedule_delivery(env, node, packet, delay, priority):
+    """ Schedules an event that hands packet to node in delay ms, with
+        the given DeliveryPriority. """
+    event = Event(env)
+    event._ok = True
+    event._value = packet
+    event.node = node
+    event.callbacks.append(deliver)
+    env.schedule(event, priority, delay)
+
+def deliver(event):
+    """ Callback of a delivery event, a plain function so that pending
+        deliveries can be saved by a checkpoint (see checkpoint.py). """
+    event.node.receive_packet(event._value)
+
 class Link(object):
     # Conversion constants from Mbps to bytes per milisecond
     MBPS_TO_B_PER_MS = 131.072
@@ -22,14 +69,32 @@ class Link(object):
                 end_points:
                     a tuple of objects that the link connects to
                 buffer:
-                    a deque object which models the buffer queue
+                    a deque of (packet, idx) which models the buffers of
+                    both sides as one queue in arrival order, idx being
+                    the index of the end point that sent the packet
                 buffer_used:
-                    total size of the packets in the buffer
+                    total size of the packets in the buffer of each side,
+                    a list indexed like end_points
+                total_buffer_used:
+                    total size of the packets in both buffers
                 transmitted_size:
                     size of packets transmitted since the last
                     statictics collection in Bytes
                 busy:
                     event that indicates whether link is busy
+                delay_line:
+                    packets propagating on the link in each direction,
+                    a deque of (arrival_time, packet) in FIFO order
+                line_ready:
+                    event that wakes up the delivery process of each
+                    direction when a packet is put on an empty line
+                pending:
+                    packets scheduled to enter the buffer at a later
+                    time (see schedule_burst), a heap of
+                    (time, order, packet, idx)
+                wake_time:
+                    time at which the idle link is woken up to take
+                    the next pending packet, or None
         """
         self.env = env
         self.id = id
@@ -39,8 +104,9 @@ class Link(object):
         # Buffer size in Bytes
         self.buffer_size = Link.KB_TO_B * buffer_size
 
-        self.buffer = {}
-        self.buffer_used = {}
+        self.buffer = deque()
+        self.buffer_used = [0, 0]
+        self.total_buffer_used = 0
         self.end_points = end_points
         if end_points:
             self.add_end_points(end_points)
@@ -49,20 +115,33 @@ class Link(object):
         self.packet_drop = 0
         self.transmitted_size = 0
 
+        # Packets in flight, indexed by the buffer they were sent from.
+        # The link delay is constant, so packets arrive in FIFO order and
+        # one delivery process per direction is enough.
+        self.delay_line = [deque(), deque()]
+        self.line_ready = [env.event(), env.event()]
+
+        # Packets handed over in advance by a host, admitted into the
+        # buffer once their time has come.
+        self.pending = []
+        self.pending_order = itertools.count()
+        self.wake_time = None
+
         # reactive event and processes
         self.busy = env.event()
         env.process(self.transmit(env))
+        self.start_delivery(env)
+
+    def start_delivery(self, env):
+        """ Function to start the delivery process of each direction. """
+        env.process(self.deliver(env, 0))
+        env.process(self.deliver(env, 1))
 
     def add_end_points(self, end_points):
         """ Mutator funciton to add end points to link """
+        self.end_points = end_points
         # ids of endpoints
         self.device_ids = [end_points[0].get_id(), end_points[1].get_id()]
-        # Buffer on both sides
-        self.buffer[self.device_ids[0]] = deque()
-        self.buffer[self.device_ids[1]] = deque()
-        # Buffer occupied on both sides
-        self.buffer_used[self.device_ids[0]] = 0
-        self.buffer_used[self.device_ids[1]] = 0
 
     def get_id(self):
         """ Function that returns link id. """
@@ -73,69 +152,160 @@ class Link(object):
             packet if buffer is full, otherwise enqueue the packet
             and wake up process() 
         """
+        if self.pending:
+            self.admit()
+        idx = 0 if src_id == self.device_ids[0] else 1
+        self.push(packet, idx)
+
+    def push(self, packet, idx):
+        """ Function to put a packet sent from end point idx in the
+            buffer, or drop it if the buffer is full. """
         size = packet.get_length()
         # Drop the packet if buffer is full
-        if self.buffer_used[src_id] + size > self.buffer_size:
+        if self.buffer_used[idx] + size > self.buffer_size:
             self.packet_drop += 1
         else:
-            self.buffer[src_id].append((packet, self.env.now))
-            self.buffer_used[src_id] += size
+            self.buffer.append((packet, idx))
+            self.buffer_used[idx] += size
+            self.total_buffer_used += size
             if not self.busy.triggered:
                 # Wake up link 
                 self.busy.succeed()
 
-    def buffer_empty(self):
-        """ Helper function to check whether both buffers
-            are empty. 
+    def schedule_burst(self, departures, src_id):
+        """ Function to hand over packets that enter the buffer at given
+            times, a list of (time, packet) in time order. The link
+            behaves as if each packet was enqueued at its time, but
+            without an event per packet: packets are admitted into the
+            buffer before anything else looks at it or changes it.
         """
-        return len(self.buffer[self.device_ids[0]]) + \
-               len(self.buffer[self.device_ids[1]]) == 0
+        idx = 0 if src_id == self.device_ids[0] else 1
+        now = self.env.now
+        for time, packet in departures:
+            if time <= now:
+                self.enqueue(packet, src_id)
+            else:
+                heapq.heappush(self.pending, (time, next(self.pending_order),
+                                              packet, idx))
+        if self.pending and not self.busy.triggered:
+            self.wake_at(self.pending[0][0])
 
-    def find_next_packet(self):
-        """ Helper function that returns the index of the buffer from 
-            which the next packet should be transmitted
+    def admit(self, strict=False):
+        """ Function to put the pending packets whose time has come in the
+            buffer. With strict, packets scheduled at the current time are
+            left out, as the statistics are collected before the other
+            events of a time step.
         """
-        if len(self.buffer[self.device_ids[0]]) == 0:
-            return 1
-        elif len(self.buffer[self.device_ids[1]]) == 0:
-            return 0
-        else:
-            # Peek the leftmost packets on both buffers
-            packet_1, ts_1 = self.buffer[self.device_ids[0]][0]
-            packet_2, ts_2 = self.buffer[self.device_ids[1]][0]
-            if ts_1 <= ts_2:
-                return 0
-            else:
-                return 1
+        pending = self.pending
+        now = self.env.now
+        while pending and (pending[0][0] < now or
+                           (pending[0][0] == now and not strict)):
+            packet, idx = heapq.heappop(pending)[2:]
+            self.push(packet, idx)
+
+    def wake_at(self, time):
+        """ Function to wake up the idle link at time, when the next
+            pending packet enters the buffer. """
+        if self.wake_time is not None and self.wake_time <= time:
+            return
+        self.wake_time = time
+        # Not a process, a callback of the timeout
+        wake = self.env.timeout(time - self.env.now)
+        wake.callbacks.append(self.wake)
+
+    def wake(self, event):
+        """ Callback that admits the pending packets into the buffer,
+            which wakes up the link. """
+        if self.wake_time == self.env.now:
+            self.wake_time = None
+        self.admit()
+        if self.pending and not self.busy.triggered:
+            self.wake_at(self.pending[0][0])
 
-    def transmit(self, env):
+    def transmit(self, env, wait=None):
         """ Processs to transmit packets from both buffers.
             The transmit is done by always sending the packet  
-            that arrived first in the buffer.
+            that arrived first in the buffer. Both buffers share
+            one queue in arrival order, so this is the head of the
+            queue.
+
+            A process restored from a checkpoint (see checkpoint.py) is
+            given the event it waits for, busy or the transmission of
+            the head of the queue.
         """
+        queue = self.buffer
+        buffer_used = self.buffer_used
+        pending = self.pending
         while True:
-            yield self.busy
+            if wait is None or wait is self.busy:
+                yield self.busy
+                wait = None
           
-            while not self.buffer_empty():
-                idx = self.find_next_packet()
+            while queue:
                 # peek at leftmost packet
-                packet, ts = self.buffer[self.device_ids[idx]][0]
+                packet, idx = queue[0]
                 size = packet.get_length()
                 # size / self.link_rate is in ms
-                yield env.timeout(size / self.link_rate)
-                self.buffer_used[self.device_ids[idx]] -= size
-                self.buffer[self.device_ids[idx]].popleft()
-                # Schedule event after link_delay
-                env.process(self.send_packet(idx, packet))
+                if wait is None:
+                    wait = env.timeout(size / self.link_rate)
+                yield wait
+                wait = None
+                if pending:
+                    self.admit()
+                buffer_used[idx] -= size
+                self.total_buffer_used -= size
+                queue.popleft()
+                # Put the packet on the line, it arrives after link_delay
+                self.send_packet(idx, packet)
                 self.transmitted_size += size
 
             self.busy = self.env.event()  
+            if pending:
+                self.wake_at(pending[0][0])
 
     def send_packet(self, idx, packet):
-        ''' Independent process to schedule receive packet event for host. '''
-        yield self.env.timeout(self.link_delay)
-        self.end_points[1 - idx].receive_packet(packet)
-        
+        ''' Puts a transmitted packet on the delay line of its direction. '''
+        self.delay_line[idx].append((self.env.now + self.link_delay, packet))
+        if not self.line_ready[idx].triggered:
+            self.line_ready[idx].succeed()
+
+    def deliver(self, env, idx, wait=None):
+        ''' Process that hands the packets sent from buffer idx to the
+            other end point once they have propagated through the link.
+
+            Packets arriving at the same time on different lines are
+            delivered in the order their processes scheduled the waits,
+            not in the order the packets were sent as with one timeout
+            per packet. Ties are broken differently from then, and
+            distance-vector runs, whose link weights follow the buffers,
+            diverge from the ones with timeouts (OrderedLink fixes the
+            order instead).
+
+            A process restored from a checkpoint (see checkpoint.py) is
+            given the event it waits for, line_ready or the arrival of
+            the head of the line.
+        '''
+        line = self.delay_line[idx]
+        while True:
+            if wait is None:
+                if not line:
+                    # Passivate until a packet is put on the line
+                    self.line_ready[idx] = env.event()
+                    wait = self.line_ready[idx]
+                elif line[0][0] > env.now:
+                    wait = env.timeout(line[0][0] - env.now)
+            if wait is not None:
+                yield wait
+                wait = None
+                continue
+
+            arrival_time, packet = line.popleft()
+            self.end_points[1 - idx].receive_packet(packet)
+
+    def in_flight(self):
+        ''' Function that returns the packets on the link. '''
+        return [packet for line in self.delay_line for _, packet in line]
+
     def get_buffer_size(self):
         """Returns the buffer size of the link in bytes."""
         return self.buffer_size
@@ -144,14 +314,13 @@ class Link(object):
         """ Helper function that calculates the total buffer occupancy 
             for link 
         """
-        return (self.buffer_used[self.device_ids[0]] + \
-               self.buffer_used[self.device_ids[1]]) / (self.buffer_size * 2.0)
+        return self.total_buffer_used / (self.buffer_size * 2.0)
     
     def get_weight(self):
         """ Link weight for dynamic routing. """
-        return (self.buffer_used[self.device_ids[0]] +
-                self.buffer_used[self.device_ids[1]]) / \
-                self.link_rate + self.link_delay
+        if self.pending:
+            self.admit()
+        return self.total_buffer_used / self.link_rate + self.link_delay
     
     def get_link_rate(self):
         """Returns the link rate."""
@@ -167,6 +336,8 @@ class Link(object):
 
     def report(self):
         """ Function that reports link statictics to environment """
+        if self.pending:
+            self.admit(strict=True)
         # Convert buffer occupancy to percentage
         buffer_occ = 100 * self.get_buffer_occupancy()
         flow_rate = self.get_flow_rate()
@@ -177,3 +348,39 @@ class Link(object):
         return {'packet_loss' : packet_drop,
                 'buffer_occupancy' : buffer_occ,
                 'link_rate' : flow_rate}
+
+
+class OrderedLink(Link):
+    """ Link that delivers every packet with its own event, ordered by
+        a DeliveryPriority instead of the delay line. Same-time
+        deliveries then come in the order of link, direction and
+        sequence number, whatever the order of the other events. The
+        partitioned simulation (see pdes.py) needs this to give the same
+        results as a sequential one.
+
+        Attributes:
+            num_sent:
+                counter of the packets sent in each direction, the last
+                element of their DeliveryPriority
+    """
+
+    def start_delivery(self, env):
+        """ Packets in flight are delivered by one event each, no process
+            is needed. """
+        self.num_sent = [itertools.count(), itertools.count()]
+
+    def send_packet(self, idx, packet):
+        ''' Sends a transmitted packet to the other end point, where it
+            arrives after link_delay. '''
+        self.post_delivery(self.end_points[1 - idx], packet, self.link_delay,
+                           DeliveryPriority((self.id, idx,
+                                             next(self.num_sent[idx]))))
+
+    def post_delivery(self, node, packet, delay, priority):
+        ''' Schedules the delivery of packet to node in delay ms. '''
+        schedule_delivery(self.env, node, packet, delay, priority)
+
+    def in_flight(self):
+        ''' Packets in flight are in the event queue, see
+            MainEnv.quiescent. '''
+        return []
@@ -0,0 +1,172 @@
+"""Storage of the metrics collected by the network simulator.
+
+Metrics are exported as one .npy file per field plus a small JSON manifest,
+so that they can be opened with memory mapping by load_metrics().
+"""
+import ctypes
+import json
+import math
+import multiprocessing
+import os
+import numpy as np
+
+MANIFEST = 'manifest.json'
+TIME_SERIES = 'time_series.npy'
+
+class MetricStore(object):
+    ''' Stores the data points of every metric field in a 2-D float64
+        array of shape (number of objects, number of data points),
+        allocated once for the whole simulation. Column 0 holds the
+        initial point at time 0, column k the k-th sample.
+            duration, interval:
+                as below (in s)
+            num_samples:
+                number of times the environment collects data
+            values:
+                a dict of {field: array}
+            time_series:
+                time (in s) of every data point
+            num_points:
+                number of data points collected so far (including the
+                initial point)
+
+        A shared store keeps its arrays and num_points in shared memory,
+        so that a forked process (see viewer.py) sees the data points as
+        they are collected. A column is always written before num_points
+        is increased past it.
+    '''
+
+    def __init__(self, duration, interval, counts, shared=False):
+        ''' Args:
+                duration:
+                    duration of the simulation (in s)
+                interval:
+                    interval that the environment collects data at (in s)
+                counts:
+                    a dict of {field: number of objects}
+                shared:
+                    if True, allocate the store in shared memory
+        '''
+        self.duration = duration
+        self.interval = interval
+        # The last interval is cut short if the duration is not a
+        # multiple of the interval
+        self.num_samples = int(math.ceil(round(duration / interval, 9)))
+        self.shared = shared
+        self.values = {}
+        for field in counts:
+            shape = (counts[field], self.num_samples + 1)
+            if shared:
+                raw = multiprocessing.RawArray(ctypes.c_double,
+                                               shape[0] * shape[1])
+                self.values[field] = np.frombuffer(raw).reshape(shape)
+            else:
+                self.values[field] = np.zeros(shape)
+        self.time_series = np.minimum(
+            np.arange(self.num_samples + 1) * interval, duration)
+        if shared:
+            self._num_points = multiprocessing.RawValue(ctypes.c_long, 1)
+        else:
+            self._num_points = ctypes.c_long(1)
+
+    @property
+    def num_points(self):
+        ''' Number of data points collected so far. '''
+        return self._num_points.value
+
+    @num_points.setter
+    def num_points(self, num_points):
+        self._num_points.value = num_points
+
+    def add_column(self, data):
+        ''' Function to add one data point for every object, data is a dict
+            of {field: list of values}. '''
+        k = self.num_points
+        for field in data:
+            self.values[field][:, k] = data[field]
+        self.num_points += 1
+
+    def set_num_points(self, num_points):
+        ''' Function to mark the data points written directly into values
+            as collected. '''
+        self.num_points = num_points
+
+    def view(self, field, num_points=None):
+        ''' Returns the data points collected so far (or the first
+            num_points) for field, as a view of the underlying array. '''
+        if num_points is None:
+            num_points = self.num_points
+        return self.values[field][:, :num_points]
+
+    def times(self, num_points=None):
+        ''' Returns the time of the data points collected so far (or of
+            the first num_points). '''
+        if num_points is None:
+            num_points = self.num_points
+        return self.time_series[:num_points]
+
+    def save(self, dirname, units, ids):
+        ''' Function to export the collected data points to dirname, as
+            one .npy file per field and a JSON manifest.
+
+            Args:
+                units:
+                    a dict of {field: unit}
+                ids:
+                    a dict of {field: list of object ids}, one per row
+        '''
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        manifest = {'interval': self.interval,
+                    'duration': self.duration,
+                    'num_points': self.num_points,
+                    'time_series': TIME_SERIES,
+                    'fields': {}}
+        np.save(os.path.join(dirname, TIME_SERIES), self.times())
+        for field in self.values:
+            fname = field + '.npy'
+            np.save(os.path.join(dirname, fname), self.view(field))
+            manifest['fields'][field] = {'file': fname,
+                                         'unit': units[field],
+                                         'ids': list(ids[field])}
+        with open(os.path.join(dirname, MANIFEST), 'w') as fout:
+            json.dump(manifest, fout, indent=2, sort_keys=True)
+
+
+def load_metrics(dirname, mmap_mode='r'):
+    """ Opens the metrics exported by MetricStore.save.
+
+        The arrays are memory mapped by default, so only the parts that are
+        accessed are read from disk.
+
+        Returns:
+            (manifest, time_series, values) where values is a dict of
+            {field: array of shape (number of objects, number of points)}
+    """
+    with open(os.path.join(dirname, MANIFEST)) as fin:
+        manifest = json.load(fin)
+    time_series = np.load(os.path.join(dirname, manifest['time_series']),
+                          mmap_mode=mmap_mode)
+    values = {}
+    for field, spec in manifest['fields'].items():
+        values[field] = np.load(os.path.join(dirname, spec['file']),
+                                mmap_mode=mmap_mode)
+    return manifest, time_series, values
+
+
+def decimate_minmax(x, y, num_buckets):
+    """ Reduces a series to the min and max points of num_buckets
+        consecutive buckets, which keeps its envelope when it is drawn
+        num_buckets pixels wide. Shorter series are returned as is.
+    """
+    n = len(y)
+    if n <= 2 * num_buckets:
+        return x, y
+    size = n // num_buckets
+    end = size * num_buckets
+    buckets = np.asarray(y[:end]).reshape(num_buckets, size)
+    start = np.arange(num_buckets) * size
+    idx = np.unique(np.concatenate([start + buckets.argmin(axis=1),
+                                    start + buckets.argmax(axis=1),
+                                    np.arange(end, n)]))
+    return x[idx], y[idx]
@@ -2,6 +2,7 @@
 """
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+from metrics import MetricStore, decimate_minmax
 
 class RealTimeGraph:
     ''' Output class that stores data collected by the environment
@@ -14,13 +15,29 @@ class RealTimeGraph:
                 figure object
             axes:
                 list of subplots
+            lines:
+                list of the (object index, Line2D) shown in each subplot
+            backgrounds:
+                cached background of each subplot, used for blitting
+            store:
+                MetricStore that holds the data points
+            num_samples:
+                number of times the environment collects data
             data_points:
-                value of each subplot
+                value of each subplot, a dict of {legend: array} with
+                one row per object (the arrays of store)
             time_series: 
                 x coordinates of all data points
             gtype:
                 a tuple that includes type of the graph and ids of
                 links/flows etc. to show
+            headless:
+                if True, no figure is created while the simulation
+                runs; the graph can still be rendered afterwards
+            shared:
+                if True, the data points are kept in shared memory so
+                that a Viewer process can show them while the
+                simulation runs
     '''
 
     # Interval (in ms) at which the real time animation 
@@ -58,40 +75,37 @@ class RealTimeGraph:
              'link_rate' : ' (Mbps)'
             }
 
-    def __init__(self, duration, interval, gtype, num_hosts, num_links, num_flows):
+    def __init__(self, duration, interval, gtype, num_hosts, num_links,
+                 num_flows, headless=False, shared=False):
         self.duration = duration / RealTimeGraph.MS_TO_S
         self.interval = interval / RealTimeGraph.MS_TO_S
-        self.fig = plt.figure(figsize=(10, 7), dpi=100)
-        self.fig.subplots_adjust(hspace=1)
+        self.headless = headless
+        self.fig = None
         self.axes = []
-        self.data_points = {}
-        self.time_series = [0]
+        self.lines = []
+        self.backgrounds = None
+        # Show everything by default
+        if gtype is None:
+            gtype = ('all', [])
         self.gtype = gtype
-        title = 'Network Simulation Plots'
+        self.title = 'Network Simulation Plots'
         # Select subgraphs to output 
         if gtype[0] == "host":
             self.legends = RealTimeGraph.HOST_FIELDS
-            title += ' (Hosts)'
+            self.title += ' (Hosts)'
         elif gtype[0] == "flow":
             self.legends = RealTimeGraph.FLOW_FIELDS
-            title += ' (Flows)'
+            self.title += ' (Flows)'
         elif gtype[0] == "link":
             self.legends = RealTimeGraph.LINK_FIELDS
-            title += ' (Links)'
+            self.title += ' (Links)'
         else:
             self.legends = RealTimeGraph.LEGENDS
 
-        self.fig.suptitle(title)
-
         self.num_plots = len(self.legends)
-        for i in range(self.num_plots):
-            legend = self.legends[i]
-            self.axes.append(
-                self.fig.add_subplot(self.num_plots, 1, i + 1))
         
-        for i in range(RealTimeGraph.MAX_PLOTS):
-            legend = RealTimeGraph.LEGENDS[i]
-            self.data_points[legend] = []
+        counts = {}
+        for legend in RealTimeGraph.LEGENDS:
             n = 1
             if legend in RealTimeGraph.LINK_FIELDS:
                 n = num_links
@@ -99,24 +113,65 @@ class RealTimeGraph:
                 n = num_flows
             elif legend in RealTimeGraph.HOST_FIELDS:
                 n = num_hosts
-            for i in range(n):
-                self.data_points[legend].append([0])
+            counts[legend] = n
+        self.store = MetricStore(self.duration, self.interval, counts,
+                                 shared)
+        self.num_samples = self.store.num_samples
+        self.data_points = self.store.values
+        self.time_series = self.store.time_series
+
+        # In headless mode the figure is only created if the graph is
+        # rendered after the simulation is over.
+        if not headless:
+            self.create_figure()
+
+    def create_figure(self):
+        ''' Function to create the figure and its subplots '''
+        if self.headless:
+            # Render off-screen, no display is needed
+            plt.switch_backend('agg')
+        self.fig = plt.figure(figsize=(10, 7), dpi=100)
+        self.fig.subplots_adjust(hspace=1)
+        self.fig.suptitle(self.title)
+        for i in range(self.num_plots):
+            self.axes.append(
+                self.fig.add_subplot(self.num_plots, 1, i + 1))
 
     def init_frame(self):
-        ''' Function to draw a clear frame '''
+        ''' Function to draw a clear frame and create the line of every
+            object shown. The lines are kept and only get new data. '''
+        if self.lines:
+            return
         for i in range(self.num_plots):
-            self.axes[i].set_ylabel(self.legends[i])
-            self.axes[i].set_xlim(0, self.duration)
+            legend = self.legends[i]
+            label = self.get_label(legend)
+            if 'host' in legend or 'flow' in legend:
+                subtitle = legend[5:] + self.UNITS[legend]
+            else:
+                subtitle = legend + self.UNITS[legend]
+            ax = self.axes[i]
+            ax.set_ylabel(subtitle)
+            ax.set_xlim(0, self.duration)
+            idx_list = range(len(self.data_points[legend]))
+            if len(self.gtype[1]) > 0:
+                idx_list = self.gtype[1]
+            lines = []
+            for idx in idx_list:
+                line, = ax.plot([], [], label = label + str(idx))
+                lines.append((idx, line))
+            self.lines.append(lines)
+            ax.legend(bbox_to_anchor=(1.14, 1))
         self.axes[self.num_plots - 1].set_xlabel('Time (s)')
 
     def add_data_points(self, data):
         ''' Function to add data collected from the simulation
             to the plotting tool. '''
-        for legend in data:
-            for i in range(len(data[legend])):
-                self.data_points[legend][i].append(data[legend][i])
-        self.time_series.append(
-            len(self.data_points[self.legends[0]][0]) * self.interval)
+        self.store.add_column(data)
+
+    def set_num_points(self, num_points):
+        ''' Function to mark the data points written directly into
+            data_points by the environment as collected. '''
+        self.store.set_num_points(num_points)
         
     def get_label(self, legend):
         ''' Function that returns H, L, F depends on the type of 
@@ -129,26 +184,48 @@ class RealTimeGraph:
         return label
 
     def draw(self):
-        ''' Helper function to draw the current data points '''
+        ''' Helper function to draw the current data points. Series with
+            more points than the plot is wide in pixels are decimated to
+            their min/max per pixel, so a frame costs the same however
+            long the simulation has run. '''
+        self.init_frame()
+        # Another process may be adding data points, all the subplots
+        # show the ones collected when the frame starts.
+        num_points = self.store.num_points
+        time_series = self.store.times(num_points)
         for i in range(self.num_plots):
-            legend = self.legends[i]
-            label = self.get_label(legend)
-            if 'host' in legend or 'flow' in legend:
-                subtitle = legend[5:] + self.UNITS[legend]
-            else:
-                subtitle = legend + self.UNITS[legend]
             ax = self.axes[i]
-            ax.clear()
-            ax.set_ylabel(subtitle)
-            ax.set_xlim(0, self.duration)
-            idx_list = range(len(self.data_points[legend]))
-            if len(self.gtype[1]) > 0:
-                idx_list = self.gtype[1]
-            for i in idx_list:
-                ax.plot(self.time_series, self.data_points[legend][i],
-                        label = label + str(i))
-            ax.legend(bbox_to_anchor=(1.14, 1))
-        ax.set_xlabel('Time (s)')
+            width = max(int(ax.bbox.width), 1)
+            data_points = self.store.view(self.legends[i], num_points)
+            for idx, line in self.lines[i]:
+                line.set_data(*decimate_minmax(time_series, data_points[idx],
+                                               width))
+            ylim = ax.get_ylim()
+            ax.relim()
+            ax.autoscale_view(scalex=False)
+            if ax.get_ylim() != ylim:
+                self.backgrounds = None
+
+    def refresh(self):
+        ''' Function to show the lines updated by draw() on screen. Only
+            the lines are blitted over the cached background of each
+            subplot, unless a subplot has been rescaled. '''
+        canvas = self.fig.canvas
+        if self.backgrounds is None:
+            for lines in self.lines:
+                for idx, line in lines:
+                    line.set_animated(True)
+            canvas.draw()
+            self.backgrounds = [canvas.copy_from_bbox(ax.bbox)
+                                for ax in self.axes]
+        else:
+            for background in self.backgrounds:
+                canvas.restore_region(background)
+        for ax, lines in zip(self.axes, self.lines):
+            for idx, line in lines:
+                ax.draw_artist(line)
+            canvas.blit(ax.bbox)
+        canvas.flush_events()
 
     def animate(self, i):
         ''' Animations are made by repeatedly calling this function'''
@@ -165,19 +242,31 @@ class RealTimeGraph:
         self.draw()
         plt.show()
 
+    def render(self):
+        ''' Function to draw all the data points once, used to plot
+            the results after a headless simulation '''
+        if self.fig is None:
+            self.create_figure()
+        self.init_frame()
+        self.draw()
+
     def export_to_jpg(self):
         ''' Function to export the plots into a file'''
+        if self.fig is None:
+            self.render()
+        # Lines are only drawn by refresh() while they are animated
+        for lines in self.lines:
+            for idx, line in lines:
+                line.set_animated(False)
         self.fig.savefig('results/performance_curves.jpg', dpi = 500)
 
-    def export_to_file(self):
-        ''' Function to raw data points into a file'''
-        f = open('results/raw_data.txt', 'w')
-        for i in range(RealTimeGraph.MAX_PLOTS):
-            legend = self.LEGENDS[i]
-            f.write(legend + '\n')
-            for j in range(len(self.data_points[legend])):
-                f.write(str(j + 1) + ':' + 
-                        str(self.data_points[legend][j]) + '\n')
-            f.write('\n')
-        f.close()
-
+    def export_to_file(self, dirname='results/raw_data'):
+        ''' Function to export the raw data points into dirname, as one
+            .npy file per legend plus a manifest (see metrics.load_metrics).
+            Objects are numbered from 1 as in the input file. '''
+        units = {}
+        ids = {}
+        for legend in RealTimeGraph.LEGENDS:
+            units[legend] = self.UNITS[legend].strip(' ()')
+            ids[legend] = range(1, len(self.data_points[legend]) + 1)
+        self.store.save(dirname, units, ids)
@@ -1,7 +1,12 @@
 """Base class for network packets.
 
 Subclasses derived from this base class include DataPacket,
-AcknowledgementPacket, RoutingUpdatePacket, and FINPacket.
+AcknowledgementPacket, RoutingUpdatePacket, RoutingDeltaPacket,
+LinkStatePacket, and FINPacket.
+
+Packets use __slots__ to keep them small, since a data packet and an ack
+packet are created for every segment a flow sends. PacketPool recycles the
+data and ack packets that have been delivered to their flow.
 """
 
 class Packet(object):
@@ -14,6 +19,9 @@ class Packet(object):
                     'acknowledgement_packet', 'routing_update_packet', or
                     'fin_packet').
     """
+
+    __slots__ = ('src', 'flow_id', 'dest', 'timestamp', 'length',
+                 'packet_type', 'seq_num')
     
     class PacketTypes(object):
         """
@@ -120,9 +128,11 @@ class DataPacket(Packet):
         contain a payload. The size of a data packet is fixed at 1024 bytes.
     """
     
+    __slots__ = ('push',)
+
     DATA_PACKET_LENGTH = 1024
     
-    def __init__(self, src, flow_id, dest, timestamp, seq_num):
+    def __init__(self, src, flow_id, dest, timestamp, seq_num, push=False):
         """
             Sets up a data packet with the given specifications:
                 
@@ -137,12 +147,16 @@ class DataPacket(Packet):
                         Time upon sending packet.
                     seq_num:
                         Packet sequence number in a given flow.
+                    push:
+                        Whether the receiver should acknowledge the packet
+                        right away, even in delayed acknowledgment mode.
             
             The packet_type attribute is set to 'data_packet'.
         """
         
         super(DataPacket, self).__init__(src, flow_id, dest, timestamp,
             self.DATA_PACKET_LENGTH, Packet.PacketTypes.data_packet, seq_num)
+        self.push = push
 
 class AckPacket(Packet):
     """
@@ -153,6 +167,8 @@ class AckPacket(Packet):
         size of 64 bytes.
     """
     
+    __slots__ = ()
+
     ACKNOWLEDGMENT_PACKET_LENGTH = 64
     
     def __init__(self, src, flow_id, dest, timestamp, seq_num):
@@ -185,9 +201,15 @@ class RoutingUpdatePacket(Packet):
         Routers implement dynamic routing through the Bellman-Ford algorithm.
         Thus, a routing update packet will contain a table of distance estimates
         to each router. Routing update packets have a fixed size of 1024 bytes.
+        The seq_num of a routing update numbers the updates sent by a router.
     """
     
+    __slots__ = ('dist_estimates',)
+
     ROUTING_UPDATE_PACKET_LENGTH = 1024
+
+    # The packet holds the whole table, not only the changed entries
+    full = True
     
     def __init__(self, src, flow_id, dest, timestamp, seq_num, dist_estimates):
         """
@@ -222,6 +244,94 @@ class RoutingUpdatePacket(Packet):
         at the given timestamp."""
         return self.dist_estimates
 
+class RoutingDeltaPacket(RoutingUpdatePacket):
+    """
+        Defines the properties and methods of a routing delta packet.
+
+        A routing delta packet only holds the distance estimates that
+        changed since the previous routing update of the router, a
+        destination that is no longer reachable having a cost of None. It
+        can only be applied on top of the update with the previous seq_num.
+        Its length is a header plus one entry per distance estimate.
+    """
+
+    __slots__ = ()
+
+    ROUTING_DELTA_HEADER_LENGTH = 64
+    ROUTING_DELTA_ENTRY_LENGTH = 12
+
+    full = False
+
+    def __init__(self, src, timestamp, seq_num, dist_estimates):
+        """
+            Sets up a routing delta packet with the given specifications:
+
+            Args:
+                    src:
+                        Source address (the link the packet is sent on).
+                    timestamp:
+                        Time upon sending packet.
+                    seq_num:
+                        Sequence number of the routing update.
+                    dist_estimates:
+                        Changed distance estimates as a dict of
+                        {destination_id: cost or None}.
+
+            The packet_type attribute is set to 'routing_update_packet'.
+        """
+
+        super(RoutingDeltaPacket, self).__init__(src, -1, -1, timestamp,
+                                                 seq_num, dist_estimates)
+        self.length = (self.ROUTING_DELTA_HEADER_LENGTH +
+                       self.ROUTING_DELTA_ENTRY_LENGTH * len(dist_estimates))
+
+class LinkStatePacket(RoutingUpdatePacket):
+    """
+        Defines the properties and methods of a link state packet.
+
+        In link state mode, every router floods the weight of its links to
+        all the other routers, which compute their shortest paths locally.
+        A link state packet carries the link weights of its origin router
+        as a table {neighbor_id: weight} and the sequence number of that
+        table. Its length is a header plus one entry per link, much smaller
+        than a distance-vector update.
+    """
+
+    __slots__ = ('origin',)
+
+    LINK_STATE_HEADER_LENGTH = 64
+    LINK_STATE_ENTRY_LENGTH = 12
+
+    def __init__(self, src, timestamp, seq_num, origin, link_weights):
+        """
+            Sets up a link state packet with the given specifications:
+
+            Args:
+                    src:
+                        Source address (the link the packet is sent on).
+                    timestamp:
+                        Time upon sending packet.
+                    seq_num:
+                        Sequence number of the link weights of origin.
+                    origin:
+                        ID of the router whose links are described.
+                    link_weights:
+                        Table of the weights of the links of the origin
+                        router as a dict of {neighbor_id: weight}.
+
+            The packet_type attribute is set to 'routing_update_packet'.
+        """
+
+        super(LinkStatePacket, self).__init__(src, -1, -1, timestamp,
+                                              seq_num, link_weights)
+        self.length = (self.LINK_STATE_HEADER_LENGTH +
+                       self.LINK_STATE_ENTRY_LENGTH * len(link_weights))
+        self.origin = origin
+
+    def get_origin(self):
+        """Returns the ID of the router whose links are described."""
+        return self.origin
+
 class FINPacket(Packet):
     """
         Defines the properties and methods of an FIN packet.
@@ -230,6 +340,8 @@ class FINPacket(Packet):
         acknowledgment packets, FIN packets have a fixed size of 64 bytes.
     """
     
+    __slots__ = ()
+
     FIN_PACKET_LENGTH = 64
     
     def __init__(self, src, flow_id, dest, timestamp, seq_num):
@@ -253,3 +365,69 @@ class FINPacket(Packet):
         
         super(FINPacket, self).__init__(src, flow_id, dest, timestamp,
             self.FIN_PACKET_LENGTH, Packet.PacketTypes.fin_packet, seq_num)
+
+
+class PacketPool(object):
+    """
+        Free lists of data and acknowledgement packets.
+
+        Flows get their data and ack packets from the pool and hand them
+        back with release() once they have been delivered and processed.
+        A released packet must not be referenced anywhere else, since it
+        will be handed out again with new contents.
+
+        Attributes:
+                free_data_packets:
+                    List of data packets ready to be reused.
+                free_ack_packets:
+                    List of ack packets ready to be reused.
+                num_allocated:
+                    Number of packets the pool had to create.
+                num_reused:
+                    Number of packets handed out from the free lists.
+    """
+
+    def __init__(self):
+        self.free_data_packets = []
+        self.free_ack_packets = []
+        self.num_allocated = 0
+        self.num_reused = 0
+
+    def data_packet(self, src, flow_id, dest, timestamp, seq_num,
+                    push=False):
+        """Returns a data packet with the given specifications."""
+        if self.free_data_packets:
+            self.num_reused += 1
+            packet = self._reset(self.free_data_packets.pop(), src, flow_id,
+                                 dest, timestamp, seq_num)
+            packet.push = push
+            return packet
+        self.num_allocated += 1
+        return DataPacket(src, flow_id, dest, timestamp, seq_num, push)
+
+    def ack_packet(self, src, flow_id, dest, timestamp, seq_num):
+        """Returns an acknowledgement packet with the given specifications."""
+        if self.free_ack_packets:
+            self.num_reused += 1
+            return self._reset(self.free_ack_packets.pop(), src, flow_id,
+                               dest, timestamp, seq_num)
+        self.num_allocated += 1
+        return AckPacket(src, flow_id, dest, timestamp, seq_num)
+
+    def release(self, packet):
+        """Hands a delivered packet back to the pool. Packets other than
+        data and ack packets are left to the garbage collector."""
+        if packet.packet_type == Packet.PacketTypes.data_packet:
+            self.free_data_packets.append(packet)
+        elif packet.packet_type == Packet.PacketTypes.ack_packet:
+            self.free_ack_packets.append(packet)
+
+    @staticmethod
+    def _reset(packet, src, flow_id, dest, timestamp, seq_num):
+        """Overwrites the per-packet fields of a recycled packet."""
+        packet.src = src
+        packet.flow_id = flow_id
+        packet.dest = dest
+        packet.timestamp = timestamp
+        packet.seq_num = seq_num
+        return packet
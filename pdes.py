@@ -0,0 +1,301 @@
+"""
+Conservative parallel discrete-event simulation of a partitioned network.
+
+The routers are split into partitions, each simulated by its own MainEnv
+in a worker process. A host goes with its router, and a link with the
+router at its first end. Every worker builds the whole network, so ids
+and static routes are the same everywhere, but only sends the flows of
+its own hosts, so the other objects see no packets.
+
+A packet leaving a link toward a router whose route goes on through a
+link of another partition is not delivered locally. It is sent to that
+partition as a message, time-stamped with its arrival time, as soon as
+it is put on the link: the link delay is the lookahead. The workers run
+in windows of the smallest such delay and exchange their messages at the
+end of each window, so a message always arrives before its time.
+
+Routes must not change while packets are in flight, so only static
+routing is supported. The links of the partitions are OrderedLinks (see
+link.py), whose deliveries are ordered by DeliveryPriority rather than by
+the creation of their events. The results are then identical to the ones
+of a sequential simulation with OrderedLinks, which may tie-break
+same-time arrivals differently from the default delay lines.
+"""
+
+import math
+import multiprocessing
+import time
+
+from env import MainEnv
+from input import input
+from link import OrderedLink, schedule_delivery
+from output import RealTimeGraph
+from router import Router
+
+def partition_network(network_specs, num_parts):
+    """ Splits the network into num_parts partitions of connected routers
+        with about the same number of nodes, in breadth-first order from
+        the first router.
+
+        Returns:
+            a dict of {'routers', 'hosts', 'links': list of the partition
+            of each router, host and link of the input file}
+    """
+    num_routers = network_specs['Routers']
+    neighbors = [[] for _ in range(num_routers)]
+    weights = [1] * num_routers
+    for link in network_specs['Links']:
+        (type1, id1), (type2, id2) = link[3:5]
+        if type1 == 'R' and type2 == 'R':
+            neighbors[id1 - 1].append(id2 - 1)
+            neighbors[id2 - 1].append(id1 - 1)
+        elif type1 == 'R' or type2 == 'R':
+            weights[(id1 if type1 == 'R' else id2) - 1] += 1
+
+    order = []
+    seen = [False] * num_routers
+    for root in range(num_routers):
+        if seen[root]:
+            continue
+        seen[root] = True
+        queue = [root]
+        while queue:
+            router = queue.pop(0)
+            order.append(router)
+            for neighbor in sorted(neighbors[router]):
+                if not seen[neighbor]:
+                    seen[neighbor] = True
+                    queue.append(neighbor)
+
+    routers = [0] * num_routers
+    total = sum(weights)
+    before = 0
+    for router in order:
+        routers[router] = min(num_parts - 1, before * num_parts // total)
+        before += weights[router]
+
+    # Hosts without a router stay in the first partition.
+    hosts = [0] * network_specs['Hosts']
+    links = []
+    for link in network_specs['Links']:
+        ends = link[3:5]
+        part = 0
+        for type, id in ends:
+            if type == 'R':
+                part = routers[id - 1]
+                break
+        for type, id in ends:
+            if type == 'H':
+                hosts[id - 1] = part
+        links.append(part)
+    return {'routers': routers, 'hosts': hosts, 'links': links}
+
+def lookahead(network_specs, parts, duration):
+    """ Returns the smallest delay (in ms) of the links into a router
+        that also has links of another partition, duration if there is
+        none. """
+    routers = {}
+    for i, link in enumerate(network_specs['Links']):
+        for type, id in link[3:5]:
+            if type == 'R':
+                routers.setdefault(id, []).append(i)
+    delays = []
+    for lids in routers.values():
+        if len(set(parts['links'][i] for i in lids)) > 1:
+            delays.extend(network_specs['Links'][i][1] for i in lids)
+    if not delays:
+        return duration
+    return min(delays)
+
+
+class PartitionLink(OrderedLink):
+    """ Link that sends the packets its routers forward to another
+        partition there, instead of delivering them.
+
+        Attributes:
+            part:
+                partition of the link
+    """
+
+    part = 0
+
+    def post_delivery(self, node, packet, delay, priority):
+        ''' Schedules the delivery of packet to node in delay ms, or sends
+            it to the partition of the link that node forwards it to. '''
+        if isinstance(node, Router):
+            fib = node.fib
+            dest = packet.dest
+            if dest < len(fib) and fib[dest] is not None and \
+                    fib[dest].part != self.part:
+                self.env.post(fib[dest].part,
+                              (self.env.now + delay, priority,
+                               node.get_id(), packet))
+                return
+        schedule_delivery(self.env, node, packet, delay, priority)
+
+
+class PartitionEnv(MainEnv):
+    """ Environment of one partition, run by a worker process. """
+
+    LINK = PartitionLink
+
+    def __init__(self, duration, interval, part, parts, **kwargs):
+        """
+            Args:
+                duration, interval:
+                    as for MainEnv (in ms)
+                part:
+                    partition simulated by this environment
+                parts:
+                    partition of every object, see partition_network
+
+            Attrs:
+                nodes:
+                    a dict of {node id: host or router}
+                outbox:
+                    messages to the other partitions since the last
+                    exchange, a dict of {partition: list of (arrival
+                    time, DeliveryPriority, router id, packet)}
+                num_messages:
+                    number of messages sent
+        """
+        super(PartitionEnv, self).__init__(duration, interval, None, None,
+                                           True, 'static', **kwargs)
+        self.part = part
+        self.parts = parts
+        self.nodes = {}
+        self.outbox = {}
+        self.num_messages = 0
+
+    def owns(self, host):
+        """ Only the flows of the hosts of the partition are sent. """
+        return self.parts['hosts'][self.hosts.index(host)] == self.part
+
+    def loadNetwork(self, ifile):
+        super(PartitionEnv, self).loadNetwork(ifile)
+        for link, part in zip(self.links, self.parts['links']):
+            link.part = part
+        for node in self.hosts + self.routers:
+            self.nodes[node.get_id()] = node
+
+    def post(self, part, message):
+        """ Queues a message to partition part. """
+        self.outbox.setdefault(part, []).append(message)
+        self.num_messages += 1
+
+    def receive(self, messages):
+        """ Schedules the deliveries of the messages of other
+            partitions. """
+        for arrival, priority, node_id, packet in messages:
+            schedule_delivery(self, self.nodes[node_id], packet,
+                              arrival - self.now, priority)
+
+
+def run_partition(conn, ifile, part, parts, duration, interval, window,
+                  env_args):
+    """ Worker process that simulates partition part in windows of window
+        ms. At the end of each window, it sends its outbox on conn and
+        receives the messages for it. It ends by sending the data points
+        it collected. """
+    env = PartitionEnv(duration, interval, part, parts, **env_args)
+    env.loadNetwork(ifile)
+    stats = env.process(env.collect_stats(env))
+    start = time.time()
+    num_windows = int(math.ceil(round(duration / window, 9)))
+    for k in range(1, num_windows):
+        env.run(until=k * window)
+        conn.send(env.outbox)
+        env.outbox = {}
+        env.receive(conn.recv())
+    # The last window ends with the last data collection, as in
+    # MainEnv.start.
+    env.run(until=stats)
+    graph = env.realTimeGraph
+    conn.send({'data_points': dict((field, graph.data_points[field])
+                                   for field in graph.data_points),
+               'num_points': graph.store.num_points,
+               'num_messages': env.num_messages,
+               'sim_time': time.time() - start - env.record_time})
+    conn.close()
+
+
+def run_parallel(ifile, num_parts, duration, interval, graph_type=None,
+                 **env_args):
+    """ Simulates the network of ifile split into num_parts partitions,
+        one worker process each, then exports the merged data points as
+        MainEnv.start does.
+
+        Args:
+            duration, interval:
+                as for MainEnv (in ms)
+            env_args:
+                other arguments of MainEnv, except routing (static)
+
+        Returns:
+            the RealTimeGraph holding the merged data points
+    """
+    start = time.time()
+    network_specs = input(ifile)
+    parts = partition_network(network_specs, num_parts)
+    window = lookahead(network_specs, parts, duration)
+
+    conns = []
+    workers = []
+    for part in range(num_parts):
+        conn, worker_conn = multiprocessing.Pipe()
+        worker = multiprocessing.Process(
+            target=run_partition,
+            args=(worker_conn, ifile, part, parts, duration, interval,
+                  window, env_args))
+        worker.start()
+        conns.append(conn)
+        workers.append(worker)
+
+    # Exchange the messages at the end of every window, until the
+    # workers send their results.
+    num_windows = 0
+    while True:
+        outboxes = [conn.recv() for conn in conns]
+        if 'data_points' in outboxes[0]:
+            results = outboxes
+            break
+        num_windows += 1
+        inboxes = [[] for _ in range(num_parts)]
+        for outbox in outboxes:
+            for part, messages in outbox.items():
+                inboxes[part].extend(messages)
+        for conn, inbox in zip(conns, inboxes):
+            conn.send(inbox)
+    for worker in workers:
+        worker.join()
+
+    # Every row comes from the partition of its object.
+    flow_parts = [parts['hosts'][flow[2] - 1]
+                  for flow in network_specs['Flows']]
+    graph = RealTimeGraph(duration, interval, graph_type,
+                          network_specs['Hosts'],
+                          len(network_specs['Links']),
+                          len(network_specs['Flows']), True)
+    for field in graph.data_points:
+        if field in MainEnv.HOST_FIELDS:
+            owners = parts['hosts']
+        elif field in MainEnv.FLOW_FIELDS:
+            owners = flow_parts
+        else:
+            owners = parts['links']
+        for row, part in enumerate(owners):
+            graph.data_points[field][row] = \
+                results[part]['data_points'][field][row]
+    graph.set_num_points(results[0]['num_points'])
+
+    if graph_type is not None:
+        graph.export_to_jpg()
+    graph.export_to_file()
+    print('Simulated %.1f s in %.2f s over %d partitions (worker '
+          'simulation: %s s)' %
+          (duration / 1000.0, time.time() - start, num_parts,
+           ', '.join('%.2f' % result['sim_time'] for result in results)))
+    print('Lookahead %g ms, %d windows, %d messages between partitions' %
+          (window, num_windows,
+           sum(result['num_messages'] for result in results)))
+    return graph
@@ -1,7 +1,35 @@
-from packet import Packet, RoutingUpdatePacket
-import random
+from packet import (Packet, RoutingUpdatePacket, RoutingDeltaPacket,
+                    LinkStatePacket)
+import heapq
+import copy
+import time
 
 class Router(object):
+    """Router that computes its routing table with distance-vector routing.
+
+    Every update_interval, the router sends its distance estimates to all
+    adjacent routers. Changes in between are sent as triggered updates
+    that only hold the changed entries (RoutingDeltaPacket). At most one
+    triggered update is sent per hold down, later changes being sent
+    together at the end of the hold down. Until convergence_time, the hold
+    down is very short to let routing converge, but still keeps the
+    routers from answering every routing packet with a new one.
+
+    Updates are numbered. A delta is only applied on top of the update
+    with the previous number from the same link, deltas after a lost
+    update are ignored until the next periodic update.
+    """
+
+    # Time (in ms) before triggered updates are rate limited
+    CONVERGENCE_TIME = 500
+    # Hold down between two triggered updates, relative to update_interval
+    HOLD_DOWN = 0.5
+    # Hold down (in ms) until convergence_time
+    CONVERGENCE_HOLD_DOWN = 1
+    # Attributes that hold the routes learned, see get_routing_state
+    ROUTING_STATE = ['routing_table', 'min_dists', 'links_to_dists',
+                     'links_cost', 'links_seq', 'sent_dists', 'update_seq']
+
     def __init__(self, env, router_id, update_interval):
         """
         Attributes:
@@ -15,17 +43,52 @@ class Router(object):
                 a dict of {link_id: host_id}, if the link connects to a host
             routing_table:
                 a dict of {node_id: link_id}
+            fib:
+                forwarding table compiled from routing_table, a list
+                indexed by node_id of the link object to forward to (or
+                None). Rebuilt by update_fib when routing_table changes.
             min_dists:
                 the min cost from the router to other nodes. 
                 a dict of {node_id: dist}
             links_to_dists:
-                the min cost from the router using a link to other nodes.
+                the min cost from the neighbor at the end of a link to
+                other nodes, as received from the neighbor.
                 a dict of {link_id: a dict of {node_id: dist}}
+            links_cost:
+                the cost of each link when its last routing update was
+                received, added to the dists of links_to_dists.
+                a dict of {link_id: cost}
             links_update_timestamp:
                 stores the last time a link sends over routingUpdatePacket
                 a dict of {link_id: timestamp}
+            links_seq:
+                sequence number of the last routing update applied from
+                a link, None after an update was lost.
+                a dict of {link_id: seq_num}
             update_interval:
                 the update_interval for updating the dynamic routing.
+                None for static routing, in which case the router
+                sends no routing packets.
+            hold_down:
+                min time between two triggered updates after
+                convergence_time (in ms)
+            convergence_time:
+                time (in ms) until which triggered updates use
+                CONVERGENCE_HOLD_DOWN, CONVERGENCE_TIME unless the router
+                started with converged routes (see set_routing_state)
+            sent_dists:
+                the dists of the last routing update sent
+            update_seq:
+                sequence number of the last routing update sent
+            last_triggered:
+                time of the last triggered update
+            update_pending:
+                whether a triggered update waits for the hold down
+            routing_packets, routing_bytes:
+                number and size of the routing packets sent
+            routing_time:
+                CPU time (in s) spent processing routing updates, read
+                from time.clock() so that other processes do not count
         """
         
         self.env = env
@@ -34,13 +97,29 @@ class Router(object):
         self.host_links = {}
 
         self.routing_table = {}
+        self.fib = []
         self.min_dists = {}
         self.links_to_dists = {}
+        self.links_cost = {}
         self.links_update_timestamp = {}
+        self.links_seq = {}
         
         self.update_interval = update_interval
+        self.hold_down = None
+        if update_interval is not None:
+            self.hold_down = Router.HOLD_DOWN * update_interval
+        self.convergence_time = Router.CONVERGENCE_TIME
+        self.sent_dists = {}
+        self.update_seq = 0
+        self.last_triggered = None
+        self.update_pending = False
+
+        self.routing_packets = 0
+        self.routing_bytes = 0
+        self.routing_time = 0
     
-        env.process(self.dynamic_routing(self.env))
+        if update_interval is not None:
+            env.process(self.dynamic_routing(self.env))
 
     def get_id(self):
         """Returns host ID."""
@@ -58,7 +137,7 @@ class Router(object):
         self.host_links[lid] = hid
         self.min_dists[hid] = 0
         self.routing_table[hid] = lid
-        self.links_to_dists[lid] = {hid: 0}
+        self.update_fib()
 
     def remove_link(self, link_id):
         """Remove a link from the router. """
@@ -66,91 +145,428 @@ class Router(object):
             del self.links[link_id]
 
     def add_static_routing(self, routing_table):
-        """Inserts environment-configured routing table. Not currently
-        supported due to dynamic programming."""
+        """Inserts environment-configured routing table, a dict of
+        {node_id: link_id}. Used for static routing."""
         self.routing_table = routing_table
+        self.update_fib()
+
+    def get_routing_state(self):
+        """Returns the routes learned by the router, a dict of
+        {attribute name: value} of the attributes in ROUTING_STATE."""
+        return copy.deepcopy(dict((name, getattr(self, name))
+                                  for name in self.ROUTING_STATE))
+
+    def set_routing_state(self, state):
+        """Installs routes learned by a router of the same network, as
+        returned by get_routing_state. The routes are taken as converged
+        and as fresh as updates received now (see routing_cache.py)."""
+        for name, value in copy.deepcopy(state).items():
+            setattr(self, name, value)
+        for lid in self.links_to_dists:
+            self.links_update_timestamp[lid] = self.env.now
+        self.convergence_time = self.env.now
+        self.update_fib()
+
+    def update_fib(self):
+        """Compiles routing_table into fib. Node ids are small integers,
+        so the destination of a packet directly indexes its link."""
+        fib = [None] * (max(self.routing_table) + 1 if self.routing_table
+                        else 0)
+        for nid, lid in self.routing_table.items():
+            if lid is not None:
+                fib[nid] = self.links[lid]
+        self.fib = fib
     
     def process_routing_packet(self, packet):
         """Processes a routing packet.
         Args:
             packet:
-                a RoutingUpdatePacket
+                a RoutingUpdatePacket or RoutingDeltaPacket
         """
         
         # RoutingUpdatePackt has source of link_id
         lid = packet.get_source()
-        
-        link = self.links[lid]
-        link_cost = link.get_weight()
+        seq = packet.get_seq_num()
         link_dists = packet.get_distance_estimates()
 
-        # Updating the distances between the router and other nodes using this
-        # specific link. Also add the current link_cost on the link_dist.
-        self.links_to_dists[lid] = {nid: link_cost + link_dists[nid] 
-                                    for nid in link_dists}
+        if packet.full:
+            self.links_to_dists[lid] = dict(link_dists)
+        elif (self.links_seq.get(lid) is not None and
+              seq == self.links_seq[lid] + 1):
+            dists = self.links_to_dists[lid]
+            for nid in link_dists:
+                if link_dists[nid] is None:
+                    dists.pop(nid, None)
+                else:
+                    dists[nid] = link_dists[nid]
+        else:
+            # An update was lost, wait for the next full one.
+            self.links_seq[lid] = None
+            return
+
+        # Distances using this link are the distances of the neighbor plus
+        # the current link cost.
+        self.links_cost[lid] = self.links[lid].get_weight()
+        self.links_seq[lid] = seq
         self.links_update_timestamp[lid] = self.env.now
         self.update_table()
     
     def update_table(self):
         """Refreshes routing table based on information in links_to_dists.
-        Broadcasts routing information if min_dists changes."""
+        Sends a triggered update if min_dists changes."""
         
         min_dists = {}
+        routes = {}
         for lid in self.links:
             # Set dist to host as 0 and lid as forwarding link.
             if lid in self.host_links:
                 min_dists[self.host_links[lid]] = 0
-                self.routing_table[self.host_links[lid]] = lid
+                routes[self.host_links[lid]] = lid
                 
             # Only update with infomation sent within two update_interval times.
             elif ((lid in self.links_to_dists) and
                   (self.links_update_timestamp[lid] + 2 * self.update_interval 
                    >= self.env.now)):                
+                link_cost = self.links_cost[lid]
                 cur_dists = self.links_to_dists[lid]
                 for nid in cur_dists:
-                    if (not nid in min_dists or cur_dists[nid] < min_dists[nid]):
-                        min_dists[nid] = cur_dists[nid]
-                        self.routing_table[nid] = lid
+                    dist = link_cost + cur_dists[nid]
+                    if (not nid in min_dists or dist < min_dists[nid]):
+                        min_dists[nid] = dist
+                        routes[nid] = lid
+
+        # Only recompile the forwarding table if a route changed
+        routing_table = self.routing_table
+        route_change = False
+        for nid in routes:
+            if routing_table.get(nid) != routes[nid]:
+                routing_table[nid] = routes[nid]
+                route_change = True
+        if route_change:
+            self.update_fib()
         
         change = self.min_dists != min_dists
         self.min_dists = min_dists
         
-        # Broadcast to neighbors if min_dists has changed.
         if change:
-            # Broadcast every part to let routing converge at first
-            if self.env.now < 500:
-                self.broadcast_dists()
-            # Broadcast 1/10 of the packets to avoid overflowing the links
-            # in the later stage
-            elif random.randint(0, 10) == 1:
-                self.broadcast_dists()
+            self.trigger_update()
+
+    def trigger_update(self):
+        """Sends the changes of min_dists to the neighbors, or schedules
+        them for the end of the hold down."""
+        now = self.env.now
+        hold_down = self.hold_down
+        if now < self.convergence_time:
+            hold_down = Router.CONVERGENCE_HOLD_DOWN
+        if not self.update_pending:
+            if (self.last_triggered is None or
+                self.last_triggered + hold_down <= now):
+                self.last_triggered = now
+                self.broadcast_dists(False)
+            else:
+                # Not a process, a callback of the end of the hold down
+                self.update_pending = True
+                hold_down_end = self.env.timeout(
+                    self.last_triggered + hold_down - now)
+                hold_down_end.callbacks.append(self.send_pending_update)
+
+    def send_pending_update(self, event):
+        """Sends the changes of min_dists that waited for the hold down."""
+        self.update_pending = False
+        self.last_triggered = self.env.now
+        self.broadcast_dists(False)
     
-    def broadcast_dists(self):
-        """Broadcasts min_dists to all adjacent non-host devices."""
+    def broadcast_dists(self, full=True):
+        """Broadcasts min_dists, or only the entries that changed since the
+        last update, to all adjacent non-host devices."""
+        # min_dists is replaced, never changed, so it can be shared by
+        # the packets.
+        if full:
+            dists = self.min_dists
+        else:
+            dists = {}
+            for nid in self.min_dists:
+                if self.sent_dists.get(nid) != self.min_dists[nid]:
+                    dists[nid] = self.min_dists[nid]
+            for nid in self.sent_dists:
+                if nid not in self.min_dists:
+                    dists[nid] = None
+            if not dists:
+                return
+        self.sent_dists = self.min_dists
+        self.update_seq += 1
+
         for lid in self.links:
             # Only broadcast to non-host links
             if not lid in self.host_links:
-                packet = RoutingUpdatePacket(lid, -1, -1, self.env.now, 0,
-                                             self.min_dists)
-                self.links[lid].enqueue(packet, self.id)
+                if full:
+                    packet = RoutingUpdatePacket(lid, -1, -1, self.env.now,
+                                                 self.update_seq, dists)
+                else:
+                    packet = RoutingDeltaPacket(lid, self.env.now,
+                                                self.update_seq, dists)
+                self.send_routing_packet(lid, packet)
+
+    def send_routing_packet(self, lid, packet):
+        """Sends a routing packet on a link and counts it."""
+        self.routing_packets += 1
+        self.routing_bytes += packet.get_length()
+        self.links[lid].enqueue(packet, self.id)
         
-    def dynamic_routing(self, env):
-        """Initializes dynamic routing after every update_interval time."""
+    def dynamic_routing(self, env, wait=None):
+        """Initializes dynamic routing after every update_interval time.
+        A process restored from a checkpoint (see checkpoint.py) is given
+        the timeout it waits for."""
         while True:
-            self.broadcast_dists()
-            yield env.timeout(self.update_interval)
+            if wait is None:
+                start = time.clock()
+                self.broadcast_dists()
+                self.routing_time += time.clock() - start
+                wait = env.timeout(self.update_interval)
+            yield wait
+            wait = None
+            start = time.clock()
             self.update_table()
+            self.routing_time += time.clock() - start
 
     def receive_packet(self, packet):
         """ Receives a packet. """
         
         # Process RoutingUpdatePackets.
-        if packet.get_packet_type() == Packet.PacketTypes.routing_update_packet:
+        if packet.packet_type == Packet.PacketTypes.routing_update_packet:
+            start = time.clock()
             self.process_routing_packet(packet)
+            self.routing_time += time.clock() - start
         
         # Immediately forward all other packets.
         else:
-            dest = packet.get_destination()
-            if (dest in self.routing_table and
-                self.routing_table[dest] is not None):
-                self.links[self.routing_table[dest]].enqueue(packet, self.id)
+            dest = packet.dest
+            if dest < len(self.fib):
+                link = self.fib[dest]
+                if link is not None:
+                    link.enqueue(packet, self.id)
+
+
+class LinkStateRouter(Router):
+    """Router that computes its routing table with link state routing.
+
+    Every update_interval, each router floods the weights of its links
+    (Link.get_weight) to all the other routers. Routers keep the latest
+    weights of every router in a link state database and compute their
+    shortest path tree with Dijkstra's algorithm.
+
+    Like in OSPF, link weights are only flooded again when one of them
+    changed by more than WEIGHT_CHANGE (relative to the weight last
+    flooded), or every REFRESH_INTERVALS update intervals, so that the
+    flooding does not grow with the number of routers times the number
+    of links on every update.
+
+    The tree is updated incrementally: a weight that decreased is relaxed
+    from the node it leads to, and only the nodes that get closer are
+    visited. A weight that increased only matters if the edge is in the
+    tree, in which case the whole tree is recomputed. Changes that cannot
+    affect the tree cost no computation at all.
+    """
+
+    WEIGHT_CHANGE = 0.1
+    REFRESH_INTERVALS = 10
+    ROUTING_STATE = ['routing_table', 'min_dists', 'lsdb', 'lsa_seqs',
+                     'lsa_seq', 'lsa_age', 'neighbor_links', 'parents']
+
+    def __init__(self, env, router_id, update_interval):
+        """
+        Attributes:
+            lsdb:
+                link state database, the latest link weights flooded by
+                every router. a dict of {router_id: {node_id: weight}}
+            lsa_seqs:
+                the sequence number of the link weights in lsdb.
+                a dict of {router_id: seq_num}
+            lsa_seq:
+                sequence number of the link weights of this router
+            lsa_age:
+                number of update intervals since the link weights of
+                this router were last flooded
+            neighbor_links:
+                the link used to reach each neighbor.
+                a dict of {node_id: link_id}
+            parents:
+                the shortest path tree, a dict of {node_id: parent node_id}
+            num_full_spf, num_incremental_spf, num_pruned:
+                number of link weight updates that caused a full
+                recomputation, an incremental update or nothing
+        Also see Router. min_dists holds the distances of the shortest
+        path tree and routing_table its first hops.
+        """
+        self.lsdb = {}
+        self.lsa_seqs = {}
+        self.lsa_seq = 0
+        self.lsa_age = 0
+        self.neighbor_links = {}
+        self.parents = {router_id: None}
+
+        self.num_full_spf = 0
+        self.num_incremental_spf = 0
+        self.num_pruned = 0
+
+        super(LinkStateRouter, self).__init__(env, router_id, update_interval)
+        self.min_dists[router_id] = 0
+
+    def add_host(self, host):
+        """Adding a host to the link. Routes to hosts are computed like
+        all the other routes."""
+        self.host_links[host.link.get_id()] = host.get_id()
+
+    def process_routing_packet(self, packet):
+        """Processes a link state packet. New link weights are stored and
+        forwarded to the other routers, old ones are dropped.
+        Args:
+            packet:
+                a LinkStatePacket
+        """
+        origin = packet.get_origin()
+        seq = packet.get_seq_num()
+        if seq <= self.lsa_seqs.get(origin, 0):
+            return
+        link_weights = packet.get_distance_estimates()
+        self.update_lsdb(origin, seq, link_weights)
+        self.flood(origin, seq, link_weights, packet.get_source())
+
+    def update_lsdb(self, origin, seq, link_weights):
+        """Stores the link weights of origin and updates the shortest
+        path tree."""
+        old_weights = self.lsdb.get(origin, {})
+        self.lsdb[origin] = link_weights
+        self.lsa_seqs[origin] = seq
+
+        # Weights of a router out of reach do not matter until it is
+        # reached, they are then read from lsdb.
+        if origin not in self.min_dists:
+            self.num_pruned += 1
+            return
+
+        parents = self.parents
+        for nid in old_weights:
+            if (parents.get(nid) == origin and
+                (nid not in link_weights or
+                 link_weights[nid] > old_weights[nid])):
+                self.num_full_spf += 1
+                self.compute_routes()
+                return
+
+        dist = self.min_dists[origin]
+        heap = []
+        for nid, weight in link_weights.items():
+            old_weight = old_weights.get(nid)
+            if ((old_weight is None or weight < old_weight) and
+                dist + weight < self.min_dists.get(nid, float('inf'))):
+                heap.append((dist, origin))
+                break
+        if heap:
+            self.num_incremental_spf += 1
+            if self.relax(heap):
+                self.update_fib()
+        else:
+            self.num_pruned += 1
+
+    def compute_routes(self):
+        """Recomputes the whole shortest path tree."""
+        self.min_dists = {self.id: 0}
+        self.parents = {self.id: None}
+        self.routing_table = {}
+        self.relax([(0, self.id)])
+        self.update_fib()
+
+    def relax(self, heap):
+        """Runs Dijkstra's algorithm from the (dist, node_id) in heap,
+        whose distances in min_dists must be up to date. Only the nodes
+        that get closer are visited. Returns whether a route changed."""
+        min_dists = self.min_dists
+        parents = self.parents
+        routing_table = self.routing_table
+        lsdb = self.lsdb
+        route_change = False
+        heapq.heapify(heap)
+        while heap:
+            dist, nid = heapq.heappop(heap)
+            if dist > min_dists[nid] or nid not in lsdb:
+                continue
+            first_hop = routing_table.get(nid)
+            for next_id, weight in lsdb[nid].items():
+                next_dist = dist + weight
+                if next_dist < min_dists.get(next_id, float('inf')):
+                    min_dists[next_id] = next_dist
+                    parents[next_id] = nid
+                    if nid == self.id:
+                        hop = self.neighbor_links[next_id]
+                    else:
+                        hop = first_hop
+                    if routing_table.get(next_id) != hop:
+                        routing_table[next_id] = hop
+                        route_change = True
+                    heapq.heappush(heap, (next_dist, next_id))
+        return route_change
+
+    def weights_changed(self, link_weights):
+        """Returns whether link_weights differ enough from the weights
+        last flooded to be flooded again."""
+        old_weights = self.lsdb.get(self.id, {})
+        for nid, weight in link_weights.items():
+            old_weight = old_weights.get(nid)
+            if (old_weight is None or
+                abs(weight - old_weight) > self.WEIGHT_CHANGE * old_weight):
+                return True
+        return False
+
+    def originate(self):
+        """Measures the weights of the links of the router and floods
+        them to the other routers if needed."""
+        link_weights = {}
+        neighbor_links = {}
+        for lid, link in self.links.items():
+            ids = link.device_ids
+            nid = ids[1] if ids[0] == self.id else ids[0]
+            weight = link.get_weight()
+            if nid not in link_weights or weight < link_weights[nid]:
+                link_weights[nid] = weight
+                neighbor_links[nid] = lid
+
+        self.lsa_age += 1
+        if (neighbor_links == self.neighbor_links and
+            self.lsa_age < self.REFRESH_INTERVALS and
+            not self.weights_changed(link_weights)):
+            return
+        self.lsa_age = 0
+        self.lsa_seq += 1
+        if neighbor_links != self.neighbor_links:
+            # First hops changed, the tree has to be rebuilt.
+            self.neighbor_links = neighbor_links
+            self.lsdb[self.id] = link_weights
+            self.lsa_seqs[self.id] = self.lsa_seq
+            self.num_full_spf += 1
+            self.compute_routes()
+        else:
+            self.update_lsdb(self.id, self.lsa_seq, link_weights)
+        self.flood(self.id, self.lsa_seq, link_weights, None)
+
+    def flood(self, origin, seq, link_weights, from_lid):
+        """Sends link weights to all adjacent routers but the one they
+        came from."""
+        for lid in self.links:
+            if lid != from_lid and not lid in self.host_links:
+                packet = LinkStatePacket(lid, self.env.now, seq, origin,
+                                         link_weights)
+                self.send_routing_packet(lid, packet)
+
+    def dynamic_routing(self, env, wait=None):
+        """Floods the link weights of the router every update_interval.
+        A process restored from a checkpoint is given the timeout it waits
+        for."""
+        while True:
+            if wait is None:
+                start = time.clock()
+                self.originate()
+                self.routing_time += time.clock() - start
+                wait = env.timeout(self.update_interval)
+            yield wait
+            wait = None
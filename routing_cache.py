@@ -0,0 +1,108 @@
+"""
+Cache of converged routing tables.
+
+Dynamic routing starts with empty tables, and every simulation of a
+topology spends its first update intervals flooding routing packets until
+the routes settle. The converged state of the routers only depends on the
+topology, the routing mode and the update interval, so it is computed once
+by a simulation of the routing alone, without flows, and saved in a cache
+directory under a hash of those. Later simulations of the same topology
+install it at time 0 and start with every route in place.
+
+A warm started simulation does not give the same results as one started
+with empty tables: its first packets are routed right away.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+
+from router import Router
+
+# Part of the key, to be increased when the saved router state changes
+VERSION = 1
+# Routes must not change for this many update intervals to be converged
+STABLE_INTERVALS = 2
+# Update intervals simulated after CONVERGENCE_TIME at most
+MAX_INTERVALS = 100
+
+def cache_key(network_specs, routing, update_int):
+    """ Returns the key of the converged routes of a network: a hash of
+        its hosts, routers and links, the routing mode and the update
+        interval (in ms). The flows do not matter. """
+    topology = {'Hosts': network_specs['Hosts'],
+                'Routers': network_specs['Routers'],
+                'Links': network_specs['Links'],
+                'routing': routing,
+                'update_int': float(update_int),
+                'version': VERSION}
+    return hashlib.sha1(json.dumps(topology, sort_keys=True)).hexdigest()
+
+def routes_complete(env):
+    """ Returns whether every router has a route to every host. """
+    for router in env.routers:
+        for host in env.hosts:
+            if router.routing_table.get(host.get_id()) is None:
+                return False
+    return True
+
+def converge(env_class, network_specs, routing, update_int):
+    """ Simulates the routing of a network without its flows, until every
+        router has a route to every host and no route changed for
+        STABLE_INTERVALS update intervals, or MAX_INTERVALS.
+
+        Returns:
+            (time in ms, {router_id: routing state}), see
+            Router.get_routing_state
+    """
+    max_time = Router.CONVERGENCE_TIME + MAX_INTERVALS * update_int
+    env = env_class(max_time, max_time, update_int, None, True, routing)
+    env.buildNetwork(dict(network_specs, Flows=[]))
+
+    until = Router.CONVERGENCE_TIME
+    tables = None
+    stable = 0
+    while until < max_time:
+        env.run(until=until)
+        last_tables = tables
+        tables = [dict(router.routing_table) for router in env.routers]
+        if tables == last_tables and routes_complete(env):
+            stable += 1
+            if stable == STABLE_INTERVALS:
+                break
+        else:
+            stable = 0
+        until += update_int
+
+    return env.now, dict((router.get_id(), router.get_routing_state())
+                         for router in env.routers)
+
+def converged_routes(cache_dir, env_class, network_specs, routing,
+                     update_int):
+    """ Returns the routing state of every router of a network once
+        converged, a dict of {router_id: routing state}, from cache_dir.
+        If not there, it is computed with a simulation by env_class (see
+        converge) and saved. """
+    key = cache_key(network_specs, routing, update_int)
+    fname = os.path.join(cache_dir, key + '.pkl')
+    if os.path.exists(fname):
+        with open(fname, 'rb') as fin:
+            return pickle.load(fin)['states']
+
+    converged_at, states = converge(env_class, network_specs, routing,
+                                    update_int)
+    try:
+        os.makedirs(cache_dir)
+    except OSError:
+        if not os.path.isdir(cache_dir):
+            raise
+    # Written under another name first, simulations running at the same
+    # time only ever read a whole file.
+    fd, tmp = tempfile.mkstemp(dir=cache_dir)
+    with os.fdopen(fd, 'wb') as fout:
+        pickle.dump({'converged_at': converged_at, 'states': states}, fout,
+                    pickle.HIGHEST_PROTOCOL)
+    os.rename(tmp, fname)
+    return states
@@ -0,0 +1,137 @@
+"""Event queues for the simulation: SimPy's binary heap or a calendar
+queue."""
+
+import heapq
+
+class CalendarQueue(object):
+    """
+        Calendar queue (R. Brown, 1988) of the scheduled events.
+
+        Time is cut into slots of width ms and slot s is kept in bucket
+        s % num_buckets, like the days of a year in a desk calendar. Each
+        bucket is a small heap of the same (time, priority, id, event)
+        entries as SimPy's event queue, so the events come out in exactly
+        the same order. Popping scans the buckets from the slot of the
+        latest event on; with a width close to the usual gap between
+        events, it finds the next one within a bucket or two.
+
+        The number of buckets doubles or halves with the number of events,
+        and the width is then estimated again from the gaps between the
+        next events, so both operations take amortized O(1) time.
+    """
+
+    # Smallest number of buckets
+    MIN_BUCKETS = 16
+    # Initial width (in ms) of the slots
+    WIDTH = 1.0
+    # Number of next events used to estimate the width
+    SAMPLE = 25
+
+    def __init__(self, width=WIDTH):
+        """
+            Attributes:
+                buckets:
+                    list of the heaps of entries of each bucket
+                width:
+                    width (in ms) of the slots
+                slot:
+                    slot of the latest event popped
+                now:
+                    time (in ms) of the latest event popped, no entry
+                    can come before it
+                size:
+                    number of entries in the queue
+                num_resizes:
+                    number of times the buckets were rebuilt
+        """
+        self.buckets = [[] for _ in range(self.MIN_BUCKETS)]
+        self.width = width
+        self.slot = 0
+        self.now = 0
+        self.size = 0
+        self.num_resizes = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, entry):
+        """ Function to add a (time, priority, id, event) entry. """
+        buckets = self.buckets
+        heapq.heappush(buckets[int(entry[0] / self.width) % len(buckets)],
+                       entry)
+        self.size += 1
+        if self.size > 2 * len(buckets):
+            self.resize(2 * len(buckets))
+
+    def pop(self):
+        """ Function to remove and return the entry that comes first.
+            Raises IndexError if the queue is empty. """
+        buckets = self.buckets
+        num_buckets = len(buckets)
+        # Usually the next event is in the slot of the latest one
+        bucket = buckets[self.slot % num_buckets]
+        if not bucket or int(bucket[0][0] / self.width) > self.slot:
+            bucket = buckets[self.find()]
+        entry = heapq.heappop(bucket)
+        self.now = entry[0]
+        self.slot = int(self.now / self.width)
+        self.size -= 1
+        if 2 * self.size < num_buckets and num_buckets > self.MIN_BUCKETS:
+            self.resize(num_buckets // 2)
+        return entry
+
+    def peek(self):
+        """ Function that returns the entry that comes first, or None if
+            the queue is empty. """
+        if not self.size:
+            return None
+        return self.buckets[self.find()][0]
+
+    def find(self):
+        """ Function that returns the index of the bucket holding the
+            entry that comes first. """
+        if not self.size:
+            raise IndexError('pop from an empty calendar queue')
+        buckets = self.buckets
+        num_buckets = len(buckets)
+        width = self.width
+        slot = self.slot
+        # One year of slots from the latest event on
+        for _ in range(num_buckets):
+            bucket = buckets[slot % num_buckets]
+            if bucket and int(bucket[0][0] / width) <= slot:
+                return slot % num_buckets
+            slot += 1
+        # The next event is more than a year away, look at all the heads
+        heads = [(bucket[0], i) for i, bucket in enumerate(buckets)
+                 if bucket]
+        return min(heads)[1]
+
+    def resize(self, num_buckets):
+        """ Function to spread the entries over num_buckets buckets, with
+            a width estimated from the next events. """
+        entries = [entry for bucket in self.buckets for entry in bucket]
+        entries.sort()
+        self.width = self.estimate_width(entries)
+        self.buckets = [[] for _ in range(num_buckets)]
+        # Sorted entries are already valid heaps once split
+        for entry in entries:
+            self.buckets[int(entry[0] / self.width) % num_buckets].append(
+                entry)
+        # Events may still be scheduled at the current time, so the scan
+        # starts from there rather than from the next entry.
+        self.slot = int(self.now / self.width)
+        self.num_resizes += 1
+
+    def estimate_width(self, entries):
+        """ Function that returns three times the average gap between the
+            next events, leaving out gaps more than twice the average, or
+            the current width if all the next events are at the same
+            time. """
+        times = [entry[0] for entry in entries[:self.SAMPLE]]
+        gaps = [b - a for a, b in zip(times, times[1:]) if b > a]
+        if not gaps:
+            return self.width
+        average = sum(gaps) / len(gaps)
+        gaps = [gap for gap in gaps if gap <= 2 * average]
+        return 3 * sum(gaps) / len(gaps)
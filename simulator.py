@@ -4,6 +4,9 @@ The main function for the network simulator for command line
 
 import sys, getopt
 from env import MainEnv
+from flow import ReceivingFlow
+from pdes import run_parallel
+from checkpoint import load_checkpoint
 
 S_TO_MS = 1000
 
@@ -16,34 +19,93 @@ def main(argv):
                 an int, total duration for the network
             -p:
                 an int, the report period for collecting stats
+            --headless:
+                run without drawing the real time graph; metrics are
+                still recorded and exported when the simulation is over
+            --routing:
+                routing mode, dv (distance-vector, default), ls (link
+                state) or static (no routing updates)
+            --ack-every:
+                receivers acknowledge every N data packets received in
+                order (default 1, no delayed acknowledgments)
+            --ack-delay:
+                time (in ms) after which a delayed acknowledgment is sent
+            --scheduler:
+                event queue, heap (SimPy's binary heap, default) or
+                calendar (calendar queue)
+            --partitions:
+                split the network into N partitions simulated by as many
+                processes (default 1), needs --routing=static
+            --checkpoint:
+                time:file, save the state of the simulation at time (in
+                s) to file and go on
+            --restore:
+                resume the simulation saved in a checkpoint file instead
+                of starting one, headless. -i, -t and -p are not needed,
+                the options given replace the ones of the checkpoint
+            --routing-cache:
+                directory of the cached converged routing tables. The
+                dynamic routers start with the tables of the topology,
+                computed and cached first if needed
+            --fast-forward:
+                stop the simulation once every flow is done and no data
+                is left in the network, the data points left are filled
+                in with zeros
     """
 
     input = ''
     duration = 0
     interval = 0
     updateInterval = .1
+    # Show everything by default
+    graph_type = None
+    headless = False
+    routing = 'dv'
+    ackEvery = 1
+    ackDelay = ReceivingFlow.ACK_DELAY
+    scheduler = 'heap'
+    partitions = 1
+    checkpoint = None
+    restore = None
+    routingCache = None
+    fastForward = False
+    # Options that replace the ones of a restored checkpoint
+    settings = {}
 
     try:
         opts, args = getopt.getopt(argv, "hi:o:t:p:r:d:g:",
                                    ["ifile=", "ofile=",
                                     "total=", "period=",
-                                    "update=", "delay="
-                                    "graph="])
+                                    "update=", "delay=",
+                                    "graph=", "headless",
+                                    "routing=", "ack-every=",
+                                    "ack-delay=", "scheduler=",
+                                    "partitions=", "checkpoint=",
+                                    "restore=", "routing-cache=",
+                                    "fast-forward"])
     except getopt.GetoptError:
         print ('simulator.py '
                '-i <intputFile>'
 		       '-t <totalDuration> '
                '-p <reportPeriod>'
                '-r <routingUpdatePeriod>'
-               '-g <outputGraph>')
+               '-g <outputGraph> '
+               '[--headless] [--routing=dv|ls|static] '
+               '[--ack-every=N] [--ack-delay=ms] '
+               '[--scheduler=heap|calendar] [--partitions=N] '
+               '[--checkpoint=time:file] [--restore=file] '
+               '[--routing-cache=dir] [--fast-forward]')
         sys.exit(2)
     for opt, arg in opts:
-        # Show everything by default
-        graph_type = None
         if opt == '-h':
             print ('simulator.py -i <intputFile> -t <totalDuration> '
                    '-p <reportPeriod> -r <routingUpdatePeriod> '
-                   '-d <delayForFlows> -g <outputGraph:id1,id2>' )
+                   '-d <delayForFlows> -g <outputGraph:id1,id2> '
+                   '[--headless] [--routing=dv|ls|static] '
+                   '[--ack-every=N] [--ack-delay=ms] '
+                   '[--scheduler=heap|calendar] [--partitions=N] '
+                   '[--checkpoint=time:file] [--restore=file] '
+                   '[--routing-cache=dir] [--fast-forward]')
             sys.exit()
         elif opt in ("-i", "--ifile"):
             ifile = arg
@@ -61,17 +123,85 @@ def main(argv):
             delayForFlows = float(arg)
         elif opt in ("-r", "--update"):
             updateInterval = float(arg)
+            settings['update_int'] = updateInterval * S_TO_MS
+        elif opt == "--headless":
+            headless = True
+        elif opt == "--routing":
+            routing = arg
+        elif opt == "--ack-every":
+            ackEvery = int(arg)
+            settings['ack_every'] = ackEvery
+        elif opt == "--ack-delay":
+            ackDelay = float(arg)
+            settings['ack_delay'] = ackDelay
+        elif opt == "--scheduler":
+            scheduler = arg
+            settings['scheduler'] = scheduler
+        elif opt == "--partitions":
+            partitions = int(arg)
+        elif opt == "--checkpoint":
+            at, fname = arg.split(':', 1)
+            checkpoint = (float(at) * S_TO_MS, fname)
+        elif opt == "--restore":
+            restore = arg
+        elif opt == "--routing-cache":
+            routingCache = arg
+        elif opt == "--fast-forward":
+            fastForward = True
+            settings['fast_forward'] = fastForward
 
-    if duration <= 0:
+    if restore is None and duration <= 0:
         print 'Total duration should be a positive int'
         sys.exit(2)
-    if interval <= 0:
+    if restore is None and interval <= 0:
         print 'Interval for data collection should be a positive int'
         sys.exit(2)
+    if routing not in MainEnv.ROUTERS:
+        print 'Routing mode should be one of ' + ', '.join(MainEnv.ROUTERS)
+        sys.exit(2)
+    if ackEvery < 1 or ackDelay <= 0:
+        print 'Acknowledgments should be sent every N >= 1 packets ' \
+              'and after a positive delay'
+        sys.exit(2)
+    if scheduler not in MainEnv.SCHEDULERS:
+        print 'Scheduler should be one of ' + ', '.join(MainEnv.SCHEDULERS)
+        sys.exit(2)
+
+    if partitions < 1:
+        print 'Number of partitions should be a positive int'
+        sys.exit(2)
+    if partitions > 1 and routing != 'static':
+        # Dynamic routes may change while packets cross partitions
+        print 'Partitioned simulation needs --routing=static'
+        sys.exit(2)
+    if partitions > 1 and fastForward:
+        # No partition knows whether the others are idle
+        print 'Partitioned simulation cannot be fast forwarded'
+        sys.exit(2)
+
+    if checkpoint is not None and (restore is not None or partitions > 1
+                                   or fastForward
+                                   or not 0 < checkpoint[0] < duration
+                                   * S_TO_MS):
+        print 'Checkpoint time should be within the total duration, ' \
+              'without --restore, --partitions or --fast-forward'
+        sys.exit(2)
 
+    if restore is not None:
+        mainEnv = load_checkpoint(restore, **settings)
+        print 'Resuming at %.3f s' % (mainEnv.now / float(S_TO_MS))
+        mainEnv.run_to_end()
+        return
+    if partitions > 1:
+        run_parallel(ifile, partitions, duration * S_TO_MS,
+                     interval * S_TO_MS, graph_type, ack_every=ackEvery,
+                     ack_delay=ackDelay, scheduler=scheduler)
+        return
     mainEnv = MainEnv(duration * S_TO_MS, interval * S_TO_MS,
-                      updateInterval * S_TO_MS, graph_type)
-    mainEnv.start(ifile)
+                      updateInterval * S_TO_MS, graph_type, headless,
+                      routing, ackEvery, ackDelay, scheduler,
+                      routing_cache=routingCache, fast_forward=fastForward)
+    mainEnv.start(ifile, checkpoint)
 
 if __name__ == "__main__":
     main(sys.argv[1:])
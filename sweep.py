@@ -0,0 +1,274 @@
+"""
+Parameter sweeps of the network simulator over a process pool.
+
+Every point of the grid of input files, routing update intervals, FAST
+alpha values and link buffer sizes is run headless in its own directory,
+so that the results folder and router.txt of one run never clobber
+another. The metrics of all the runs are then merged into one dataset,
+indexed by run, that load_sweep() opens.
+"""
+
+import sys, getopt
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import traceback
+import numpy as np
+
+from env import MainEnv
+from flow import SendingFlow
+from input import input
+from metrics import load_metrics
+
+S_TO_MS = 1000
+INDEX = 'index.json'
+MERGED = 'merged'
+
+def sweep_points(inputs, updates, alphas, buffers,
+                 fast_timeout=SendingFlow.FAST_TIMEOUT):
+    """ Returns one dict of parameters per point of the grid, in the order
+        of the runs. A buffer size of None keeps the ones of the input
+        file. Every point also records the interval (in ms) of the FAST
+        window updates, which does not depend on alpha. """
+    points = []
+    for i, (ifile, update, alpha, buffer_size) in enumerate(
+            itertools.product(inputs, updates, alphas, buffers)):
+        points.append({'run': i,
+                       'dir': 'run_%04d' % i,
+                       'input': ifile,
+                       'update': update,
+                       'alpha': alpha,
+                       'fast_timeout': fast_timeout,
+                       'buffer': buffer_size})
+    return points
+
+def run_point(args):
+    """ Runs one point of the sweep in its own directory and returns the
+        point with its wall clock time and error, if any.
+
+        Args:
+            args:
+                (point, sweep directory, duration, interval) with the
+                duration and interval in s
+    """
+    point, sweep_dir, duration, interval = args
+    point = dict(point)
+    run_dir = os.path.join(sweep_dir, point['dir'])
+    stdout = sys.stdout
+    start = time.time()
+    # Anything that goes wrong, even before the simulation, fails this
+    # point only, the others still run and are merged.
+    try:
+        os.makedirs(os.path.join(run_dir, 'results'))
+
+        # The input file, with the buffer size of the point on every link
+        network_specs = input(point['input'])
+        if point['buffer'] is not None:
+            for link in network_specs['Links']:
+                link[2] = point['buffer']
+        ifile = os.path.join(run_dir, 'input.json')
+        with open(ifile, 'w') as fout:
+            json.dump(network_specs, fout)
+
+        # Pool processes run one point each, so the output files of the
+        # simulator can be written relative to the run directory.
+        os.chdir(run_dir)
+        with open('log.txt', 'w') as log:
+            sys.stdout = log
+            mainEnv = MainEnv(duration * S_TO_MS, interval * S_TO_MS,
+                              point['update'] * S_TO_MS, None, True,
+                              fast_alpha=point['alpha'],
+                              fast_timeout=point['fast_timeout'])
+            mainEnv.start('input.json')
+        point['error'] = None
+    except Exception:
+        point['error'] = traceback.format_exc()
+    finally:
+        sys.stdout = stdout
+    point['wall'] = time.time() - start
+    return point
+
+def run_sweep(points, sweep_dir, duration, interval, jobs=None):
+    """ Runs all the points over a pool of jobs processes (one per core by
+        default), then writes the index and the merged metrics to
+        sweep_dir. Returns the points with their wall clock time and
+        error. """
+    sweep_dir = os.path.abspath(sweep_dir)
+    os.makedirs(sweep_dir)
+    tasks = [(point, sweep_dir, duration, interval) for point in points]
+    # One point per process, nothing is left over from a previous run
+    pool = multiprocessing.Pool(jobs, maxtasksperchild=1)
+    results = [None] * len(points)
+    try:
+        for point in pool.imap_unordered(run_point, tasks):
+            results[point['run']] = point
+            print('%s done in %.2f s%s' % (point['dir'], point['wall'],
+                                           ' (failed)' if point['error']
+                                           else ''))
+    finally:
+        pool.close()
+        pool.join()
+
+    with open(os.path.join(sweep_dir, INDEX), 'w') as fout:
+        json.dump({'duration': duration, 'interval': interval,
+                   'points': results}, fout, indent=2, sort_keys=True)
+    merge_metrics(sweep_dir, results)
+    return results
+
+def merge_metrics(sweep_dir, points):
+    """ Merges the metrics of the runs into sweep_dir/merged, in the format
+        of MetricStore.save with one more leading axis: every field is an
+        array of shape (number of runs, number of objects, number of
+        points). Runs with fewer objects, or that failed, are padded with
+        NaN. """
+    manifests = {}
+    time_series = None
+    for point in points:
+        if point['error'] is None:
+            manifest, times, values = load_metrics(
+                os.path.join(sweep_dir, point['dir'], 'results',
+                             'raw_data'))
+            manifests[point['run']] = (manifest, values)
+            time_series = times
+
+    merged_dir = os.path.join(sweep_dir, MERGED)
+    os.makedirs(merged_dir)
+    merged = {'interval': None, 'duration': None,
+              'num_points': 0, 'time_series': 'time_series.npy',
+              'runs': [point['dir'] for point in points],
+              'fields': {}}
+    if time_series is None:
+        np.save(os.path.join(merged_dir, 'time_series.npy'), np.zeros(0))
+    else:
+        np.save(os.path.join(merged_dir, 'time_series.npy'), time_series)
+        merged['num_points'] = len(time_series)
+
+    fields = set()
+    for manifest, values in manifests.values():
+        merged['interval'] = manifest['interval']
+        merged['duration'] = manifest['duration']
+        fields.update(manifest['fields'])
+    for field in sorted(fields):
+        rows = max(values[field].shape[0]
+                   for manifest, values in manifests.values())
+        data = np.empty((len(points), rows, merged['num_points']))
+        data.fill(np.nan)
+        ids = [[] for _ in points]
+        for run, (manifest, values) in manifests.items():
+            array = values[field]
+            data[run, :array.shape[0], :array.shape[1]] = array
+            ids[run] = manifest['fields'][field]['ids']
+            unit = manifest['fields'][field]['unit']
+        fname = field + '.npy'
+        np.save(os.path.join(merged_dir, fname), data)
+        merged['fields'][field] = {'file': fname, 'unit': unit, 'ids': ids}
+
+    with open(os.path.join(merged_dir, 'manifest.json'), 'w') as fout:
+        json.dump(merged, fout, indent=2, sort_keys=True)
+
+def load_sweep(sweep_dir, mmap_mode='r'):
+    """ Opens the merged metrics of a sweep.
+
+        Returns:
+            (points, time_series, values) where points is the list of
+            parameters of each run and values is a dict of {field: array
+            of shape (number of runs, number of objects, number of
+            points)}
+    """
+    with open(os.path.join(sweep_dir, INDEX)) as fin:
+        points = json.load(fin)['points']
+    manifest, time_series, values = load_metrics(
+        os.path.join(sweep_dir, MERGED), mmap_mode)
+    return points, time_series, values
+
+def parse_list(arg, convert):
+    """ Returns the comma separated values of arg, converted. """
+    return [convert(value) for value in arg.split(',')]
+
+def main(argv):
+    """
+        Args:
+            -i:
+                comma separated input files
+            -o:
+                directory of the sweep, must not exist yet
+            -t:
+                total duration (in s) of each run
+            -p:
+                interval (in s) at which data is collected
+            -r:
+                comma separated routing update intervals (in s)
+            -j:
+                number of processes, one per core by default
+            --alpha:
+                comma separated FAST alpha values
+            --buffer:
+                comma separated link buffer sizes (in KB) set on every
+                link, the ones of the input file by default
+    """
+    inputs = []
+    sweep_dir = ''
+    duration = 0
+    interval = 0.5
+    updates = [5]
+    jobs = None
+    alphas = [SendingFlow.ALPHA]
+    buffers = [None]
+    usage = ('sweep.py -i <inputFile,...> -o <sweepDir> -t <totalDuration> '
+             '-p <reportPeriod> -r <routingUpdatePeriod,...> -j <jobs> '
+             '[--alpha=a,...] [--buffer=KB,...]')
+
+    try:
+        opts, args = getopt.getopt(argv, "hi:o:t:p:r:j:",
+                                   ["alpha=", "buffer="])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt == "-i":
+            inputs = parse_list(arg, str)
+        elif opt == "-o":
+            sweep_dir = arg
+        elif opt == "-t":
+            duration = float(arg)
+        elif opt == "-p":
+            interval = float(arg)
+        elif opt == "-r":
+            updates = parse_list(arg, float)
+        elif opt == "-j":
+            jobs = int(arg)
+        elif opt == "--alpha":
+            alphas = parse_list(arg, float)
+        elif opt == "--buffer":
+            buffers = parse_list(arg, float)
+
+    if not inputs or not sweep_dir:
+        print(usage)
+        sys.exit(2)
+    if duration <= 0 or interval <= 0:
+        print('Total duration and report period should be positive')
+        sys.exit(2)
+    if os.path.exists(sweep_dir):
+        print('Sweep directory ' + sweep_dir + ' already exists')
+        sys.exit(2)
+
+    inputs = [os.path.abspath(ifile) for ifile in inputs]
+    points = sweep_points(inputs, updates, alphas, buffers)
+    print('%d runs over %d processes' %
+          (len(points), jobs or multiprocessing.cpu_count()))
+    start = time.time()
+    results = run_sweep(points, sweep_dir, duration, interval, jobs)
+    failed = [point['dir'] for point in results if point['error']]
+    print('Sweep done in %.2f s, %.2f s of simulation' %
+          (time.time() - start, sum(point['wall'] for point in results)))
+    if failed:
+        print('Failed runs (see index.json): ' + ', '.join(failed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,60 @@
+import sys
+sys.path.append('../')
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from env import MainEnv
+from checkpoint import load_checkpoint
+
+class CheckpointTest(unittest.TestCase):
+    """Test that a simulation restored from a checkpoint goes on exactly as
+    the one that was saved."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dirname = tempfile.mkdtemp()
+        os.chdir(self.dirname)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dirname)
+
+    def simulate(self, case, checkpoint=None):
+        """Runs 6 s of a test case with distance-vector routing."""
+        env = MainEnv(6000, 500, 1000, None, True)
+        env.start(os.path.join(self.cwd, '..', case), checkpoint)
+        return env
+
+    def assertSameData(self, env, restored):
+        for field in env.realTimeGraph.data_points:
+            self.assertTrue(np.array_equal(
+                env.realTimeGraph.data_points[field],
+                restored.realTimeGraph.data_points[field]), field)
+
+    def test_resume(self):
+        """Checks every data point of FAST flows restored in the middle of
+        an interval."""
+
+        env = self.simulate('test_case_2')
+        self.simulate('test_case_2', (2345.6, 'checkpoint.pkl'))
+        restored = load_checkpoint('checkpoint.pkl')
+        self.assertEqual(2345.6, restored.now)
+        restored.run_to_end()
+        self.assertSameData(env, restored)
+
+    def test_settings(self):
+        """Checks that the Tahoe flows restored with the calendar queue
+        go on the same, and that settings are replaced."""
+
+        env = self.simulate('test_case_1')
+        self.simulate('test_case_1', (3000, 'checkpoint.pkl'))
+        restored = load_checkpoint('checkpoint.pkl', scheduler='calendar',
+                                   ack_delay=20)
+        self.assertEqual(20, restored.ack_delay)
+        restored.run_to_end()
+        self.assertSameData(env, restored)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import sys
+sys.path.append('../')
+import unittest
+import simpy
+from fast import FastController
+
+class FastControllerTest(unittest.TestCase):
+    """Test the window updates of the shared FAST controller."""
+
+    def setUp(self):
+        self.env = simpy.Environment()
+        self.controller = FastController(self.env)
+
+    def test_update(self):
+        """Checks that flows are updated every fast_timeout ms after their
+        start, flows that started together by the same event."""
+
+        first = self.controller.add_flow(20, 200.0, 100.0, 50, 500)
+        second = self.controller.add_flow(10, 100.0, 100.0, 5, 500)
+        self.env.run(until=250)
+        third = self.controller.add_flow(20, 100.0, 100.0, 1, 1000)
+
+        self.env.run(until=501)
+        self.assertEqual(60, self.controller.window_size[first])
+        self.assertEqual(15, self.controller.window_size[second])
+        self.assertEqual(20, self.controller.window_size[third])
+        self.assertEqual(1, self.controller.num_updates)
+
+        self.env.run(until=1251)
+        self.assertEqual(80, self.controller.window_size[first])
+        self.assertEqual(21, self.controller.window_size[third])
+        self.assertEqual(3, self.controller.num_updates)
+
+    def test_remove(self):
+        """Checks that a removed flow keeps a window of 0 and that the
+        controller stops once no flow is left."""
+
+        slots = [self.controller.add_flow(20, 100.0, 100.0, 50, 500)
+                 for _ in range(FastController.SLOTS + 1)]
+        self.env.run(until=501)
+        for slot in slots:
+            self.controller.remove_flow(slot)
+        self.env.run()
+
+        self.assertEqual(0, self.controller.window_size[:len(slots)].sum())
+        self.assertEqual(1, self.controller.num_updates)
+        self.assertEqual(1000, self.env.now)
+
+if __name__ == '__main__':
+    unittest.main()
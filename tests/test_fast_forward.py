@@ -0,0 +1,67 @@
+import sys
+sys.path.append('../')
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from env import MainEnv
+
+class FastForwardTest(unittest.TestCase):
+    """Test that a simulation stopped once the network is idle records the
+    same data as the whole simulation."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dirname = tempfile.mkdtemp()
+        os.chdir(self.dirname)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dirname)
+
+    def simulate(self, case, duration, routing, fast_forward):
+        """Runs duration ms of a test case."""
+        env = MainEnv(duration, 500, 5000, None, True, routing,
+                      fast_forward=fast_forward)
+        env.loadNetwork(os.path.join(self.cwd, '..', case))
+        env.run(until=env.process(env.collect_stats(env)))
+        return env
+
+    def test_static(self):
+        """Checks every data point of 30 s of test case 0 with static
+        routing, where nothing at all happens once the flow is done."""
+
+        env = self.simulate('test_case_0', 30000, 'static', False)
+        idle = self.simulate('test_case_0', 30000, 'static', True)
+        self.assertIsNone(env.idle_at)
+        self.assertEqual(30000, env.now)
+        self.assertEqual(idle.idle_at, idle.now)
+        self.assertLess(idle.now, 30000)
+        self.assertGreater(idle.now, idle.flows[0].end_time)
+
+        graph = idle.realTimeGraph
+        self.assertEqual(graph.num_samples + 1, graph.store.num_points)
+        for field in graph.data_points:
+            self.assertTrue(np.array_equal(
+                env.realTimeGraph.data_points[field],
+                graph.data_points[field]), field)
+
+    def test_routing_packets(self):
+        """Checks that routing packets do not keep test case 1 busy, and
+        are left out of the data points filled in."""
+
+        env = self.simulate('test_case_1', 40000, 'dv', False)
+        idle = self.simulate('test_case_1', 40000, 'dv', True)
+        self.assertLess(idle.now, 40000)
+
+        graph = idle.realTimeGraph
+        for field in MainEnv.HOST_FIELDS + MainEnv.FLOW_FIELDS:
+            self.assertTrue(np.array_equal(
+                env.realTimeGraph.data_points[field],
+                graph.data_points[field]), field)
+        filled = int(idle.now / idle.interval) + 1
+        self.assertFalse(graph.data_points['link_rate'][:, filled:].any())
+
+if __name__ == '__main__':
+    unittest.main()
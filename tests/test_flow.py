@@ -0,0 +1,179 @@
+import sys
+sys.path.append('../')
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import simpy
+from env import MainEnv
+from input import input
+from flow import Flow, SendingFlow, ReceivingFlow
+from packet import Packet, AckPacket, DataPacket, FINPacket
+
+class FlowInboxTest(unittest.TestCase):
+    """Test the inbox of packets delivered to a flow."""
+
+    def setUp(self):
+        self.env = simpy.Environment()
+        self.flow = Flow(self.env, 3)
+
+    def test_batch(self):
+        """Checks that the packets delivered before the flow wakes up are
+        taken at once, in arrival order, and that the next packet fires a
+        new event."""
+
+        event = self.flow.receive_packet_event
+        for seq_num in range(1, 4):
+            self.flow.receive_packet(AckPacket(1, 3, 0, 0, seq_num))
+        self.assertTrue(event.triggered)
+
+        packets = self.flow.take_packets()
+        self.assertEqual([1, 2, 3], [p.get_seq_num() for p in packets])
+        self.assertEqual(0, len(self.flow.inbox))
+        self.assertIsNot(event, self.flow.receive_packet_event)
+        self.assertFalse(self.flow.receive_packet_event.triggered)
+
+        self.flow.receive_packet(AckPacket(1, 3, 0, 0, 4))
+        self.assertTrue(self.flow.receive_packet_event.triggered)
+        self.assertEqual(4, self.flow.take_packets()[0].get_seq_num())
+
+class RecordingHost(object):
+    """Host that records the packets sent by its flow."""
+
+    def __init__(self, env, host_id):
+        self.env = env
+        self.host_id = host_id
+        self.sent = []
+        self.removed = []
+
+    def get_id(self):
+        return self.host_id
+
+    def send_packet(self, packet):
+        # Recorded as sent, ack packets may be recycled afterwards
+        self.sent.append((self.env.now, packet.get_packet_type(),
+                          packet.get_seq_num(), packet.get_timestamp()))
+
+    def remove_flow(self, flow_id):
+        self.removed.append(flow_id)
+
+class DelayedAckTest(unittest.TestCase):
+    """Test the acknowledgments sent by a receiving flow, and the window
+    growth of a sending flow, with ack_every=3 and ack_delay=10."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dirname = tempfile.mkdtemp()
+        os.chdir(self.dirname)
+        self.env = MainEnv(1000, 500, 100, None, True, 'static', 3, 10)
+        self.host = RecordingHost(self.env, 2)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dirname)
+
+    def feed(self, flow, arrivals):
+        """Process that delivers packets to flow, arrivals being a list of
+        (time, packet) in time order."""
+        for at, packet in arrivals:
+            yield self.env.timeout(at - self.env.now)
+            flow.receive_packet(packet)
+
+    def data(self, seq_num, timestamp, push=False):
+        return DataPacket(1, 3, 2, timestamp, seq_num, push)
+
+    def test_receiver(self):
+        """Checks that acks are sent every ack_every packets, once the
+        ack_delay has passed, and right away for a packet out of order or
+        pushed, and that the ack held back when the FIN arrives is
+        dropped with its timer."""
+
+        flow = ReceivingFlow(self.env, 3, 1, self.host)
+        arrivals = [(0, self.data(1, 0)),
+                    (1, self.data(2, 1)),
+                    # Third packet in order, acknowledged at once
+                    (2, self.data(3, 2)),
+                    # Held back until the ack delay has passed
+                    (5, self.data(4, 5)),
+                    # Out of order
+                    (20, self.data(6, 20)),
+                    (21, self.data(5, 21)),
+                    # Pushed, acknowledges the previous one too
+                    (22, self.data(6, 22, True)),
+                    # Held back, then the FIN comes
+                    (23, self.data(7, 23)),
+                    (25, FINPacket(1, 3, 2, 24, -1))]
+        self.env.process(self.feed(flow, arrivals))
+        self.env.run(until=100)
+
+        ack = Packet.PacketTypes.ack_packet
+        self.assertEqual([(2, ack, 4, 2),
+                          (15, ack, 5, 5),
+                          (20, ack, 5, 20),
+                          (22, ack, 7, 22),
+                          (25, Packet.PacketTypes.fin_packet, -1, 24)],
+                         self.host.sent)
+        self.assertIsNone(flow.ack_timer)
+        self.assertEqual([3], self.host.removed)
+        # The timers of the packets acknowledged before their ack delay
+        # and of the packet held back when the FIN came
+        self.assertEqual(3, self.env.timers.num_cancelled)
+
+    def test_slow_start(self):
+        """Checks that in slow start, a Tahoe window grows by the packets
+        an ack covers, up to ack_every."""
+
+        flow = SendingFlow(self.env, 3, 1, 10, 2, self.host, 'Tahoe')
+        flow.window_size = 1.0
+        flow.window_start_time = 0
+        flow.window_end = 20
+        self.env.process(flow.tahoe_monitor_incoming_pkts(self.env))
+        arrivals = [(10, AckPacket(2, 3, 1, 0, 2)),
+                    (11, AckPacket(2, 3, 1, 0, 7)),
+                    (12, AckPacket(2, 3, 1, 0, 9))]
+        sizes = []
+        def record(env):
+            for at in [10, 11, 12]:
+                yield env.timeout(at + 0.5 - env.now)
+                sizes.append(flow.window_size)
+        self.env.process(self.feed(flow, arrivals))
+        self.env.process(record(self.env))
+        self.env.run(until=100)
+
+        self.assertEqual([2.0, 5.0, 7.0], sizes)
+        self.assertEqual(9, flow.batch_start)
+
+class AckEveryTest(unittest.TestCase):
+    """Test that Tahoe and FAST flows finish with delayed acks."""
+
+    def setUp(self):
+        self.ifile = os.path.abspath('../test_case_0')
+        self.cwd = os.getcwd()
+        self.dirname = tempfile.mkdtemp()
+        os.chdir(self.dirname)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dirname)
+
+    def test_finish(self):
+        """Checks that the flow of test case 0 sends all its data within
+        30 s with Tahoe and with FAST, acknowledged every 2 packets."""
+
+        for cc in ['Tahoe', 'FAST']:
+            network_specs = input(self.ifile)
+            network_specs['Flows'][0][4] = cc
+            with open('input.json', 'w') as fout:
+                json.dump(network_specs, fout)
+            env = MainEnv(30000, 500, 5000, None, True, 'static', 2)
+            env.loadNetwork('input.json')
+            env.run(until=env.process(env.collect_stats(env)))
+
+            flow = env.flows[0]
+            self.assertIsNotNone(flow.end_time, cc)
+            self.assertLessEqual(flow.data_amt, 0, cc)
+            self.assertEqual('done', flow.phase, cc)
+
+if __name__ == '__main__':
+    unittest.main()
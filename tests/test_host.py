@@ -0,0 +1,56 @@
+import sys
+sys.path.append('../')
+import unittest
+import simpy
+from host import Host
+from link import Link
+from flow import ReceivingFlow
+from packet import DataPacket, RoutingUpdatePacket
+
+class EndPoint(object):
+    """Minimal device at the other end of the host link."""
+    
+    def __init__(self, id):
+        self.id = id
+        
+    def get_id(self):
+        return self.id
+    
+    def receive_packet(self, packet):
+        pass
+
+class HostTest(unittest.TestCase):
+    """Test that Host passes packets on without scheduling events."""
+    
+    def setUp(self):
+        self.env = simpy.Environment()
+        self.host = Host(self.env, 0)
+        self.link = Link(self.env, 2, 10, 10, 64,
+                         [self.host, EndPoint(1)])
+        self.host.add_link(self.link)
+        
+    def test_send(self):
+        """Checks that sent packets are in the link buffer right away."""
+        
+        self.host.send_packet(DataPacket(0, 3, 1, 0, 1))
+        self.host.send_packet(DataPacket(0, 3, 1, 0, 2))
+        self.assertEqual(2, len(self.link.buffer))
+        self.assertEqual(2 * DataPacket.DATA_PACKET_LENGTH,
+                         self.host.amt_data_sent)
+        
+    def test_receive(self):
+        """Checks that packets arriving at the same time all reach a
+        receiving flow created for them, and routing packets are
+        ignored."""
+        
+        self.host.receive_packet(DataPacket(1, 3, 0, 0, 1))
+        self.host.receive_packet(DataPacket(1, 3, 0, 0, 2))
+        self.host.receive_packet(RoutingUpdatePacket(2, -1, -1, 0, 1, {}))
+        flow = self.host.flows[3]
+        self.assertIsInstance(flow, ReceivingFlow)
+        self.assertEqual(2, flow.num_packets_received)
+        self.assertEqual(2 * DataPacket.DATA_PACKET_LENGTH,
+                         self.host.amt_data_received)
+        
+if __name__ == '__main__':
+    unittest.main()
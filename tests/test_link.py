@@ -0,0 +1,94 @@
+import sys
+sys.path.append('../')
+import unittest
+import simpy
+from link import Link
+from packet import DataPacket, AckPacket
+
+class EndPoint(object):
+    """Minimal host that records the packets delivered by a link."""
+    
+    def __init__(self, env, id):
+        self.env = env
+        self.id = id
+        self.received = []
+        
+    def get_id(self):
+        return self.id
+    
+    def receive_packet(self, packet):
+        self.received.append((self.env.now, packet))
+
+class LinkTest(unittest.TestCase):
+    """Test buffering and transmission of Link."""
+    
+    # 1 Mbps, 10 ms delay and 1 KB of buffer on each side
+    LINK_RATE = 1
+    LINK_DELAY = 10
+    BUFFER_SIZE = 1
+    
+    def setUp(self):
+        self.env = simpy.Environment()
+        self.end_points = [EndPoint(self.env, 0), EndPoint(self.env, 1)]
+        self.link = Link(self.env, 2, self.LINK_RATE, self.LINK_DELAY,
+                         self.BUFFER_SIZE, self.end_points)
+        
+    def test_drop_tail(self):
+        """Checks that each side drops packets that overflow its own
+        buffer."""
+        
+        self.link.enqueue(DataPacket(0, 3, 1, 0, 1), 0)
+        self.link.enqueue(AckPacket(0, 3, 1, 0, 1), 0)
+        self.link.enqueue(DataPacket(1, 3, 0, 0, 1), 1)
+        
+        self.assertEqual(1, self.link.packet_drop)
+        self.assertEqual([1024, 1024], self.link.buffer_used)
+        self.assertEqual(2048, self.link.total_buffer_used)
+        self.assertEqual(1.0, self.link.get_buffer_occupancy())
+        self.assertAlmostEqual(2048 / self.link.link_rate + self.LINK_DELAY,
+                               self.link.get_weight())
+        
+    def test_arbitration(self):
+        """Checks that packets are transmitted in arrival order whichever
+        side they come from, and delivered after the link delay."""
+        
+        first = AckPacket(1, 3, 0, 0, 1)
+        second = DataPacket(0, 3, 1, 0, 1)
+        self.link.enqueue(first, 1)
+        self.link.enqueue(second, 0)
+        self.env.run()
+        
+        first_done = 64 / self.link.link_rate
+        second_done = first_done + 1024 / self.link.link_rate
+        self.assertEqual([(first_done + self.LINK_DELAY, first)],
+                         self.end_points[0].received)
+        self.assertEqual([(second_done + self.LINK_DELAY, second)],
+                         self.end_points[1].received)
+        self.assertEqual([0, 0], self.link.buffer_used)
+        self.assertEqual(0, self.link.total_buffer_used)
+        self.assertEqual(1088, self.link.transmitted_size)
+
+    def test_burst(self):
+        """Checks that packets scheduled ahead of time are buffered,
+        dropped and transmitted as if they were enqueued at their time."""
+
+        packets = [DataPacket(0, 3, 1, 0, i) for i in range(3)]
+        # The second packet arrives while the first one is still in the
+        # buffer, the third one after the link has gone idle.
+        self.link.schedule_burst([(0, packets[0]), (1, packets[1]),
+                                  (100, packets[2])], 0)
+        self.assertEqual([1024, 0], self.link.buffer_used)
+
+        self.env.run(until=50)
+        self.assertEqual(1, self.link.packet_drop)
+        self.assertEqual(0, self.link.total_buffer_used)
+        self.assertEqual(1, len(self.link.pending))
+
+        self.env.run()
+        done = 1024 / self.link.link_rate
+        self.assertEqual([(done + self.LINK_DELAY, packets[0]),
+                          (100 + done + self.LINK_DELAY, packets[2])],
+                         self.end_points[1].received)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import sys
+sys.path.append('../')
+import unittest
+import shutil
+import tempfile
+import numpy as np
+from metrics import MetricStore, load_metrics, decimate_minmax
+
+class MetricStoreTest(unittest.TestCase):
+    """Test allocation and views of MetricStore."""
+    
+    DURATION = 5
+    INTERVAL = 0.3
+    COUNTS = {'link_rate': 3, 'flow_window_size': 1}
+    
+    def setUp(self):
+        self.store = MetricStore(self.DURATION, self.INTERVAL, self.COUNTS)
+        
+    def test_allocation(self):
+        """Checks that arrays are allocated once for all the samples,
+        including a shorter last interval."""
+        
+        self.assertEqual(17, self.store.num_samples)
+        self.assertEqual((3, 18), self.store.values['link_rate'].shape)
+        self.assertEqual((1, 18), self.store.values['flow_window_size'].shape)
+        self.assertEqual(0, self.store.time_series[0])
+        self.assertEqual(self.DURATION, self.store.time_series[-1])
+        self.assertEqual(1, self.store.num_points)
+        
+    def test_views(self):
+        """Checks that collected points are exposed as views without
+        copying."""
+        
+        self.store.add_column({'link_rate': [1, 2, 3],
+                               'flow_window_size': [20]})
+        view = self.store.view('link_rate')
+        
+        self.assertEqual((3, 2), view.shape)
+        self.assertEqual([[0, 1], [0, 2], [0, 3]], view.tolist())
+        self.assertIs(self.store.values['link_rate'], view.base)
+        self.assertEqual(2, len(self.store.times()))
+
+    def test_save_and_load(self):
+        """Checks that exported metrics are loaded back memory mapped,
+        with the manifest."""
+        
+        self.store.add_column({'link_rate': [1, 2, 3],
+                               'flow_window_size': [20]})
+        dirname = tempfile.mkdtemp()
+        try:
+            self.store.save(dirname,
+                            {'link_rate': 'Mbps', 'flow_window_size': 'pkts'},
+                            {'link_rate': [1, 2, 3], 'flow_window_size': [1]})
+            manifest, time_series, values = load_metrics(dirname)
+            
+            self.assertEqual(self.INTERVAL, manifest['interval'])
+            self.assertEqual(2, manifest['num_points'])
+            self.assertEqual('Mbps', manifest['fields']['link_rate']['unit'])
+            self.assertEqual([1, 2, 3],
+                             manifest['fields']['link_rate']['ids'])
+            self.assertIsInstance(values['link_rate'], np.memmap)
+            self.assertEqual(self.store.view('link_rate').tolist(),
+                             values['link_rate'].tolist())
+            self.assertEqual([0, self.INTERVAL], time_series.tolist())
+        finally:
+            shutil.rmtree(dirname)
+
+class DecimateTest(unittest.TestCase):
+    """Test min/max decimation of long series."""
+    
+    def test_short_series(self):
+        """Checks that series that fit are left alone."""
+        
+        x = np.arange(10.0)
+        y = x * 2
+        dx, dy = decimate_minmax(x, y, 5)
+        self.assertIs(x, dx)
+        self.assertIs(y, dy)
+        
+    def test_envelope(self):
+        """Checks that the min and max of every bucket are kept in time
+        order."""
+        
+        x = np.arange(12.0)
+        y = np.array([0, 5, 1, 2, -3, 2, 7, 7, 7, 1, 9, 0.0])
+        dx, dy = decimate_minmax(x, y, 2)
+        self.assertEqual([1, 4, 10, 11], dx.tolist())
+        self.assertEqual([5, -3, 9, 0], dy.tolist())
+
+if __name__ == '__main__':
+    unittest.main()
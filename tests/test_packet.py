@@ -2,6 +2,7 @@ import sys
 sys.path.append('../')
 import unittest
 from packet import Packet, DataPacket, AckPacket, RoutingUpdatePacket, FINPacket
+from packet import PacketPool
 
 class PacketTest(unittest.TestCase):
     """Test definitions and methods of Packet base class."""
@@ -80,5 +81,58 @@ class PacketTest(unittest.TestCase):
         self.assertEqual(self.NEW_TIMESTAMP, self.packet.get_timestamp())
         self.assertEqual(self.NEW_SEQ_NUM, self.packet.get_seq_num())
 
+    def test_slots(self):
+        """Checks that packets do not carry a per-instance dict."""
+        
+        for packet in [self.packet, self.data_packet, self.ack_packet,
+                       self.routing_update_packet, self.fin_packet]:
+            self.assertFalse(hasattr(packet, '__dict__'))
+
+class PacketPoolTest(unittest.TestCase):
+    """Test recycling of data and ack packets by PacketPool."""
+    
+    def setUp(self):
+        self.pool = PacketPool()
+        
+    def test_reuse(self):
+        """Checks that released packets are handed out again with the new
+        specifications."""
+        
+        data_packet = self.pool.data_packet(1, 2, 3, 30, 15)
+        self.pool.release(data_packet)
+        reused_packet = self.pool.data_packet(4, 5, 6, 31, 16)
+        
+        self.assertIs(data_packet, reused_packet)
+        self.assertEqual(4, reused_packet.get_source())
+        self.assertEqual(5, reused_packet.get_flow_id())
+        self.assertEqual(6, reused_packet.get_destination())
+        self.assertEqual(31, reused_packet.get_timestamp())
+        self.assertEqual(16, reused_packet.get_seq_num())
+        self.assertEqual(Packet.PacketTypes.data_packet,
+                         reused_packet.get_packet_type())
+        self.assertEqual(1, self.pool.num_allocated)
+        self.assertEqual(1, self.pool.num_reused)
+        
+    def test_free_lists(self):
+        """Checks that data and ack packets are kept apart and that other
+        packets are not recycled."""
+        
+        ack_packet = self.pool.ack_packet(1, 2, 3, 30, 15)
+        self.pool.release(ack_packet)
+        self.pool.release(FINPacket(1, 2, 3, 30, -1))
+        
+        self.assertIsNot(ack_packet, self.pool.data_packet(1, 2, 3, 30, 15))
+        self.assertIs(ack_packet, self.pool.ack_packet(1, 2, 3, 30, 15))
+        self.assertEqual(0, len(self.pool.free_data_packets))
+        self.assertEqual(0, len(self.pool.free_ack_packets))
+
+    def test_push(self):
+        """Checks that a recycled data packet gets the new push flag."""
+
+        data_packet = self.pool.data_packet(1, 2, 3, 30, 15, True)
+        self.assertTrue(data_packet.push)
+        self.pool.release(data_packet)
+        self.assertFalse(self.pool.data_packet(1, 2, 3, 31, 16).push)
+
 if __name__ == '__main__':
     unittest.main()
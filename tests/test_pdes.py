@@ -0,0 +1,73 @@
+import sys
+sys.path.append('../')
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from env import MainEnv
+from input import input
+from link import OrderedLink
+from pdes import partition_network, lookahead, run_parallel
+
+class PartitionTest(unittest.TestCase):
+    """Test the partitions of test case 2 and their lookahead."""
+
+    def setUp(self):
+        self.network_specs = input('../test_case_2')
+
+    def test_partitions(self):
+        """Checks that hosts and links go with their routers, and cut
+        links with their first router."""
+
+        parts = partition_network(self.network_specs, 2)
+        self.assertEqual([0, 0, 1, 1], parts['routers'])
+        self.assertEqual([0, 0, 1, 1, 0, 1], parts['hosts'])
+        self.assertEqual([0, 0, 1, 0, 0, 1, 1, 0, 1], parts['links'])
+
+        parts = partition_network(self.network_specs, 1)
+        self.assertEqual([0] * 9, parts['links'])
+
+    def test_lookahead(self):
+        """Checks that the lookahead is the delay of the cut links, and
+        the whole duration without any."""
+
+        parts = partition_network(self.network_specs, 3)
+        self.assertEqual(10, lookahead(self.network_specs, parts, 1000))
+        parts = partition_network(self.network_specs, 1)
+        self.assertEqual(1000, lookahead(self.network_specs, parts, 1000))
+
+class OrderedEnv(MainEnv):
+    """Sequential environment with the links of the partitions."""
+
+    LINK = OrderedLink
+
+class ParallelTest(unittest.TestCase):
+    """Test that a partitioned simulation matches the sequential one."""
+
+    def setUp(self):
+        self.ifile = os.path.abspath('../test_case_2')
+        self.cwd = os.getcwd()
+        self.dirname = tempfile.mkdtemp()
+        os.chdir(self.dirname)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dirname)
+
+    def test_identical(self):
+        """Checks every data point of 3 s of test case 2 over 3
+        partitions against the sequential run with ordered links."""
+
+        env = OrderedEnv(3000, 500, 5000, None, True, 'static')
+        env.loadNetwork(self.ifile)
+        env.run(until=env.process(env.collect_stats(env)))
+        graph = run_parallel(self.ifile, 3, 3000, 500)
+        for field in MainEnv.HOST_FIELDS + MainEnv.FLOW_FIELDS + \
+                MainEnv.LINK_FIELDS:
+            self.assertTrue(np.array_equal(
+                env.realTimeGraph.data_points[field],
+                graph.data_points[field]), field)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import sys
+sys.path.append('../')
+import os
+import unittest
+import shutil
+import tempfile
+import simpy
+from env import MainEnv
+from link import Link
+from packet import RoutingUpdatePacket, RoutingDeltaPacket
+from router import Router, LinkStateRouter
+
+TEST_CASE_1 = os.path.abspath('../test_case_1')
+
+class EndHost(object):
+    """Minimal host attached to a router by a single link, that records
+    the packets it receives."""
+    
+    def __init__(self, id):
+        self.id = id
+        self.link = None
+        self.received = []
+        
+    def get_id(self):
+        return self.id
+    
+    def add_link(self, link):
+        self.link = link
+    
+    def receive_packet(self, packet):
+        self.received.append(packet)
+
+class DistanceVectorTest(unittest.TestCase):
+    """Test delta updates and triggered update hold down of Router, on
+    a router linked to a device that records the routing packets."""
+    
+    UPDATE_INTERVAL = 100
+    
+    def setUp(self):
+        self.env = simpy.Environment(initial_time=Router.CONVERGENCE_TIME)
+        self.router = Router(self.env, 0, self.UPDATE_INTERVAL)
+        self.sink = EndHost(1)
+        self.link = Link(self.env, 2, 10, 10, 64, [self.router, self.sink])
+        self.router.add_link(self.link)
+        
+    def test_delta(self):
+        """Checks that deltas are applied on top of the previous update,
+        None removing a destination."""
+        
+        router = self.router
+        router.process_routing_packet(
+            RoutingUpdatePacket(2, -1, -1, 0, 1, {1: 0, 5: 10, 6: 20}))
+        router.process_routing_packet(RoutingDeltaPacket(2, 0, 2,
+                                                         {5: 15, 6: None}))
+        self.assertEqual({1: 0, 5: 15}, router.links_to_dists[2])
+        self.assertEqual(router.links_cost[2] + 15, router.min_dists[5])
+        self.assertNotIn(6, router.min_dists)
+        
+    def test_lost_update(self):
+        """Checks that deltas after a lost update are ignored until the
+        next full update."""
+        
+        router = self.router
+        router.process_routing_packet(
+            RoutingUpdatePacket(2, -1, -1, 0, 1, {1: 0, 5: 10}))
+        router.process_routing_packet(RoutingDeltaPacket(2, 0, 3, {5: 1}))
+        router.process_routing_packet(RoutingDeltaPacket(2, 0, 4, {5: 2}))
+        self.assertIsNone(router.links_seq[2])
+        self.assertEqual(10, router.links_to_dists[2][5])
+        router.process_routing_packet(
+            RoutingUpdatePacket(2, -1, -1, 0, 5, {1: 0, 5: 3}))
+        router.process_routing_packet(RoutingDeltaPacket(2, 0, 6, {5: 4}))
+        self.assertEqual(4, router.links_to_dists[2][5])
+        
+    def test_hold_down(self):
+        """Checks that triggered updates are rate limited after
+        CONVERGENCE_TIME, the changes being sent together at the end of
+        the hold down."""
+        
+        router = self.router
+        # After the periodic update
+        self.env.run(until=Router.CONVERGENCE_TIME + 1)
+        router.min_dists = {5: 20, 6: 10}
+        router.trigger_update()
+        router.min_dists = {5: 30, 6: 10}
+        router.trigger_update()
+        router.min_dists = {5: 40}
+        router.trigger_update()
+        self.assertTrue(router.update_pending)
+        self.env.run(until=Router.CONVERGENCE_TIME + self.UPDATE_INTERVAL)
+        self.assertFalse(router.update_pending)
+        
+        packets = self.sink.received
+        self.assertEqual([1, 2, 3], [p.get_seq_num() for p in packets])
+        self.assertTrue(packets[0].full)
+        self.assertEqual({5: 20, 6: 10}, packets[1].get_distance_estimates())
+        self.assertEqual({5: 40, 6: None},
+                         packets[2].get_distance_estimates())
+        
+class LinkStateRouterTest(unittest.TestCase):
+    """Test the shortest paths computed by LinkStateRouter on a diamond
+    whose lower branch (through router 3) is slower."""
+    
+    UPDATE_INTERVAL = 100
+    
+    def setUp(self):
+        self.env = simpy.Environment()
+        self.hosts = [EndHost(0), EndHost(1)]
+        self.routers = [LinkStateRouter(self.env, i, self.UPDATE_INTERVAL)
+                        for i in range(2, 6)]
+        h0, h1 = self.hosts
+        r1, r2, r3, r4 = self.routers
+        self.links = {}
+        for lid, delay, ends in [(6, 10, [h0, r1]), (7, 10, [r1, r2]),
+                                 (8, 20, [r1, r3]), (9, 10, [r2, r4]),
+                                 (10, 20, [r3, r4]), (11, 10, [r4, h1])]:
+            link = Link(self.env, lid, 10, delay, 64, ends)
+            for node in ends:
+                node.add_link(link)
+            self.links[lid] = link
+        r1.add_host(h0)
+        r4.add_host(h1)
+        
+    def test_routes(self):
+        """Checks that routers forward along the fast branch."""
+        
+        self.env.run(until=self.UPDATE_INTERVAL)
+        r1, r2, r3, r4 = self.routers
+        self.assertEqual(7, r1.routing_table[1])
+        self.assertEqual(6, r1.routing_table[0])
+        self.assertEqual(10, r3.routing_table[1])
+        self.assertEqual(9, r4.routing_table[0])
+        self.assertEqual(11, r4.routing_table[1])
+        self.assertEqual(r2.id, r4.parents[r1.id])
+        
+    def test_incremental(self):
+        """Checks that updating the tree as weights change gives the same
+        paths as computing it again, and that changes off the tree are
+        pruned."""
+        
+        self.env.run(until=self.UPDATE_INTERVAL)
+        r1, r2, r3, r4 = self.routers
+        
+        # Router 3 is not on the paths of router 1, and its links get slower
+        pruned = r1.num_pruned
+        weights = dict((nid, w + 5) for nid, w in r1.lsdb[r3.id].items())
+        r1.update_lsdb(r3.id, r1.lsa_seqs[r3.id] + 1, weights)
+        self.assertEqual(pruned + 1, r1.num_pruned)
+        
+        # Router 3 gets much faster and attracts the traffic to host 1
+        weights = dict((nid, 1) for nid in r1.lsdb[r3.id])
+        r1.update_lsdb(r3.id, r1.lsa_seqs[r3.id] + 1, weights)
+        r4_weights = dict(r1.lsdb[r4.id])
+        r4_weights[r3.id] = 1
+        r1.update_lsdb(r4.id, r1.lsa_seqs[r4.id] + 1, r4_weights)
+        r1_weights = dict(r1.lsdb[r1.id])
+        r1_weights[r3.id] = 1
+        r1.update_lsdb(r1.id, r1.lsa_seqs[r1.id] + 1, r1_weights)
+        self.assertEqual(8, r1.routing_table[1])
+        
+        min_dists = dict(r1.min_dists)
+        routing_table = dict(r1.routing_table)
+        r1.compute_routes()
+        self.assertEqual(min_dists, r1.min_dists)
+        self.assertEqual(routing_table, r1.routing_table)
+        
+class StaticRoutingTest(unittest.TestCase):
+    """Test the routing tables installed in static routing mode on
+    test_case_1 (a diamond of four routers between two hosts)."""
+    
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        self.env = MainEnv(1000, 500, 100, None, headless=True,
+                           routing='static')
+        self.env.loadNetwork(TEST_CASE_1)
+        
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+        
+    def test_tables(self):
+        """Checks that every router has a loop-free path to every host."""
+        
+        links = dict((link.get_id(), link) for link in self.env.links)
+        for router in self.env.routers:
+            for host in self.env.hosts:
+                node = router
+                for _ in range(len(self.env.routers)):
+                    link = links[node.routing_table[host.get_id()]]
+                    node = link.end_points[1 if link.end_points[0] is node else 0]
+                    if node is host:
+                        break
+                self.assertIs(host, node)
+        
+    def test_no_routing_packets(self):
+        """Checks that no routing packet is sent before the flow starts."""
+        
+        self.env.run(until=400)
+        for link in self.env.links:
+            self.assertEqual(0, link.transmitted_size)
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import sys
+sys.path.append('../')
+import unittest
+import os
+import shutil
+import tempfile
+from env import MainEnv
+from input import input
+from routing_cache import cache_key, routes_complete
+
+class RoutingCacheTest(unittest.TestCase):
+    """Test that the converged routes of test case 2 are cached and
+    installed at the start of later simulations."""
+
+    def setUp(self):
+        self.ifile = os.path.abspath('../test_case_2')
+        self.cwd = os.getcwd()
+        self.dirname = tempfile.mkdtemp()
+        os.chdir(self.dirname)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dirname)
+
+    def load(self, routing):
+        """Loads test case 2 with the routing cache."""
+        env = MainEnv(3000, 500, 100, None, True, routing,
+                      routing_cache='cache')
+        env.loadNetwork(self.ifile)
+        return env
+
+    def test_key(self):
+        """Checks that the key depends on the links and the update
+        interval, but not on the flows."""
+
+        network_specs = input(self.ifile)
+        key = cache_key(network_specs, 'dv', 100)
+        self.assertEqual(key, cache_key(network_specs, 'dv', 100.0))
+        self.assertNotEqual(key, cache_key(network_specs, 'dv', 5000))
+        self.assertNotEqual(key, cache_key(network_specs, 'ls', 100))
+        self.assertEqual(key, cache_key(dict(network_specs, Flows=[]),
+                                        'dv', 100))
+        network_specs['Links'][0][1] += 1
+        self.assertNotEqual(key, cache_key(network_specs, 'dv', 100))
+
+    def test_warm_start(self):
+        """Checks that routers start with every route, the same from the
+        cache, and skip the short hold down of the convergence."""
+
+        for routing in ['dv', 'ls']:
+            env = self.load(routing)
+            self.assertEqual(0, env.now)
+            self.assertTrue(routes_complete(env))
+            self.assertEqual(0, env.routers[0].convergence_time)
+            self.assertEqual(1, len(os.listdir('cache')))
+
+            cached = self.load(routing)
+            self.assertEqual(1, len(os.listdir('cache')))
+            for router, cached_router in zip(env.routers, cached.routers):
+                self.assertEqual(router.get_routing_state(),
+                                 cached_router.get_routing_state())
+                self.assertEqual(
+                    [link and link.get_id() for link in router.fib],
+                    [link and link.get_id() for link in cached_router.fib])
+            shutil.rmtree('cache')
+
+if __name__ == '__main__':
+    unittest.main()
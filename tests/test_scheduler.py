@@ -0,0 +1,112 @@
+import sys
+sys.path.append('../')
+import unittest
+import heapq
+import random
+import os
+import shutil
+import tempfile
+import numpy as np
+from env import MainEnv
+from scheduler import CalendarQueue
+
+class CalendarQueueTest(unittest.TestCase):
+    """Test that CalendarQueue pops entries in the order of a heap."""
+
+    def setUp(self):
+        random.seed(3)
+        self.queue = CalendarQueue()
+        self.heap = []
+        self.eid = 0
+        self.now = 0
+
+    def push(self, delay, priority=1):
+        """Pushes the same entry delay ms from now on both queues."""
+        entry = (self.now + delay, priority, self.eid, None)
+        self.eid += 1
+        self.queue.push(entry)
+        heapq.heappush(self.heap, entry)
+
+    def pop(self):
+        """Pops both queues and checks that they agree."""
+        entry = self.queue.pop()
+        self.assertEqual(heapq.heappop(self.heap), entry)
+        self.now = entry[0]
+        return entry
+
+    def test_order(self):
+        """Checks the order of entries pushed while popping, with few
+        distinct delays, ties and urgent priorities, as the simulation
+        schedules them, through several resizes."""
+
+        delays = [0, 0.8192, 10, 10, 13.5, 100]
+        for _ in range(200):
+            self.push(random.choice(delays))
+        for _ in range(5000):
+            self.pop()
+            for _ in range(random.randint(0, 2)):
+                self.push(random.choice(delays), random.randint(0, 1))
+        while self.heap:
+            self.pop()
+
+        self.assertEqual(0, len(self.queue))
+        self.assertGreater(self.queue.num_resizes, 0)
+        self.assertRaises(IndexError, self.queue.pop)
+
+    def test_now_after_resize(self):
+        """Checks that an entry pushed at the current time comes out next,
+        after resizes that left the next entry slots away."""
+
+        for i in range(100):
+            self.push(10 * i)
+        while self.heap:
+            self.pop()
+            self.push(0, 0)
+            self.pop()
+        self.assertGreater(self.queue.num_resizes, 2)
+
+    def test_far_events(self):
+        """Checks that events more than a year of slots away and the
+        peeked entry come out right."""
+
+        self.push(1e6)
+        self.push(5)
+        self.push(5e5)
+        self.assertEqual(5, self.queue.peek()[0])
+        self.assertEqual([5, 5e5, 1e6], [self.pop()[0] for _ in range(3)])
+        self.assertIsNone(self.queue.peek())
+
+class CalendarRunTest(unittest.TestCase):
+    """Test that a simulation with the calendar queue matches the one
+    with the heap."""
+
+    def setUp(self):
+        self.ifile = os.path.abspath('../test_case_2')
+        self.cwd = os.getcwd()
+        self.dirname = tempfile.mkdtemp()
+        os.chdir(self.dirname)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dirname)
+
+    def simulate(self, scheduler):
+        """Runs 5 s of test case 2."""
+        env = MainEnv(5000, 500, 5000, None, True, scheduler=scheduler)
+        env.loadNetwork(self.ifile)
+        env.run(until=env.process(env.collect_stats(env)))
+        return env
+
+    def test_identical(self):
+        """Checks every data point of test case 2, whose events scheduled
+        at the current time used to come out late after a resize."""
+
+        env = self.simulate('heap')
+        calendar = self.simulate('calendar')
+        for field in env.realTimeGraph.data_points:
+            self.assertTrue(np.array_equal(
+                env.realTimeGraph.data_points[field],
+                calendar.realTimeGraph.data_points[field]), field)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import sys
+sys.path.append('../')
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from metrics import MetricStore
+from sweep import sweep_points, run_sweep, merge_metrics, load_sweep, INDEX
+
+class SweepTest(unittest.TestCase):
+    """Test the grid of points and the merged metrics of a sweep."""
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def save_run(self, point, num_links):
+        """Saves the metrics of a run with num_links links, all at the
+        run number plus one."""
+        store = MetricStore(1, 0.5, {'link_rate': num_links})
+        store.add_column({'link_rate': [point['run'] + 1] * num_links})
+        store.add_column({'link_rate': [point['run'] + 1] * num_links})
+        store.save(os.path.join(self.dirname, point['dir'], 'results',
+                                'raw_data'),
+                   {'link_rate': 'Mbps'},
+                   {'link_rate': range(1, num_links + 1)})
+
+    def test_points(self):
+        """Checks that every combination of parameters is a run."""
+
+        points = sweep_points(['a', 'b'], [5, 10], [50], [None, 64])
+        self.assertEqual(8, len(points))
+        self.assertEqual(list(range(8)), [p['run'] for p in points])
+        self.assertEqual({'run': 3, 'dir': 'run_0003', 'input': 'a',
+                          'update': 10, 'alpha': 50, 'fast_timeout': 500,
+                          'buffer': 64},
+                         points[3])
+
+    def test_merge(self):
+        """Checks that runs are stacked in order, padded with NaN for
+        fewer objects or a failed run."""
+
+        points = sweep_points(['a'], [5], [50], [32, 64, 128])
+        self.save_run(points[0], 2)
+        self.save_run(points[1], 3)
+        points[0]['error'] = points[1]['error'] = None
+        points[2]['error'] = 'Traceback'
+        merge_metrics(self.dirname, points)
+        with open(os.path.join(self.dirname, INDEX), 'w') as fout:
+            json.dump({'points': points}, fout)
+
+        points, time_series, values = load_sweep(self.dirname)
+        link_rate = values['link_rate']
+        self.assertEqual([0, 0.5, 1], time_series.tolist())
+        self.assertEqual((3, 3, 3), link_rate.shape)
+        self.assertEqual([0, 1, 1], link_rate[0, 1].tolist())
+        self.assertTrue(np.isnan(link_rate[0, 2]).all())
+        self.assertEqual([0, 2, 2], link_rate[1, 2].tolist())
+        self.assertTrue(np.isnan(link_rate[2]).all())
+        self.assertEqual(128, points[2]['buffer'])
+
+    def test_bad_point(self):
+        """Checks that a point whose input file is missing fails alone,
+        and the sweep still merges the other runs."""
+
+        inputs = [os.path.abspath('../test_case_0'),
+                  os.path.join(self.dirname, 'missing')]
+        sweep_dir = os.path.join(self.dirname, 'sweep')
+        points = sweep_points(inputs, [5], [50], [None])
+        results = run_sweep(points, sweep_dir, 1, 0.5, jobs=2)
+        self.assertIsNone(results[0]['error'])
+        self.assertIn('IOError', results[1]['error'])
+
+        points, time_series, values = load_sweep(sweep_dir)
+        self.assertEqual([0, 0.5, 1], time_series.tolist())
+        self.assertFalse(np.isnan(values['link_rate'][0]).any())
+        self.assertTrue(np.isnan(values['link_rate'][1]).all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import sys
+sys.path.append('../')
+import unittest
+import simpy
+from timers import TimerWheel
+
+class TimerWheelTest(unittest.TestCase):
+    """Test the cancellable timers of TimerWheel."""
+
+    def setUp(self):
+        self.env = simpy.Environment()
+        self.wheel = TimerWheel(self.env)
+        self.fired = []
+
+    def record(self, name, delay):
+        """Returns a timer that records its name and time when it fires."""
+        timer = self.wheel.timeout(delay)
+        timer.callbacks.append(
+            lambda event: self.fired.append((name, self.env.now)))
+        return timer
+
+    def test_fire(self):
+        """Checks that timers fire at their exact expiry time, in order."""
+
+        self.record('late', 123.5)
+        self.record('early', 37.25)
+        self.record('now', 3)
+        self.env.run()
+
+        self.assertEqual([('now', 3), ('early', 37.25), ('late', 123.5)],
+                         self.fired)
+        self.assertEqual(3, self.wheel.num_scheduled)
+
+    def test_cancel(self):
+        """Checks that cancelled timers never reach the event queue."""
+
+        first = self.record('first', 50)
+        self.record('second', 51)
+        self.env.run(until=20)
+        first.cancel()
+        self.env.run()
+
+        self.assertEqual([('second', 51)], self.fired)
+        self.assertEqual(1, self.wheel.num_cancelled)
+        self.assertEqual(1, self.wheel.num_scheduled)
+
+    def test_same_expiry(self):
+        """Checks that timers due at the same time fire in the order they
+        were created."""
+
+        for i in range(50):
+            self.record(i, 25 + i % 2)
+        self.env.run()
+
+        self.assertEqual([(i, 25) for i in range(0, 50, 2)] +
+                         [(i, 26) for i in range(1, 50, 2)], self.fired)
+
+    def test_cancel_late(self):
+        """Checks that a timer cancelled once on the event queue, in its
+        last tick, does not fire."""
+
+        first = self.record('first', 55)
+        self.record('second', 56)
+        self.env.run(until=52)
+        self.assertEqual(2, self.wheel.num_scheduled)
+        first.cancel()
+        first.cancel()
+        self.env.run()
+
+        self.assertEqual([('second', 56)], self.fired)
+        self.assertTrue(first.cancelled)
+        self.assertEqual(0, self.wheel.num_cancelled)
+        self.assertEqual(1, self.wheel.num_cancelled_late)
+
+    def test_condition(self):
+        """Checks a timer used as a timeout that is cancelled once the
+        event it guards has been triggered."""
+
+        done = self.env.event()
+        timeouts = []
+
+        def waiter(env):
+            timer = self.wheel.timeout(100)
+            yield done | timer
+            timeouts.append(timer.triggered)
+            timer.cancel()
+
+        self.env.process(waiter(self.env))
+        self.env.run(until=10)
+        done.succeed()
+        self.env.run()
+
+        self.assertEqual([False], timeouts)
+        self.assertEqual(0, self.wheel.num_scheduled)
+        self.assertEqual(1, self.wheel.num_cancelled)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys
+sys.path.append('../')
+import unittest
+import multiprocessing
+import matplotlib.pyplot as plt
+from output import RealTimeGraph
+from viewer import Viewer
+
+def collect(store, sample):
+    """Writes a data point the way MainEnv.collectData does."""
+    for field in store.values:
+        store.values[field][:, sample] = sample
+    store.set_num_points(sample + 1)
+
+class ViewerTest(unittest.TestCase):
+    """Test the shared store and the frames drawn by the viewer."""
+    
+    def setUp(self):
+        plt.switch_backend('agg')
+        self.graph = RealTimeGraph(5000, 1000, None, 2, 3, 1, True, True)
+        self.viewer = Viewer(self.graph)
+        
+    def test_shared_store(self):
+        """Checks that data points written by another process are seen."""
+        
+        process = multiprocessing.Process(target=collect,
+                                          args=(self.graph.store, 1))
+        process.start()
+        process.join()
+        self.assertEqual(2, self.graph.store.num_points)
+        self.assertEqual([1, 1, 1],
+                         list(self.graph.data_points['link_rate'][:, 1]))
+        
+    def test_update(self):
+        """Checks that frames are only drawn for new data points and that
+        the viewer stops after the last one."""
+        
+        self.viewer.setup()
+        collect(self.graph.store, 1)
+        collect(self.graph.store, 2)
+        self.viewer.update()
+        self.assertEqual(3, self.viewer.num_shown)
+        x, y = self.graph.lines[0][0][1].get_data()
+        self.assertEqual([0, 1, 2], list(x))
+        
+        self.viewer.finish()
+        collect(self.graph.store, 3)
+        self.viewer.update()
+        self.assertEqual(4, self.viewer.num_shown)
+        
+if __name__ == '__main__':
+    unittest.main()
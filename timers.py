@@ -0,0 +1,171 @@
+"""Cancellable timers kept in a hashed timer wheel."""
+
+import heapq
+from simpy.events import Event, NORMAL
+
+class Timer(Event):
+    """
+        Event that fires at a given time unless it is cancelled first.
+
+        Attributes:
+            wheel:
+                TimerWheel that holds the timer
+            expiry:
+                time (in ms) at which the timer fires
+            seq:
+                creation order of the timer in its wheel, orders the
+                timers with the same expiry
+            index:
+                index of the wheel bucket that holds the timer, None once
+                the timer is scheduled in the simulation or cancelled
+            cancelled:
+                whether the timer has been cancelled
+    """
+
+    def __init__(self, wheel, expiry, seq):
+        super(Timer, self).__init__(wheel.env)
+        self.wheel = wheel
+        self.expiry = expiry
+        self.seq = seq
+        self.index = None
+        self.cancelled = False
+
+    def cancel(self):
+        """ Function to cancel the timer. Does nothing if it has fired. """
+        self.wheel.cancel(self)
+
+
+class TimerWheel(object):
+    """
+        Hashed timer wheel for timers that are usually cancelled, like the
+        retransmission timeouts of the flows.
+
+        A SimPy timeout cannot be taken off the event queue once created:
+        a timeout that is not needed anymore is still popped when its time
+        comes. The wheel hashes each timer by its expiry time into a bucket
+        of TICK ms instead. Only when the simulation reaches a bucket are
+        its timers scheduled, at their exact expiry time. Timers cancelled
+        before that are simply removed from their bucket and never reach
+        the event queue. Timers of a bucket are scheduled in the order of
+        their expiry, then creation, so that timers due at the same time
+        always fire in the same order.
+
+        A timer cancelled after its bucket was reached, less than TICK ms
+        before its expiry, is already on the event queue. It is still
+        popped at its expiry, but its callbacks have been dropped, so
+        nothing waiting on it is woken up.
+
+        The wheel has one event per bucket that holds timers, whatever the
+        number of timers in it.
+    """
+
+    # Width (in ms) of the buckets
+    TICK = 10
+
+    def __init__(self, env, tick=TICK):
+        """
+            Args:
+                env:
+                    SimPy environment the timers fire in.
+                tick:
+                    width (in ms) of the buckets
+
+            Attributes:
+                buckets:
+                    dict from bucket index to the set of its timers
+                indexes:
+                    heap of the indexes of the buckets
+                wake_index:
+                    index of the bucket the wheel wakes up for, or None
+                num_timers, num_cancelled, num_scheduled:
+                    number of timers created, cancelled while in the
+                    wheel, and scheduled in the simulation
+                num_cancelled_late:
+                    number of timers cancelled once scheduled
+        """
+        self.env = env
+        self.tick = tick
+        self.buckets = {}
+        self.indexes = []
+        self.wake_index = None
+
+        self.num_timers = 0
+        self.num_cancelled = 0
+        self.num_scheduled = 0
+        self.num_cancelled_late = 0
+
+    def timeout(self, delay):
+        """ Function that returns a Timer firing in delay ms. """
+        self.num_timers += 1
+        timer = Timer(self, self.env.now + delay, self.num_timers)
+        index = int(timer.expiry // self.tick)
+        if index <= int(self.env.now // self.tick):
+            # The bucket of the current time has been handled already
+            self.schedule(timer)
+            return timer
+
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            bucket = self.buckets[index] = set()
+            heapq.heappush(self.indexes, index)
+        bucket.add(timer)
+        timer.index = index
+        if self.wake_index is None or index < self.wake_index:
+            self.wake_at(index)
+        return timer
+
+    def cancel(self, timer):
+        """ Function to take timer out of its bucket, or to drop its
+            callbacks if it is already on the event queue. Does nothing
+            if it has fired. """
+        if timer.cancelled or timer.processed:
+            return
+        timer.cancelled = True
+        if timer.index is None:
+            del timer.callbacks[:]
+            self.num_cancelled_late += 1
+            return
+        bucket = self.buckets[timer.index]
+        bucket.discard(timer)
+        if not bucket:
+            del self.buckets[timer.index]
+        timer.index = None
+        self.num_cancelled += 1
+
+    def schedule(self, timer):
+        """ Function to put timer on the event queue of the simulation. """
+        self.num_scheduled += 1
+        timer._ok = True
+        timer._value = None
+        self.env.schedule(timer, NORMAL, timer.expiry - self.env.now)
+
+    def wake_at(self, index):
+        """ Function to wake up the wheel at the start of bucket index. """
+        self.wake_index = index
+        # Not a process, a callback of the timeout
+        wake = self.env.timeout(max(index * self.tick - self.env.now, 0))
+        wake.index = index
+        wake.callbacks.append(self.wake)
+
+    def wake(self, event):
+        """ Callback of the timeout of wake_at. """
+        self.turn(event.index)
+
+    def turn(self, index):
+        """ Function called at the start of bucket index, schedules the
+            timers of the buckets reached. """
+        if self.wake_index == index:
+            self.wake_index = None
+        indexes = self.indexes
+        while indexes and indexes[0] <= index:
+            bucket = self.buckets.pop(heapq.heappop(indexes), ())
+            for timer in sorted(bucket, key=lambda timer: (timer.expiry,
+                                                           timer.seq)):
+                timer.index = None
+                self.schedule(timer)
+        # Skip the buckets emptied by cancelled timers
+        while indexes and indexes[0] not in self.buckets:
+            heapq.heappop(indexes)
+        if indexes and (self.wake_index is None or
+                        indexes[0] < self.wake_index):
+            self.wake_at(indexes[0])
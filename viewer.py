@@ -0,0 +1,81 @@
+"""Live view of the network simulation, drawn in a separate process
+"""
+import ctypes
+import multiprocessing
+import matplotlib.pyplot as plt
+
+class Viewer(object):
+    ''' Shows the real time graph of a running simulation from a child
+        process, so that drawing never stalls the simulation.
+
+        The graph's MetricStore must be shared: the simulation writes the
+        data points into shared memory and the viewer polls the number
+        of points collected. Each frame shows the latest data points, so
+        when drawing is slower than the simulation the samples in
+        between are drawn together instead of delaying it. Nothing is
+        sent back to the simulation, closing the window only ends the
+        viewer.
+            graph:
+                RealTimeGraph whose store is in shared memory
+            process:
+                the viewer process
+            done:
+                shared flag set once the simulation is over
+            num_shown:
+                number of data points in the last frame drawn
+            timer:
+                timer of the window that calls update()
+    '''
+
+    # Interval (in ms) at which the viewer checks for new data points
+    INTERVAL = 100
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.process = None
+        self.done = multiprocessing.RawValue(ctypes.c_bool, False)
+        self.num_shown = 0
+        self.timer = None
+
+    def start(self):
+        ''' Function to start the viewer process '''
+        self.process = multiprocessing.Process(target=self.run)
+        self.process.start()
+
+    def finish(self):
+        ''' Function to tell the viewer that no more data points will
+            be collected. '''
+        self.done.value = True
+
+    def join(self):
+        ''' Function to wait until the window is closed '''
+        if self.process is not None:
+            self.process.join()
+
+    def setup(self):
+        ''' Function to create the window and the timer that refreshes
+            it '''
+        self.graph.headless = False
+        self.graph.create_figure()
+        self.graph.init_frame()
+        self.timer = self.graph.fig.canvas.new_timer(interval=self.INTERVAL)
+        self.timer.add_callback(self.update)
+
+    def update(self):
+        ''' Function to draw a frame if data points have been collected
+            since the last one. Stops the timer after the last frame. '''
+        num_points = self.graph.store.num_points
+        # Read before drawing, the last points may arrive meanwhile
+        done = self.done.value
+        if num_points != self.num_shown:
+            self.graph.draw()
+            self.graph.refresh()
+            self.num_shown = num_points
+        if done and num_points == self.graph.store.num_points:
+            self.timer.stop()
+
+    def run(self):
+        ''' Function run by the viewer process '''
+        self.setup()
+        self.timer.start()
+        plt.show()